@@ -7,7 +7,6 @@ Comprehensive validation of all enhanced features addressing reviewer feedback
 import os
 import sys
 import csv
-import pickle
 import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import datetime
@@ -15,7 +14,7 @@ from datetime import datetime
 # Add agent modules to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '.'))
 
-from agent.q_learning import QLearningAgent
+from agent.q_learning import QLearningAgent, read_q_snapshot
 from agent.logger import create_comprehensive_task_log
 from agent.visualizer import plot_rewards
 
@@ -156,8 +155,7 @@ def verify_q_table_persistence():
     for qfile in q_files:
         if os.path.exists(qfile):
             try:
-                with open(qfile, 'rb') as f:
-                    q_data = pickle.load(f)
+                q_data = read_q_snapshot(qfile)
                 
                 print(f"      File: {qfile}")
                 print(f"      States Learned: {len(q_data)}")
@@ -9,9 +9,10 @@ have been successfully implemented and tested.
 
 import os
 import csv
-import pickle
 from datetime import datetime
 
+from agent.q_learning import read_q_snapshot
+
 def verify_all_requirements():
     """Verify all 11 requirements are implemented"""
     
@@ -64,8 +65,7 @@ def verify_all_requirements():
     for qfile in q_files:
         if os.path.exists(qfile):
             try:
-                with open(qfile, 'rb') as f:
-                    q_data = pickle.load(f)
+                q_data = read_q_snapshot(qfile)
                 print(f"   File: {qfile}")
                 print(f"   States: {len(q_data)}")
                 print(f"   Auto-save: After every Q-table update")
@@ -0,0 +1,277 @@
+"""
+Thread-safe Q-learning agent for concurrent sessions
+
+Streamlit serves every browser session on its own thread. Giving each session
+a private QLearningAgent means every session writes the same q_table.pkl and
+the last writer wins. ConcurrentQLearningAgent instead shares one table per
+q_path, guards it with a reader/writer lock and hands persistence to a single
+background writer thread.
+"""
+
+import atexit
+import os
+import threading
+
+from agent import events
+from agent.q_learning import QLearningAgent
+
+class ReadWriteLock:
+    """Writer-preferring reader/writer lock.
+
+    Any number of threads may hold the read side at once; the write side is
+    exclusive. Both sides are reentrant for the owning thread, and a thread
+    holding the write side may also take the read side.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._writers_waiting = 0
+        self._local = threading.local()
+
+    def acquire_read(self):
+        depth = getattr(self._local, "depth", 0)
+        if depth:
+            self._local.depth = depth + 1
+            return
+        if self._writer == threading.get_ident():
+            # Reading under our own write lock; nothing to count
+            self._local.counted = False
+            self._local.depth = 1
+            return
+        with self._cond:
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        self._local.counted = True
+        self._local.depth = 1
+
+    def release_read(self):
+        self._local.depth -= 1
+        if self._local.depth or not self._local.counted:
+            return
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if getattr(self._local, "depth", 0):
+                raise RuntimeError("Cannot upgrade a read lock to a write lock")
+            self._writers_waiting += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        with self._cond:
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    def read_locked(self):
+        return _Held(self.acquire_read, self.release_read)
+
+    def write_locked(self):
+        return _Held(self.acquire_write, self.release_write)
+
+class _Held:
+    """Context manager pairing an acquire and a release call"""
+
+    def __init__(self, acquire, release):
+        self._acquire = acquire
+        self._release = release
+
+    def __enter__(self):
+        self._acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._release()
+        return False
+
+class PersistenceWriter:
+    """Single background thread that persists an agent's table.
+
+    Save requests are coalesced: however many updates arrive while a write is
+    pending, the table is snapshotted once (under the agent's read lock) and
+    written once, at most every `interval` seconds. A failed write stays
+    pending and is retried after `interval`; flush() reports it.
+    """
+
+    def __init__(self, agent, interval=0.5):
+        self.agent = agent
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._requested = 0
+        self._written = 0
+        self._failures = 0  # Failed write attempts so far
+        self.last_error = None
+        self._urgent = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="q-table-writer", daemon=True)
+        self._thread.start()
+
+    def request_save(self):
+        """Schedule a save; returns immediately"""
+        with self._cond:
+            self._requested += 1
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Block until every save requested so far has been written.
+
+        Returns False on timeout, or if the next write attempt fails.
+        """
+        with self._cond:
+            target = self._requested
+            failures = self._failures
+            self._urgent = True
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._written >= target or self._failures > failures, timeout)
+            return self._written >= target
+
+    def close(self):
+        """Write any pending save and stop the thread"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._requested > self._written or self._stopped)
+                if self._requested == self._written:
+                    return
+                # Give concurrent updates a moment to pile up behind this save
+                self._cond.wait_for(lambda: self._stopped or self._urgent, self.interval)
+                self._urgent = False
+                target = self._requested
+            try:
+                self._write()
+                error = None
+            except Exception as e:
+                error = e
+                events.emit(events.QTableSaveFailed(path=self.agent.q_path, error=str(e)))
+            with self._cond:
+                if error is None:
+                    self._written = target
+                else:
+                    self._failures += 1
+                    self.last_error = error
+                self._cond.notify_all()
+                if error is not None and self._stopped:
+                    return  # Closing: do not spin retrying a write that keeps failing
+
+    def _write(self):
+        with self.agent.lock.read_locked():
+            snapshot = self.agent.snapshot()
+        self.agent.write_snapshot(snapshot)
+
+class ConcurrentQLearningAgent(QLearningAgent):
+    """QLearningAgent safe to share between threads.
+
+    Reads (action selection, ranking, confidence, follow-ups) run in parallel
+    under the read lock; update_q_table and update_q_with_correction perform
+    their read-modify-write under the write lock so no update is lost. Saves
+    to the agent's own q_path go through one PersistenceWriter.
+    """
+
+    def __init__(self, actions, alpha=0.2, gamma=0.9, epsilon=0.2, q_path="data/q_table.pkl", save_interval=0.5,
+                 mode="q_learning", bandit_step="constant"):
+        self.lock = ReadWriteLock()
+        self._rows_lock = threading.Lock()  # Row creation vs. snapshot iteration
+        super().__init__(actions, alpha=alpha, gamma=gamma, epsilon=epsilon, q_path=q_path, mode=mode,
+                         bandit_step=bandit_step)
+        self.writer = PersistenceWriter(self, interval=save_interval)
+        atexit.register(self.writer.close)
+
+    def _ensure_state(self, state):
+        # New rows are created while other threads hold the read lock, so
+        # creation is serialized by _rows_lock, which snapshot() holds while
+        # it iterates the table.
+        if state not in self.q:
+            with self._rows_lock:
+                state = self._canonical(state)
+                self.q.setdefault(state, {a: 0.0 for a in self.actions})
+
+    def snapshot(self):
+        with self._rows_lock:
+            return super().snapshot()
+
+    def select_action(self, state):
+        with self.lock.read_locked():
+            return super().select_action(state)
+
+    def select_actions(self, states):
+        with self.lock.read_locked():
+            return super().select_actions(states)
+
+    def top_actions(self, state, k=2):
+        with self.lock.read_locked():
+            return super().top_actions(state, k)
+
+    def get_next_best_action(self, state):
+        with self.lock.read_locked():
+            return super().get_next_best_action(state)
+
+    def get_action_confidence(self, state, action):
+        with self.lock.read_locked():
+            return super().get_action_confidence(state, action)
+
+    def get_confidence_details(self, state, action):
+        with self.lock.read_locked():
+            return super().get_confidence_details(state, action)
+
+    def suggest_followup_task(self, current_state, current_action):
+        with self.lock.read_locked():
+            return super().suggest_followup_task(current_state, current_action)
+
+    def update_q_table(self, state, action, reward, next_state):
+        with self.lock.write_locked():
+            super().update_q_table(state, action, reward, next_state)
+
+    def update_q_with_correction(self, state, wrong_action, correct_action, penalty=-1, bonus=2):
+        with self.lock.write_locked():
+            super().update_q_with_correction(state, wrong_action, correct_action, penalty, bonus)
+
+    def save_q_table(self, path=None):
+        """Queue a save of the shared table, or snapshot synchronously to another path"""
+        if path is None or os.path.abspath(path) == os.path.abspath(self.q_path):
+            if hasattr(self, "writer"):
+                self.writer.request_save()
+            return
+        with self.lock.read_locked():
+            snapshot = self.snapshot()
+        self.write_snapshot(snapshot, path)
+
+    def load_q_table(self, path=None):
+        with self.lock.write_locked():
+            super().load_q_table(path)
+
+_shared_agents = {}
+_shared_agents_lock = threading.Lock()
+
+def get_shared_agent(actions, q_path="data/q_table.pkl", **kwargs):
+    """Return the process-wide ConcurrentQLearningAgent for `q_path`, creating it once.
+
+    `kwargs` (alpha, mode, bandit_step, ...) only apply when the agent is created.
+    """
+    key = os.path.abspath(q_path)
+    with _shared_agents_lock:
+        agent = _shared_agents.get(key)
+        if agent is None:
+            agent = ConcurrentQLearningAgent(actions, q_path=q_path, **kwargs)
+            _shared_agents[key] = agent
+        return agent
@@ -0,0 +1,346 @@
+"""
+In-process event bus
+
+The agent, feedback and logger modules report what happened as typed events
+instead of printing. Whoever runs the agent attaches subscribers for that
+run: a pretty or quiet console, a JSON-lines file, a metrics counter. Each
+subscriber has a level filter and writes from its own thread, so terminal and
+file I/O stay off the caller's path; flush() drains them before an
+interactive prompt. Until a subscriber that shows events to the user (a
+console) is attached, warnings and errors still go to stderr; counters and
+files alone do not silence them.
+
+Usage:
+    from agent import events
+    events.bus.subscribe(events.ConsoleSubscriber())
+    events.bus.subscribe(events.FileSubscriber("data/events.jsonl", level=events.DEBUG))
+"""
+
+import atexit
+import json
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+class Event:
+    """Base class. Subclasses set `kind`, `level` and a `template` for the pretty console."""
+
+    kind = "event"
+    level = INFO
+    template = ""
+
+    def __init__(self, **fields):
+        self.time = time.time()
+        self.__dict__.update(fields)
+
+    def fields(self):
+        return {key: value for key, value in vars(self).items() if key != "time"}
+
+    def pretty(self):
+        return self.template.format(**self.fields())
+
+    def summary(self):
+        details = " ".join(f"{key}={value}" for key, value in self.fields().items())
+        return f"[{LEVEL_NAMES.get(self.level, self.level)}] {self.kind} {details}".rstrip()
+
+    def as_dict(self):
+        return {"time": self.time, "kind": self.kind, "level": LEVEL_NAMES.get(self.level, self.level),
+                **self.fields()}
+
+# Agent core
+class QTableLoaded(Event):
+    kind, level = "q_table_loaded", INFO
+    template = "✅ Q-table loaded from {path} with {states} states"
+
+class QTableLoadFailed(Event):
+    kind, level = "q_table_load_failed", WARNING
+    template = "⚠️  Failed to load Q-table from {path}: {error}\nStarting with fresh Q-table"
+
+class QTableMissing(Event):
+    kind, level = "q_table_missing", INFO
+    template = "No existing Q-table found at {path}. Starting fresh."
+
+class LinearWeightsLoaded(Event):
+    kind, level = "linear_weights_loaded", INFO
+    template = "✅ Linear Q weights loaded from {path} ({features} features)"
+
+class QTableSaved(Event):
+    kind, level = "q_table_saved", DEBUG
+    template = "💾 Q-table saved to {path}"
+
+class QTableSaveFailed(Event):
+    kind, level = "q_table_save_failed", ERROR
+    template = "⚠️  Background Q-table save failed: {error}"
+
+class CsvExportFailed(Event):
+    kind, level = "csv_export_failed", WARNING
+    template = "Warning: Could not save CSV version: {error}"
+
+class QValueUpdated(Event):
+    kind, level = "q_value_updated", DEBUG
+    template = "🔁 Q({state}, {action}): {old:.3f} -> {new:.3f} (reward {reward})"
+
+class CorrectionApplied(Event):
+    kind, level = "correction_applied", INFO
+    template = "✅ Q-table updated: {correct_action} rewarded (+{bonus}), {wrong_action} penalized ({penalty})"
+
+class Notice(Event):
+    """Progress text from an entry point: banners, summaries"""
+    kind, level = "notice", INFO
+    template = "{text}"
+
+class TaskFileMissing(Event):
+    kind, level = "task_file_missing", WARNING
+    template = "⚠️  Task file not found: {path}"
+
+# Q-table service
+class ServiceStarted(Event):
+    kind, level = "service_started", INFO
+    template = "🛰️  Q-table service listening on {address} ({states} states)"
+
+class ServiceStopped(Event):
+    kind, level = "service_stopped", INFO
+    template = "🛑 Q-table service stopped"
+
+class ServiceConnected(Event):
+    kind, level = "service_connected", INFO
+    template = "🛰️  Connected to Q-table service at {address}"
+
+class ServiceUnavailable(Event):
+    kind, level = "service_unavailable", WARNING
+    template = "⚠️  Q-table service unavailable at {address} ({error}); using local Q-table"
+
+# Feedback
+class FeedbackRecorded(Event):
+    kind, level = "feedback_recorded", INFO
+    template = "{message}"
+
+class FollowupAnswered(Event):
+    kind, level = "followup_answered", INFO
+    template = "{message}"
+
+# Episode loop and logger
+class TaskDecided(Event):
+    kind, level = "task_decided", INFO
+    template = ("\n📋 TASK {task_index} (Episode {episode})\n" + "-" * 40 + "\n"
+                "Task: {task}\n"
+                "🎯 Agent's Action: {action}\n"
+                "📈 Confidence Score: {confidence:.3f}\n"
+                "💡 Next Best Option: {next_best}\n"
+                "🧠 Q-Value Details: Chosen={chosen_q:.2f}, Mean Others={mean_other_q:.2f}\n" + "-" * 40)
+
+class TaskRewarded(Event):
+    kind, level = "task_rewarded", INFO
+    template = "🏆 Episode {episode} Reward so far: {total_reward} (Task: {task_reward})"
+
+class TaskLogged(Event):
+    kind, level = "task_logged", DEBUG
+    template = "📝 Task {task_id} logged to {path}"
+
+class TaskLogCreated(Event):
+    kind, level = "task_log_created", INFO
+    template = ("✅ Created comprehensive task log with {entries} diverse entries at {path}\n"
+                "   📊 Task categories: Communication, Media, Productivity, System\n"
+                "   ⏰ Time span: 7 days with realistic clustering")
+
+class EpisodeStarted(Event):
+    kind, level = "episode_started", INFO
+    template = "\n🏁 Starting Episode {episode}\n" + "=" * 60
+
+class EpisodeCompleted(Event):
+    kind, level = "episode_completed", INFO
+    template = ("\n✅ Episode {episode} Complete!\nTotal Reward: {total_reward}\n"
+                "Duration: {duration:.1f} seconds\n" + "=" * 60)
+
+class Subscriber:
+    """Receives every event at or above `level`; handle() runs on the emitting thread.
+
+    `displays` marks subscribers that show events to the user. While none is
+    attached, the bus's fallback keeps reporting alongside the others.
+    """
+
+    displays = False
+
+    def __init__(self, level=INFO):
+        self.level = level
+
+    def handle(self, event):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+class AsyncSubscriber(Subscriber):
+    """Subscriber whose output is written by a background thread, in event order"""
+
+    _STOP = object()
+
+    def __init__(self, level=INFO):
+        super().__init__(level)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def handle(self, event):
+        self._queue.put(event)
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            try:
+                if event is self._STOP:
+                    return
+                self.write(event)
+            except Exception:
+                pass  # A broken sink must not take the agent down
+            finally:
+                self._queue.task_done()
+
+    def write(self, event):
+        raise NotImplementedError
+
+    def flush(self):
+        """Block until every event handled so far has been written"""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+class ConsoleSubscriber(AsyncSubscriber):
+    """Prints events: the decorated messages (pretty) or one line per event"""
+
+    displays = True
+
+    def __init__(self, level=INFO, pretty=True, stream=None):
+        self.pretty = pretty
+        self.stream = stream or sys.stdout
+        super().__init__(level)
+
+    def write(self, event):
+        self.stream.write((event.pretty() if self.pretty else event.summary()) + "\n")
+        self.stream.flush()
+
+def quiet_console(level=WARNING):
+    """Console that only reports problems, one line each"""
+    return ConsoleSubscriber(level=level, pretty=False)
+
+class FileSubscriber(AsyncSubscriber):
+    """Appends events to `path` as JSON lines"""
+
+    def __init__(self, path, level=DEBUG):
+        self.file = open(path, "a", encoding="utf-8")
+        super().__init__(level)
+
+    def write(self, event):
+        self.file.write(json.dumps(event.as_dict(), default=str) + "\n")
+
+    def flush(self):
+        super().flush()
+        self.file.flush()
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+class StderrSubscriber(Subscriber):
+    """Writes events to stderr on the emitting thread; the bus's fallback while no console is subscribed"""
+
+    displays = True
+
+    def __init__(self, level=WARNING):
+        super().__init__(level)
+
+    def handle(self, event):
+        sys.stderr.write(event.pretty() + "\n")
+        sys.stderr.flush()
+
+class MetricsSubscriber(Subscriber):
+    """Counts events by kind; cheap enough to run synchronously"""
+
+    def __init__(self, level=DEBUG):
+        super().__init__(level)
+        self.counts = Counter()
+
+    def handle(self, event):
+        self.counts[event.kind] += 1
+
+class EventBus:
+    """Fans events out to subscribers; `fallback` also gets them while none of them displays events"""
+
+    def __init__(self, fallback=None):
+        self.subscribers = []
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        self._update_level()
+
+    def subscribe(self, subscriber):
+        with self._lock:
+            self.subscribers = self.subscribers + [subscriber]
+            self._update_level()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self.subscribers = [s for s in self.subscribers if s is not subscriber]
+            self._update_level()
+        subscriber.close()
+
+    def _update_level(self):
+        displayed = any(s.displays for s in self.subscribers)
+        self.targets = self.subscribers + ([self.fallback] if self.fallback is not None and not displayed else [])
+        self.min_level = min((s.level for s in self.targets), default=ERROR + 1)
+
+    def enabled(self, level):
+        """True if any subscriber wants events at `level`; guard costly events with it"""
+        return level >= self.min_level
+
+    def emit(self, event):
+        if event.level < self.min_level:
+            return
+        for subscriber in self.targets:
+            if event.level >= subscriber.level:
+                subscriber.handle(event)
+
+    def flush(self):
+        for subscriber in self.subscribers:
+            subscriber.flush()
+
+    def close(self):
+        for subscriber in list(self.subscribers):
+            self.unsubscribe(subscriber)
+
+bus = EventBus(fallback=StderrSubscriber())
+atexit.register(bus.close)
+
+def emit(event):
+    bus.emit(event)
+
+def enabled(level):
+    return bus.enabled(level)
+
+def flush():
+    bus.flush()
+
+def notice(*lines):
+    """Report progress text (banners, summaries) as an INFO event, so quiet consoles skip it"""
+    emit(Notice(text="\n".join(str(line) for line in lines)))
+
+def say(*lines):
+    """Print directly (prompts, banners) after any queued console output, keeping the order"""
+    bus.flush()
+    print("\n".join(str(line) for line in lines))
+
+def attach_console(quiet=False):
+    """Subscribe this run's console: the decorated output, or quiet_console()"""
+    return bus.subscribe(quiet_console() if quiet else ConsoleSubscriber())
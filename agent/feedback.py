@@ -1,83 +1,102 @@
+from agent import events, tracing
+
+_say = events.say
+
+def _ask(prompt):
+    events.flush()
+    return input(prompt)
+
+def _recorded(message, **fields):
+    events.emit(events.FeedbackRecorded(message=message, **fields))
+
 def get_feedback():
     """Enhanced feedback system with clear 👍/👎 interface and real-time feedback loop"""
-    print("\n" + "="*50)
-    print("   USER FEEDBACK REQUIRED")
-    print("="*50)
-    print("Was the agent's action correct?")
-    print("👍 = Correct action (type: 1, y, yes, or 👍)")
-    print("👎 = Incorrect action (type: 2, n, no, or 👎)")
-    print("-"*50)
+    _say("\n" + "="*50,
+         "   USER FEEDBACK REQUIRED",
+         "="*50,
+         "Was the agent's action correct?",
+         "👍 = Correct action (type: 1, y, yes, or 👍)",
+         "👎 = Incorrect action (type: 2, n, no, or 👎)",
+         "-"*50)
     
     while True:
-        fb = input("Your feedback: ").strip().lower()
+        fb = _ask("Your feedback: ").strip().lower()
         
         # Positive feedback options
         if fb in ("1", "y", "yes", "👍", "correct", "good", "right"):
-            print("✅ Positive feedback recorded!")
+            _recorded("✅ Positive feedback recorded!", feedback="👍")
             return "👍", None
         
         # Negative feedback options
         elif fb in ("2", "n", "no", "👎", "incorrect", "wrong", "bad"):
-            print("❌ Negative feedback recorded.")
-            print("💡 What action should have been taken?")
-            correction = input("Enter the correct action: ").strip()
+            _recorded("❌ Negative feedback recorded.", feedback="👎")
+            _say("💡 What action should have been taken?")
+            correction = _ask("Enter the correct action: ").strip()
             if correction:
-                print(f"📝 Correction recorded: {correction}")
+                _recorded(f"📝 Correction recorded: {correction}", feedback="👎", correction=correction)
                 return "👎", correction
             else:
-                print("⚠️ No correction provided")
+                _recorded("⚠️ No correction provided", feedback="👎")
                 return "👎", None
         
         # Invalid input
         else:
-            print("⚠️  Invalid input! Please use:")
-            print("   • 👍, 1, y, yes for correct")
-            print("   • 👎, 2, n, no for incorrect")
+            _say("⚠️  Invalid input! Please use:",
+                 "   • 👍, 1, y, yes for correct",
+                 "   • 👎, 2, n, no for incorrect")
             continue
 
-def get_feedback_with_correction(agent, state, action):
-    """Enhanced feedback system with follow-up suggestions and Q-table correction"""
-    print("\n" + "="*50)
-    print("   USER FEEDBACK REQUIRED")
-    print("="*50)
-    print(f"Agent's action for '{state}': {action}")
-    print("Was this action correct?")
-    print("👍 = Correct action (type: 1, y, yes, or 👍)")
-    print("👎 = Incorrect action (type: 2, n, no, or 👎)")
-    print("-"*50)
+def get_feedback_with_correction(agent, state, action, followup_action=None, apply_correction=True):
+    """Enhanced feedback system with follow-up suggestions and Q-table correction
+
+    `followup_action` may be passed in when the caller has already computed the
+    follow-up suggestion (e.g. speculatively while waiting for the user).
+    With apply_correction=False the correction is only returned, for callers
+    that must apply it on their own thread (agent.pipeline).
+    """
+    _say("\n" + "="*50,
+         "   USER FEEDBACK REQUIRED",
+         "="*50,
+         f"Agent's action for '{state}': {action}",
+         "Was this action correct?",
+         "👍 = Correct action (type: 1, y, yes, or 👍)",
+         "👎 = Incorrect action (type: 2, n, no, or 👎)",
+         "-"*50)
     
     # Get initial feedback
     feedback, correction = None, None
     while feedback is None:
-        fb = input("Your feedback: ").strip().lower()
+        fb = _ask("Your feedback: ").strip().lower()
         
         if fb in ("1", "y", "yes", "👍", "correct", "good", "right"):
-            print("✅ Positive feedback recorded!")
+            _recorded("✅ Positive feedback recorded!", state=state, action=action, feedback="👍")
             feedback = "👍"
         elif fb in ("2", "n", "no", "👎", "incorrect", "wrong", "bad"):
-            print("❌ Negative feedback recorded.")
-            print("💡 CORRECTION REQUIRED: What action should have been taken?")
-            print(f"   Available actions: {', '.join(agent.actions)}")
+            _recorded("❌ Negative feedback recorded.", state=state, action=action, feedback="👎")
+            _say("💡 CORRECTION REQUIRED: What action should have been taken?",
+                 f"   Available actions: {', '.join(agent.actions)}")
             
             # Mandatory correction prompt with validation
             while not correction:
-                correction = input("Enter the correct action: ").strip().lower()
+                correction = _ask("Enter the correct action: ").strip().lower()
                 if correction in agent.actions:
-                    print(f"📝 Correction recorded: {correction}")
+                    _recorded(f"📝 Correction recorded: {correction}", state=state, action=action,
+                              feedback="👎", correction=correction)
                     # Update Q-table with correction immediately
-                    if hasattr(agent, 'update_q_with_correction'):
+                    if apply_correction and hasattr(agent, 'update_q_with_correction'):
                         agent.update_q_with_correction(state, action, correction)
-                    print(f"✅ Q-table updated with correction (+1 bonus reward)")
+                        _recorded("✅ Q-table updated with correction (+1 bonus reward)", state=state, action=action,
+                                  feedback="👎", correction=correction)
                     break
                 elif correction:
-                    print(f"⚠️ Invalid action '{correction}'. Choose from: {', '.join(agent.actions)}")
+                    _say(f"⚠️ Invalid action '{correction}'. Choose from: {', '.join(agent.actions)}")
                     correction = None
                 else:
-                    print("⚠️ Correction cannot be empty. Please provide the correct action.")
+                    _say("⚠️ Correction cannot be empty. Please provide the correct action.")
             
             feedback = "👎"
         else:
-            print("⚠️  Invalid input! Please use 👍 or 👎")
+            _say("⚠️  Invalid input! Please use 👍 or 👎")
             continue
     
     # Generate follow-up suggestion for successful tasks
@@ -85,23 +104,27 @@ def get_feedback_with_correction(agent, state, action):
     followup_accepted = False
     followup_reward = 0
     
-    if feedback == "👍" and hasattr(agent, 'suggest_followup_task'):
-        followup_action = agent.suggest_followup_task(state, action)
+    if feedback == "👍" and (followup_action or hasattr(agent, 'suggest_followup_task')):
+        if not followup_action:
+            with tracing.span("followup_suggestion"):
+                followup_action = agent.suggest_followup_task(state, action)
         followup_task = f"{followup_action} (logical next step after {action})"
         
-        print(f"\n🚀 Follow-up suggestion: {followup_task}")
-        print("This suggestion is based on learned task sequences and Q-values.")
+        _say(f"\n🚀 Follow-up suggestion: {followup_task}",
+             "This suggestion is based on learned task sequences and Q-values.")
         
-        accept_input = input("Would you like to try this follow-up task? (y/n): ").strip().lower()
+        accept_input = _ask("Would you like to try this follow-up task? (y/n): ").strip().lower()
         
         if accept_input in ('y', 'yes', '1', 'ok', 'sure'):
             followup_accepted = True
             followup_reward = agent.calculate_followup_reward(True)
-            print(f"✅ Follow-up accepted! Bonus reward: +{followup_reward}")
+            message = f"✅ Follow-up accepted! Bonus reward: +{followup_reward}"
         else:
             followup_accepted = False
             followup_reward = 0  # No penalty for declining
-            print("📝 Follow-up declined - no penalty applied.")
+            message = "📝 Follow-up declined - no penalty applied."
+        events.emit(events.FollowupAnswered(message=message, followup_task=followup_task,
+                                            accepted=followup_accepted, reward=followup_reward))
     
     # Provide correction bonus reward
     correction_reward = 1 if correction else 0
@@ -109,11 +132,19 @@ def get_feedback_with_correction(agent, state, action):
     
     return feedback, correction, followup_task, followup_accepted, total_followup_reward
 
+def score_feedback(feedback):
+    """Map 👍/👎 feedback to (base_reward, feedback_text)"""
+    if feedback == "👍":
+        return 2, "👍 Correct"
+    elif feedback == "👎":
+        return -2, "👎 Incorrect"
+    return 0, "Neutral"
+
 def get_confidence_score():
     """Get confidence score from user for action evaluation"""
     while True:
         try:
-            confidence = input("Rate agent confidence (1-10, or press Enter for auto): ").strip()
+            confidence = _ask("Rate agent confidence (1-10, or press Enter for auto): ").strip()
             if not confidence:
                 import random
                 return round(random.uniform(0.5, 1.0), 2)
@@ -122,6 +153,6 @@ def get_confidence_score():
             if 1 <= score <= 10:
                 return score / 10  # Normalize to 0-1 range
             else:
-                print("⚠️  Please enter a number between 1-10")
+                _say("⚠️  Please enter a number between 1-10")
         except ValueError:
-            print("⚠️  Please enter a valid number")
+            _say("⚠️  Please enter a valid number")
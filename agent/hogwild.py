@@ -0,0 +1,193 @@
+"""
+Hogwild-style parallel training on a shared-memory Q array
+
+Simulated training in the demos runs on one core. train_hogwild puts a dense
+(intents x actions) Q array in multiprocessing.shared_memory and starts N
+worker processes; each runs episodes against its own SimulatedUser stream and
+writes to the shared array directly. Updates touch one or two cells of one
+row, so lock-free (Hogwild) writes rarely collide; lock="striped" guards each
+row with one of a few locks instead. The coordinator process only watches
+progress and writes snapshots, so throughput scales with the number of cores.
+
+Usage:
+    python -m agent.hogwild --workers 8 --episodes 5000 --out data/hogwild_q_table.pkl
+    python -m agent.hogwild --workers 4 --lock striped --init data/q_table.pkl --out data/q_table.pkl
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import time
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from agent.q_learning import read_q_snapshot, write_q_snapshot
+from agent.simulation import CORRECTION_BONUS, CORRECTION_PENALTY, DEFAULT_ACTIONS, SimulatedUser
+
+LOCK_MODES = ("none", "striped")
+
+class _NoLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+def _worker(worker_id, shm_name, shape, progress, locks, config):
+    """Run config["episodes"] episodes against the shared array (child process entry point)"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        q = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        user = SimulatedUser(config["actions"], config["oracle"], noise=config["noise"],
+                             correction_rate=config["correction_rate"], seed=config["seed"] + worker_id)
+        rng = np.random.default_rng(config["seed"] + 10_000 + worker_id)
+        alpha, epsilon = config["alpha"], config["epsilon"]
+        gamma = 0.0 if config["mode"] == "bandit" else config["gamma"]
+        no_lock = _NoLock()
+        n_actions = shape[1]
+        tasks = config["tasks_per_episode"]
+        steps = correct = 0
+
+        for _ in range(config["episodes"]):
+            # Draw the episode's randomness in bulk; only the updates are scalar
+            intents = user.sample_intents(tasks)
+            explore = rng.random(tasks) < epsilon
+            random_actions = rng.integers(n_actions, size=tasks)
+            for s, explore_now, random_action in zip(intents.tolist(), explore.tolist(), random_actions.tolist()):
+                row = q[s]
+                a = random_action if explore_now else int(row.argmax())
+                reward, correction = user.respond(s, a)
+                with locks[s % len(locks)] if locks else no_lock:
+                    # Callers update with next_state == state, as in the interactive loop
+                    q[s, a] += alpha * (reward + gamma * row.max() - q[s, a])
+                    if correction >= 0:
+                        q[s, a] += CORRECTION_PENALTY
+                        q[s, correction] += CORRECTION_BONUS
+                correct += reward > 0
+            steps += tasks
+            # Each worker owns its own progress slots, so these writes never contend
+            progress[2 * worker_id] = steps
+            progress[2 * worker_id + 1] = correct
+    finally:
+        shm.close()
+
+def matrix_to_table(q, intents, actions, base=None):
+    """{state: {action: value}} for the trained rows, merged into a copy of `base`.
+
+    States and actions of `base` that the oracle does not cover are kept as they are.
+    """
+    table = {state: dict(row) for state, row in (base or {}).items()}
+    for intent, row in zip(intents, q.tolist()):
+        table.setdefault(intent, {}).update(zip(actions, row))
+    return table
+
+def train_hogwild(actions=DEFAULT_ACTIONS, oracle=None, workers=None, episodes=1000, tasks_per_episode=8,
+                  alpha=0.2, gamma=0.9, epsilon=0.2, mode="q_learning", noise=0.0, correction_rate=1.0,
+                  lock="none", stripes=16, q_init=None, q_path=None, snapshot_interval=1.0, seed=0):
+    """Train with `workers` processes (default: one per core), each running `episodes` episodes.
+
+    q_init is an optional {state: {action: value}} table to start from; only
+    the oracle's intents are trained, and every other row of q_init is carried
+    into the result unchanged. If q_path is given, a snapshot is written there
+    every snapshot_interval seconds and once at the end. Returns (table, stats).
+    """
+    if lock not in LOCK_MODES:
+        raise ValueError(f"lock must be one of {LOCK_MODES}, got {lock!r}")
+    user = SimulatedUser(actions, oracle)
+    intents, actions = user.intents, user.actions
+    workers = workers or os.cpu_count() or 1
+    shape = (len(intents), len(actions))
+    config = {
+        "actions": actions, "oracle": oracle, "episodes": episodes, "tasks_per_episode": tasks_per_episode,
+        "alpha": alpha, "gamma": gamma, "epsilon": epsilon, "mode": mode, "noise": noise,
+        "correction_rate": correction_rate, "seed": seed,
+    }
+
+    ctx = mp.get_context("spawn")
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+    try:
+        q = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        q[:] = 0.0
+        for i, intent in enumerate(intents):
+            for j, action in enumerate(actions):
+                q[i, j] = (q_init or {}).get(intent, {}).get(action, 0.0)
+
+        progress = ctx.RawArray("q", 2 * workers)
+        locks = [ctx.Lock() for _ in range(stripes)] if lock == "striped" else None
+        processes = [ctx.Process(target=_worker, args=(i, shm.name, shape, progress, locks, config), daemon=True)
+                     for i in range(workers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+
+        # Coordinator: snapshot periodically until every worker is done
+        alive = processes
+        last_snapshot = start
+        while alive:
+            wait([process.sentinel for process in alive], timeout=snapshot_interval)
+            alive = [process for process in alive if process.is_alive()]
+            if q_path and alive and time.perf_counter() - last_snapshot >= snapshot_interval:
+                write_q_snapshot(matrix_to_table(q.copy(), intents, actions, q_init), q_path)
+                last_snapshot = time.perf_counter()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        failed = [i for i, process in enumerate(processes) if process.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"Hogwild workers {failed} exited with an error")
+        final = q.copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    table = matrix_to_table(final, intents, actions, q_init)
+    if q_path:
+        write_q_snapshot(table, q_path)
+    steps = sum(progress[0::2])
+    stats = {
+        "workers": workers,
+        "steps": steps,
+        "seconds": elapsed,
+        "steps_per_second": steps / elapsed if elapsed else 0.0,
+        "accuracy": sum(progress[1::2]) / steps if steps else 0.0,
+        "greedy_accuracy": float(np.mean(final.argmax(axis=1) == user.correct)),
+    }
+    return table, stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a Q-table with parallel simulated users")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core)")
+    parser.add_argument("--episodes", type=int, default=1000, help="Episodes per worker")
+    parser.add_argument("--tasks-per-episode", type=int, default=8)
+    parser.add_argument("--alpha", type=float, default=0.2)
+    parser.add_argument("--gamma", type=float, default=0.9)
+    parser.add_argument("--epsilon", type=float, default=0.2)
+    parser.add_argument("--mode", choices=["q_learning", "bandit"], default="q_learning")
+    parser.add_argument("--noise", type=float, default=0.0, help="Probability a feedback answer is flipped")
+    parser.add_argument("--correction-rate", type=float, default=1.0)
+    parser.add_argument("--lock", choices=LOCK_MODES, default="none", help="none = lock-free Hogwild updates")
+    parser.add_argument("--stripes", type=int, default=16)
+    parser.add_argument("--snapshot-interval", type=float, default=1.0)
+    parser.add_argument("--init", help="Existing Q-table pickle to start from")
+    parser.add_argument("--out", default="data/hogwild_q_table.pkl",
+                        help="Snapshot to write (pass data/q_table.pkl explicitly to replace the live table)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    q_init = read_q_snapshot(args.init) if args.init and os.path.exists(args.init) else None
+    table, stats = train_hogwild(DEFAULT_ACTIONS, workers=args.workers, episodes=args.episodes,
+                                 tasks_per_episode=args.tasks_per_episode, alpha=args.alpha, gamma=args.gamma,
+                                 epsilon=args.epsilon, mode=args.mode, noise=args.noise,
+                                 correction_rate=args.correction_rate, lock=args.lock, stripes=args.stripes,
+                                 q_init=q_init, q_path=args.out, snapshot_interval=args.snapshot_interval,
+                                 seed=args.seed)
+    print(f"✅ {stats['steps']} steps on {stats['workers']} workers in {stats['seconds']:.2f}s "
+          f"({stats['steps_per_second']:,.0f} steps/s)")
+    print(f"🎯 Training accuracy {stats['accuracy']:.1%}, greedy accuracy {stats['greedy_accuracy']:.1%}; "
+          f"{len(table)} states written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+String interning for states and actions
+
+States are arbitrary strings, including composites such as
+f"{state}_completed" built by suggest_followup_task. An Interner maps each
+distinct string to a dense integer ID once, at the boundary, and hands back a
+single canonical (sys.intern'd) string object for it. Replay buffers, the
+offline trainer and Q-table snapshots carry the integer IDs; the snapshot
+persists the string maps next to the values.
+"""
+
+import sys
+
+class Interner:
+    """Dense integer IDs for strings, assigned in first-seen order"""
+
+    def __init__(self, names=()):
+        self.ids = {}
+        self.names = []
+        for name in names:
+            self.intern(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def intern(self, name):
+        """ID for `name`, assigning the next free one on first sight"""
+        name_id = self.ids.get(name)
+        if name_id is None:
+            if type(name) is str:
+                name = sys.intern(name)
+            name_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def get(self, name, default=None):
+        return self.ids.get(name, default)
+
+    def canonical(self, name):
+        """The one shared string object for `name`"""
+        return self.names[self.intern(name)]
+
+    def name(self, name_id):
+        return self.names[name_id]
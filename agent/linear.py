@@ -0,0 +1,178 @@
+"""
+Hashed-feature linear Q approximation
+
+A Q-table keeps one row per distinct state string, so every new phrasing of a
+task starts from zero and the table grows with the vocabulary.
+HashedLinearQAgent scores the task text instead: its word unigrams and
+bigrams (plus a bias feature) are hashed into `n_features` signed buckets,
+and Q(s, a) = w_a . x(s). Memory is fixed at n_actions x n_features weights,
+and tasks that share words share what was learned.
+
+The agent keeps the QLearningAgent API. Every write becomes a normalized SGD
+step that moves Q(s, a) to the value the tabular update would have stored,
+and score_batch/greedy_actions score many tasks in one NumPy pass.
+
+Usage:
+    from agent.linear import HashedLinearQAgent
+    agent = HashedLinearQAgent(actions, q_path="data/linear_q.npz")
+    state = agent.parse_state("open the browser")
+    action = agent.select_action(state)
+"""
+
+import os
+import random
+import re
+import tempfile
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from agent import events, metrics, tracing
+from agent.q_learning import QLearningAgent
+
+LINEAR_FORMAT = "hashed-linear-v1"
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+@lru_cache(maxsize=4096)
+def hashed_features(text, n_features, ngrams=2):
+    """Sparse unit-norm feature vector of `text` as (indices, values) arrays.
+
+    Features are a bias term plus every word n-gram up to `ngrams` words,
+    hashed with CRC32 (stable across processes, unlike hash()). One hash bit
+    picks the sign so colliding features tend to cancel instead of add up.
+    """
+    tokens = tokenize(text)
+    grams = [""]  # Bias feature, shared by every state
+    for n in range(1, ngrams + 1):
+        grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    hashes = np.array([zlib.crc32(gram.encode("utf-8")) for gram in grams], dtype=np.int64)
+    signs = np.where(hashes & (1 << 31), -1.0, 1.0)
+    indices, inverse = np.unique(hashes % n_features, return_inverse=True)
+    values = np.bincount(inverse, weights=signs, minlength=len(indices))
+    norm = np.sqrt(values @ values)
+    if norm == 0:  # Every feature cancelled out in a collision
+        return indices[:1], np.ones(1)
+    values /= norm
+    indices.flags.writeable = values.flags.writeable = False  # Shared through the cache
+    return indices, values
+
+class HashedLinearQAgent(QLearningAgent):
+    """QLearningAgent whose Q-values come from hashed text features and linear weights.
+
+    States are task texts; parse_state keeps the whole task instead of only
+    its first word so that the features have something to generalize from.
+    `q` stays empty: there are no rows, only `weights`.
+    """
+
+    def __init__(self, actions, alpha=0.2, gamma=0.9, epsilon=0.2, q_path="data/linear_q.npz", autosave=True,
+                 mode="q_learning", bandit_step="constant", n_features=2 ** 16, ngrams=2, learning_rate=1.0):
+        self.n_features = n_features
+        self.ngrams = ngrams
+        self.learning_rate = learning_rate  # 1.0 moves Q(s, a) exactly to each target
+        self.weights = np.zeros((len(actions), n_features))
+        super().__init__(actions, alpha=alpha, gamma=gamma, epsilon=epsilon, q_path=q_path, autosave=autosave,
+                         mode=mode, bandit_step=bandit_step)
+
+    def parse_state(self, task):
+        return " ".join(tokenize(task)) if task else "open"
+
+    def features(self, state):
+        return hashed_features(state, self.n_features, self.ngrams)
+
+    def _ensure_state(self, state):
+        pass  # Every state already has values
+
+    def _scores(self, state):
+        indices, values = self.features(state)
+        return self.weights[:, indices] @ values
+
+    def _row(self, state):
+        return dict(zip(self.actions, self._scores(state).tolist()))
+
+    def _leaders_of(self, state):
+        scores = self._scores(state)
+        order = np.argsort(-scores, kind="stable")[:2]  # Ties go to the earlier action
+        best = order[0]
+        runner_up = order[1] if len(order) > 1 else None
+        return [None, self.actions[best], float(scores[best]),
+                None if runner_up is None else self.actions[runner_up],
+                0.0 if runner_up is None else float(scores[runner_up])]
+
+    _scan_leaders = _leaders_of
+
+    def _set_q(self, state, action, value):
+        """SGD step on w_action that moves Q(state, action) towards `value`"""
+        indices, values = self.features(state)
+        a = self.action_index.ids[action]
+        error = value - self.weights[a, indices] @ values
+        # Features have unit norm, so a step of `error` lands exactly on the target
+        self.weights[a, indices] += self.learning_rate * error * values
+
+    def score_batch(self, states):
+        """Q-values for many states at once, as an (n_states, n_actions) array"""
+        if not states:
+            return np.zeros((0, len(self.actions)))
+        features = [self.features(state) for state in states]
+        indices = np.concatenate([f[0] for f in features])
+        values = np.concatenate([f[1] for f in features])
+        # Every state has at least one feature, so no segment is empty
+        offsets = np.cumsum([0] + [len(f[0]) for f in features[:-1]])
+        return np.add.reduceat(self.weights[:, indices] * values, offsets, axis=1).T
+
+    def greedy_actions(self, states):
+        """Epsilon-greedy action for each state, scored in one pass"""
+        best = np.argmax(self.score_batch(states), axis=1)
+        return [random.choice(self.actions) if random.random() < self.epsilon else self.actions[i]
+                for i in best]
+
+    select_actions = greedy_actions
+
+    def snapshot(self):
+        return self.weights.copy()
+
+    @metrics.timed("save_q_table_seconds", "QLearningAgent.save_q_table latency")
+    def save_q_table(self, path=None):
+        with tracing.span("persistence", path=path or self.q_path):
+            self.write_snapshot(self.weights, path)
+
+    def write_snapshot(self, snapshot, path=None):
+        """Write the weights to `path` (.npz), atomically like write_q_snapshot"""
+        path = path or self.q_path
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, format=LINEAR_FORMAT, weights=snapshot, actions=np.array(self.actions),
+                         ngrams=self.ngrams)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def load_q_table(self, path=None):
+        """Load weights saved by write_snapshot; mismatched shapes or actions start fresh"""
+        path = path or self.q_path
+        self.q = {}
+        if not os.path.exists(path):
+            events.emit(events.QTableMissing(path=path))
+            return
+        try:
+            with np.load(path) as data:
+                if str(data["format"]) != LINEAR_FORMAT:
+                    raise ValueError(f"unsupported format {data['format']}")
+                if list(data["actions"]) != list(self.actions) or int(data["ngrams"]) != self.ngrams:
+                    raise ValueError("saved actions or n-gram size differ from this agent")
+                if data["weights"].shape != self.weights.shape:
+                    raise ValueError(f"saved weights have shape {data['weights'].shape}, "
+                                     f"expected {self.weights.shape}")
+                self.weights = data["weights"].copy()
+            events.emit(events.LinearWeightsLoaded(path=path, features=self.n_features))
+        except Exception as e:
+            events.emit(events.QTableLoadFailed(path=path, error=str(e)))
+            self.weights = np.zeros((len(self.actions), self.n_features))
@@ -3,12 +3,16 @@ import os
 import random
 from datetime import datetime
 
+from agent import events, metrics
+from agent.task_store import TASK_COLUMNS, get_task_store, is_task_store_path
+
+@metrics.timed("log_episode_seconds", "Appending one task row to the task log")
 def log_episode_enhanced(log_path, task_id, intent, action, reward, feedback, suggestion, confidence, 
                         followup_task=None, followup_accepted=False, followup_reward=0, q_details=None):
-    """Enhanced logging with all 12 required fields plus detailed confidence breakdown"""
-    os.makedirs(os.path.dirname(log_path), exist_ok=True)
-    file_exists = os.path.isfile(log_path)
-    
+    """Enhanced logging with all 12 required fields plus detailed confidence breakdown
+
+    A log_path ending in .db writes to the SQLite task-log store (agent.task_store) instead of CSV.
+    """
     timestamp = datetime.now().isoformat(timespec="seconds")
     
     # Ensure confidence is properly calculated (not random)
@@ -34,21 +38,24 @@ def log_episode_enhanced(log_path, task_id, intent, action, reward, feedback, su
         chosen_q = 0
         mean_other_q = 0
     
-    with open(log_path, "a", newline="") as f:
-        w = csv.writer(f)
-        if not file_exists:
-            # All 15+ required fields for comprehensive logging
-            w.writerow([
-                "Task_ID", "Parsed_Intent", "Action_Taken", "Base_Reward", "Total_Reward",
-                "Timestamp", "Confidence_Score", "User_Feedback", "Suggested_Correct_Action", 
-                "Sigmoid_Confidence", "Softmax_Confidence", "Ranking_Confidence", "Follow_up_Task", "Follow_up_Accepted", 
-                "Follow_up_Reward", "Chosen_Q_Value", "Mean_Other_Q_Values"
-            ])
-        w.writerow([
-            task_id, intent, action, reward, total_reward, timestamp, confidence, 
-            feedback, suggestion or "", q_value_diff, softmax_conf, ranking_conf, followup_task or "", 
-            followup_accepted, followup_reward, chosen_q, mean_other_q
-        ])
+    row = [
+        task_id, intent, action, reward, total_reward, timestamp, confidence, 
+        feedback, suggestion or "", q_value_diff, softmax_conf, ranking_conf, followup_task or "", 
+        followup_accepted, followup_reward, chosen_q, mean_other_q
+    ]
+    if is_task_store_path(log_path):
+        get_task_store(log_path).add_task(dict(zip(TASK_COLUMNS, row)))
+    else:
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        file_exists = os.path.isfile(log_path)
+        with open(log_path, "a", newline="") as f:
+            w = csv.writer(f)
+            if not file_exists:
+                # All 15+ required fields for comprehensive logging
+                w.writerow(TASK_COLUMNS)
+            w.writerow(row)
+    if events.enabled(events.DEBUG):
+        events.emit(events.TaskLogged(path=log_path, task_id=task_id))
 
 def log_episode(log_path, task_id, intent, action, reward, feedback, suggestion, confidence=None):
     """Backward compatibility wrapper for enhanced logging"""
@@ -112,15 +119,16 @@ def create_comprehensive_task_log(file_path, num_entries=35):
             time_str = current_time.strftime("%I:%M %p")
             f.write(f"{time_str} - {task.title()}\n")
     
-    print(f"✅ Created comprehensive task log with {num_entries} diverse entries at {file_path}")
-    print(f"   📊 Task categories: Communication, Media, Productivity, System")
-    print(f"   ⏰ Time span: 7 days with realistic clustering")
+    events.emit(events.TaskLogCreated(path=file_path, entries=num_entries))
 
 def log_total_reward(episode, total_reward, episode_log_path):
-    """Log total reward for an episode"""
+    """Log total reward for an episode (to the episodes table for a .db path)"""
+    timestamp = datetime.now().isoformat(timespec="seconds")
+    if is_task_store_path(episode_log_path):
+        get_task_store(episode_log_path).add_episode(episode, total_reward, timestamp)
+        return
     os.makedirs(os.path.dirname(episode_log_path), exist_ok=True)
     file_exists = os.path.isfile(episode_log_path)
-    timestamp = datetime.now().isoformat(timespec="seconds")
     
     with open(episode_log_path, "a", newline="") as f:
         w = csv.writer(f)
@@ -1,20 +1,26 @@
 # agent/main.py
 
-from agent.q_learning import QLearningAgent
+from agent.service import connect_or_create_agent
 from agent.logger import log_episode_enhanced, log_total_reward, create_comprehensive_task_log
-from agent.feedback import get_feedback_with_correction, get_confidence_score
+from agent.feedback import get_feedback_with_correction, get_confidence_score, score_feedback
 from agent.visualizer import plot_rewards, create_performance_dashboard, plot_confidence_analysis
+from agent.pipeline import FeedbackPipeline
+from agent import events, tracing
+import argparse
+import asyncio
 import os
 import time
 from datetime import datetime
 
 def print_banner():
     """Print a nice banner for the RL Agent"""
-    print("\n" + "="*60)
-    print("    🤖 REINFORCEMENT LEARNING CONTROLLED AGENT 🤖")
-    print("="*60)
-    print("  Learning from user feedback to improve task execution")
-    print("-"*60)
+    events.notice(
+        "\n" + "="*60,
+        "    🤖 REINFORCEMENT LEARNING CONTROLLED AGENT 🤖",
+        "="*60,
+        "  Learning from user feedback to improve task execution",
+        "-"*60,
+    )
 
 def display_task_info(episode, task_index, task, action, next_best=None):
     """Display task information in a structured format"""
@@ -26,13 +32,121 @@ def display_task_info(episode, task_index, task, action, next_best=None):
         print(f"💡 Next Best Option: {next_best}")
     print("-"*40)
 
-def main():
-    """Main function to run the RL agent with comprehensive logging, feedback, and persistence"""
+def display_decision(episode, task_index, decision):
+    """Report a task decision with confidence and Q-value details"""
+    details = decision["confidence_details"]
+    events.emit(events.TaskDecided(
+        episode=episode, task_index=task_index, task=decision['task'], action=decision['action'],
+        confidence=decision['confidence'], next_best=decision['next_best'],
+        chosen_q=details.get('chosen_q', 0), mean_other_q=details.get('mean_other_q', 0)
+    ))
+
+def display_task_reward(episode, total_reward, task_reward):
+    events.emit(events.TaskRewarded(episode=episode, total_reward=total_reward, task_reward=task_reward))
+
+def run_episode(agent, episode, tasks, task_log_path):
+    """Run one interactive episode sequentially, returning its total reward"""
+    total_reward = 0
+    for task_index, task in enumerate(tasks, 1):
+        with tracing.span("task", episode=episode, task_index=task_index, task=task) as task_span:
+            # Parse intent from task
+            with tracing.span("intent_parse"):
+                parsed_intent = agent.parse_state(task)
+            
+            # Get agent's action and confidence with detailed analysis
+            with tracing.span("select_action"):
+                action = agent.select_action(parsed_intent)
+            with tracing.span("confidence_details"):
+                confidence = agent.get_action_confidence(parsed_intent, action)
+                confidence_details = agent.get_confidence_details(parsed_intent, action)
+                next_best = agent.get_next_best_action(parsed_intent)
+            task_span.set(intent=parsed_intent, action=action)
+            
+            # Display task information with enhanced details
+            display_decision(episode, task_index, {
+                "task": task, "action": action, "confidence": confidence,
+                "next_best": next_best, "confidence_details": confidence_details
+            })
+            
+            # Get enhanced user feedback with correction and follow-up
+            with tracing.span("feedback_wait"):
+                feedback, correction, followup_task, followup_accepted, followup_reward = get_feedback_with_correction(agent, parsed_intent, action)
+            task_id = f"{episode}-{task_index}"
+            
+            # Enhanced reward logic based on feedback
+            base_reward, feedback_text = score_feedback(feedback)
+            
+            # Calculate total reward including followup bonus
+            total_task_reward = base_reward + followup_reward
+            
+            # Update Q-table with base reward
+            with tracing.span("q_update", reward=base_reward):
+                agent.update_q_table(parsed_intent, action, base_reward, parsed_intent)
+            
+            # Enhanced structured logging with all required fields
+            with tracing.span("logging"):
+                log_episode_enhanced(
+                    log_path=task_log_path,
+                    task_id=task_id,
+                    intent=parsed_intent,
+                    action=action,
+                    reward=base_reward,
+                    feedback=feedback_text,
+                    suggestion=correction or "",
+                    confidence=confidence,
+                    followup_task=followup_task,
+                    followup_accepted=followup_accepted,
+                    followup_reward=followup_reward,
+                    q_details=confidence_details
+                )
+            
+            total_reward += total_task_reward
+            display_task_reward(episode, total_reward, total_task_reward)
+            
+            # Small delay for better UX
+            with tracing.span("sleep"):
+                time.sleep(0.5)
+    return total_reward
+
+async def run_episode_async(pipeline, episode, tasks):
+    """Run one episode through the asyncio pipeline and wait for background I/O"""
+    total_reward = await pipeline.run_episode(episode, tasks)
+    await pipeline.drain()
+    return total_reward
+
+def main(use_async=False, quiet=False, event_log=None, trace_path=None, memory=False, log_db=False):
+    """Main function to run the RL agent with comprehensive logging, feedback, and persistence
+
+    With use_async (``python -m agent.main --async``) each episode runs through
+    agent.pipeline.FeedbackPipeline: the next decision is precomputed while the
+    user answers and logging/persistence happen in the background.
+
+    Console output comes from agent.events subscribers: the decorated console
+    by default, only warnings and errors with quiet (``--quiet``), plus every
+    event as JSON lines in `event_log` (``--events PATH``). Banners and
+    summaries are INFO notices, so quiet mode skips them too.
+
+    With trace_path (``--trace PATH``) every episode is recorded as nested
+    spans in a Chrome trace file (see agent.tracing).
+
+    With memory (``--memory``) the Q-table's footprint is sampled after every
+    episode, with tracemalloc diffs, and reported at the end (see agent.memory).
+
+    With log_db (``--log-db``) task and episode records go to the indexed
+    SQLite store data/task_log.db instead of CSV files (see agent.task_store).
+    """
+    events.attach_console(quiet=quiet)
     print_banner()
+    if trace_path:
+        tracing.start(trace_path)
+    if event_log:
+        events.bus.subscribe(events.FileSubscriber(event_log))
     
     # File paths
     task_log_path = os.path.join("data", "comprehensive_task_log.csv")
     episode_log_path = os.path.join("data", "episode_log.csv")
+    if log_db:
+        task_log_path = episode_log_path = os.path.join("data", "task_log.db")
     chart_path = os.path.join("data", "learning_curve.png")
     dashboard_path = os.path.join("data", "performance_dashboard.png")
     confidence_path = os.path.join("data", "confidence_analysis.png")
@@ -40,7 +154,7 @@ def main():
     
     # Create comprehensive task log if not exists
     if not os.path.exists(task_file_path):
-        print("📅 Creating comprehensive task log with 35+ realistic entries...")
+        events.notice("📅 Creating comprehensive task log with 35+ realistic entries...")
         create_comprehensive_task_log(task_file_path, 35)
     
     # Load tasks from file
@@ -48,34 +162,46 @@ def main():
         with open(task_file_path, "r") as f:
             task_list = [line.strip().split(" - ")[1] for line in f.readlines() if " - " in line]
     except FileNotFoundError:
-        print(f"⚠️  Task file not found: {task_file_path}")
+        events.emit(events.TaskFileMissing(path=task_file_path))
         return
     
-    print(f"📋 Loaded {len(task_list)} tasks for training")
+    events.notice(f"📋 Loaded {len(task_list)} tasks for training")
     
-    # Initialize agent with persistence
-    agent = QLearningAgent(actions=["open", "mute", "play", "unmute", "close", "screenshot", "set_dnd"])
+    # Initialize agent with persistence (or connect to the Q-table service if $RL_AGENT_SERVICE is set)
+    agent = connect_or_create_agent(actions=["open", "mute", "play", "unmute", "close", "screenshot", "set_dnd"])
     total_rewards = []
     
     # Load previous learning progress
     try:
         import pandas as pd
-        if os.path.exists(episode_log_path):
+        if log_db:
+            from agent.task_store import get_task_store
+            total_rewards = get_task_store(episode_log_path).episode_totals()
+            if total_rewards:
+                events.notice(f"🔄 Resumed learning from {len(total_rewards)} previous episodes")
+        elif os.path.exists(episode_log_path):
             episode_df = pd.read_csv(episode_log_path)
             if not episode_df.empty:
                 total_rewards = episode_df['Total_Reward'].tolist()
-                print(f"🔄 Resumed learning from {len(total_rewards)} previous episodes")
+                events.notice(f"🔄 Resumed learning from {len(total_rewards)} previous episodes")
     except Exception as e:
-        print(f"🆕 Starting fresh learning session")
+        events.notice("🆕 Starting fresh learning session")
+    
+    monitor = None
+    if memory and hasattr(agent, "q"):  # A service client holds no table of its own
+        from agent.memory import MemoryMonitor
+        monitor = MemoryMonitor(agent, tracemalloc_frames=1)
+    
+    pipeline = None
+    if use_async:
+        pipeline = FeedbackPipeline(agent, task_log_path, on_decision=display_decision, on_result=display_task_reward)
     
     # Run multiple episodes for meaningful learning
     num_episodes = 6  # Increased for better learning demonstration
     start_episode = len(total_rewards) + 1
     
     for episode in range(start_episode, start_episode + num_episodes):
-        print(f"\n🏁 Starting Episode {episode}")
-        print("="*60)
-        total_reward = 0
+        events.emit(events.EpisodeStarted(episode=episode))
         start_time = time.time()
         
         # Shuffle tasks for diversity
@@ -83,101 +209,69 @@ def main():
         episode_tasks = task_list.copy()
         random.shuffle(episode_tasks)
         
-        # Use first 8 tasks per episode for focused training
-        for task_index, task in enumerate(episode_tasks[:8], 1):
-            # Parse intent from task
-            parsed_intent = task.lower().split()[0] if task else "open"
-            
-            # Get agent's action and confidence with detailed analysis
-            action = agent.select_action(parsed_intent)
-            confidence = agent.get_action_confidence(parsed_intent, action)
-            confidence_details = agent.get_confidence_details(parsed_intent, action)
-            next_best = agent.get_next_best_action(parsed_intent)
-            
-            # Display task information with enhanced details
-            print(f"\n📋 TASK {task_index} (Episode {episode})")
-            print("-"*40)
-            print(f"Task: {task}")
-            print(f"🎯 Agent's Action: {action}")
-            print(f"📈 Confidence Score: {confidence:.3f}")
-            print(f"💡 Next Best Option: {next_best}")
-            print(f"🧠 Q-Value Details: Chosen={confidence_details.get('chosen_q', 0):.2f}, Mean Others={confidence_details.get('mean_other_q', 0):.2f}")
-            print("-"*40)
-            
-            # Get enhanced user feedback with correction and follow-up
-            feedback, correction, followup_task, followup_accepted, followup_reward = get_feedback_with_correction(agent, parsed_intent, action)
-            task_id = f"{episode}-{task_index}"
-            
-            # Enhanced reward logic based on feedback
-            if feedback == "👍":
-                base_reward = 2
-                feedback_text = "👍 Correct"
-            elif feedback == "👎":
-                base_reward = -2
-                feedback_text = "👎 Incorrect"
+        with tracing.span("episode", episode=episode):
+            # Use first 8 tasks per episode for focused training
+            if use_async:
+                total_reward = asyncio.run(run_episode_async(pipeline, episode, episode_tasks[:8]))
             else:
-                base_reward = 0
-                feedback_text = "Neutral"
+                total_reward = run_episode(agent, episode, episode_tasks[:8], task_log_path)
             
-            # Calculate total reward including followup bonus
-            total_task_reward = base_reward + followup_reward
+            # Log episode summary
+            episode_duration = time.time() - start_time
+            with tracing.span("logging", log="episode"):
+                log_total_reward(episode, total_reward, episode_log_path)
+            total_rewards.append(total_reward)
             
-            # Update Q-table with base reward
-            agent.update_q_table(parsed_intent, action, base_reward, parsed_intent)
+            events.emit(events.EpisodeCompleted(episode=episode, total_reward=total_reward, duration=episode_duration))
             
-            # Enhanced structured logging with all required fields
-            log_episode_enhanced(
-                log_path=task_log_path,
-                task_id=task_id,
-                intent=parsed_intent,
-                action=action,
-                reward=base_reward,
-                feedback=feedback_text,
-                suggestion=correction or "",
-                confidence=confidence,
-                followup_task=followup_task,
-                followup_accepted=followup_accepted,
-                followup_reward=followup_reward,
-                q_details=confidence_details
-            )
-            
-            total_reward += total_task_reward
-            print(f"🏆 Episode {episode} Reward so far: {total_reward} (Task: {total_task_reward})")
-            
-            # Small delay for better UX
-            time.sleep(0.5)
-        
-        # Log episode summary
-        episode_duration = time.time() - start_time
-        log_total_reward(episode, total_reward, episode_log_path)
-        total_rewards.append(total_reward)
-        
-        print(f"\n✅ Episode {episode} Complete!")
-        print(f"Total Reward: {total_reward}")
-        print(f"Duration: {episode_duration:.1f} seconds")
-        print("="*60)
+            # Generate visualizations after each episode
+            with tracing.span("chart_render", chart="learning_curve"):
+                plot_rewards(total_rewards, chart_path)
+            if os.path.exists(task_log_path):
+                with tracing.span("chart_render", chart="dashboard"):
+                    create_performance_dashboard(task_log_path, dashboard_path)
+                with tracing.span("chart_render", chart="confidence"):
+                    plot_confidence_analysis(task_log_path, confidence_path)
         
-        # Generate visualizations after each episode
-        plot_rewards(total_rewards, chart_path)
-        if os.path.exists(task_log_path):
-            create_performance_dashboard(task_log_path, dashboard_path)
-            plot_confidence_analysis(task_log_path, confidence_path)
+        if monitor is not None:
+            sample = monitor.sample(f"episode {episode}")
+            events.notice(f"🧮 Q-table: {sample['states']:,} states, {sample['bytes'] / 1024:,.1f} KiB")
     
     # Save Q-table (already auto-saved after each update)
     agent.save_q_table("data/final_q_table.pkl")
     
     # Final comprehensive summary
-    print(f"\n🎉 Training Complete!")
-    print(f"Episodes Completed: {len(total_rewards)}")
-    print(f"Average Reward: {sum(total_rewards)/len(total_rewards):.1f}")
-    print(f"Best Episode: {max(total_rewards)} (Episode {total_rewards.index(max(total_rewards)) + 1})")
-    print(f"Improvement: {total_rewards[-1] - total_rewards[0] if len(total_rewards) > 1 else 0}")
-    print(f"\n📁 Generated Files:")
-    print(f"  • Learning curve: {chart_path}")
-    print(f"  • Performance dashboard: {dashboard_path}")
-    print(f"  • Confidence analysis: {confidence_path}")
-    print(f"  • Detailed logs: {task_log_path}")
-    print(f"  • Q-table persistence: data/final_q_table.pkl & .csv")
+    events.notice(
+        f"\n🎉 Training Complete!",
+        f"Episodes Completed: {len(total_rewards)}",
+        f"Average Reward: {sum(total_rewards)/len(total_rewards):.1f}",
+        f"Best Episode: {max(total_rewards)} (Episode {total_rewards.index(max(total_rewards)) + 1})",
+        f"Improvement: {total_rewards[-1] - total_rewards[0] if len(total_rewards) > 1 else 0}",
+        f"\n📁 Generated Files:",
+        f"  • Learning curve: {chart_path}",
+        f"  • Performance dashboard: {dashboard_path}",
+        f"  • Confidence analysis: {confidence_path}",
+        f"  • Detailed logs: {task_log_path}",
+        f"  • Q-table persistence: data/final_q_table.pkl & .csv",
+    )
+    if monitor is not None:
+        from agent.memory import print_report
+        print_report(monitor.report())
+        monitor.close()
+    events.bus.close()
+    trace_file = tracing.stop()
+    if trace_file:
+        print(f"🧭 Trace written to {trace_file} (open in https://ui.perfetto.dev)")
     
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Train the agent interactively from your feedback")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Precompute decisions and log/save in the background")
+    parser.add_argument("--quiet", action="store_true", help="Only print warnings and errors")
+    parser.add_argument("--events", help="Also write every event to this JSON-lines file")
+    parser.add_argument("--trace", help="Record a Chrome/Perfetto trace of every task to this JSON file")
+    parser.add_argument("--memory", action="store_true", help="Report Q-table memory growth after every episode")
+    parser.add_argument("--log-db", action="store_true", help="Log tasks and episodes to data/task_log.db (SQLite)")
+    args = parser.parse_args()
+    main(use_async=args.use_async, quiet=args.quiet, event_log=args.events, trace_path=args.trace,
+         memory=args.memory, log_db=args.log_db)
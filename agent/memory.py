@@ -0,0 +1,261 @@
+"""
+Memory accounting for the Q-table
+
+Every distinct state string gets its own row, and suggest_followup_task adds
+synthetic states ("open_completed", "after_open", ...) on top, so the table
+grows with the vocabulary of the user. This module measures it: bytes per
+row, the whole table's footprint (rows, keys, leader cache, visit counts,
+state interner), growth between samples, which state-key prefixes account for
+the rows, and tracemalloc diffs between episodes to show where new memory
+was allocated.
+
+Usage:
+    python -m agent.memory data/q_table.pkl
+    python -m agent.memory data/q_table.pkl --simulate 20 --tracemalloc
+    python -m agent.main --memory
+
+    from agent.memory import MemoryMonitor
+    monitor = MemoryMonitor(agent, tracemalloc_frames=1)
+    ...
+    monitor.sample(episode)  # after every episode
+    print_report(monitor.report())
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from collections import Counter
+
+_PREFIX_SPLIT = re.compile(r"[_\s]")
+
+def row_bytes(state, row):
+    """Bytes held by one row: its dict, its values and its state key.
+
+    Action keys are shared by every row (and with agent.actions), so they are
+    counted once in table_footprint rather than per row.
+    """
+    size = sys.getsizeof(row) + sys.getsizeof(state)
+    for value in row.values():
+        size += sys.getsizeof(value)
+    return size
+
+def _container_bytes(container):
+    """Shallow size of a dict plus its nested dicts/lists (leader cache, visit counts)"""
+    size = sys.getsizeof(container)
+    for value in container.values():
+        size += sys.getsizeof(value)
+    return size
+
+def table_footprint(agent):
+    """Memory held by an agent's learned state, in bytes, by component.
+
+    Shared objects (interned state strings, the action keys, small cached
+    floats) are counted once for the table total, so `rows` can be less than
+    the sum of row_bytes over all rows.
+    """
+    seen = set()
+    table = getattr(agent.q, "hot", agent.q)  # Only the in-memory rows of a BoundedQStore
+    rows = sys.getsizeof(table)
+    row_sizes = []
+    for state, row in table.items():
+        row_sizes.append(row_bytes(state, row))
+        for obj in (state, row, *row, *row.values()):
+            if id(obj) not in seen:
+                seen.add(id(obj))
+                rows += sys.getsizeof(obj)
+    interner = agent.state_index
+    footprint = {
+        "states": len(agent.q),
+        "rows_in_memory": len(table),
+        "rows": rows,
+        "leader_cache": _container_bytes(agent._leaders),
+        "visit_counts": _container_bytes(agent.counts),
+        # Name strings are already counted as row keys
+        "state_interner": sys.getsizeof(interner.ids) + sys.getsizeof(interner.names),
+        "bytes_per_row": sum(row_sizes) / len(row_sizes) if row_sizes else 0.0,
+        "max_row_bytes": max(row_sizes, default=0),
+    }
+    weights = getattr(agent, "weights", None)  # HashedLinearQAgent keeps no rows
+    if weights is not None:
+        footprint["weights"] = weights.nbytes
+    footprint["total"] = sum(footprint[key] for key in
+                             ("rows", "leader_cache", "visit_counts", "state_interner", "weights") if key in footprint)
+    return footprint
+
+def state_prefix(state, known=()):
+    """Leading word of a state key: 'open' for 'open_completed', 'after' for 'after_open'.
+
+    Names in `known` (the action names, which contain underscores such as
+    set_dnd) are kept whole when a state starts with them.
+    """
+    for name in known:
+        if state == name or state.startswith(name + "_"):
+            return name
+    return _PREFIX_SPLIT.split(state, 1)[0] or state
+
+def top_prefixes(states, top=10, known=()):
+    """[(prefix, state count)] for the most common state-key prefixes"""
+    known = sorted(known, key=len, reverse=True)
+    return Counter(state_prefix(state, known) for state in states).most_common(top)
+
+class MemoryMonitor:
+    """Samples an agent's table size over time, optionally with tracemalloc diffs.
+
+    sample() records (time, label, states, bytes); with tracemalloc_frames
+    set it also snapshots the Python heap and keeps the top allocation
+    changes since the previous sample, so calling it once per episode shows
+    what each episode allocated. tracemalloc slows every allocation, so it
+    is off unless asked for.
+    """
+
+    def __init__(self, agent, tracemalloc_frames=0, top=10):
+        self.agent = agent
+        self.top = top
+        self.samples = []
+        self.diffs = []  # (label, [(location, size_diff, count_diff)])
+        self._snapshot = None
+        self._tracemalloc = None
+        self._started_tracing = False
+        if tracemalloc_frames:
+            import tracemalloc
+            self._tracemalloc = tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(tracemalloc_frames)
+                self._started_tracing = True
+            self._snapshot = self._take_snapshot()
+        self.sample("start")
+
+    def _take_snapshot(self):
+        tracemalloc = self._tracemalloc
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, __file__),  # The monitor's own samples
+        ))
+
+    def sample(self, label=None):
+        footprint = table_footprint(self.agent)
+        sample = {"time": time.time(), "label": label if label is not None else len(self.samples),
+                  "states": footprint["states"], "bytes": footprint["total"]}
+        self.samples.append(sample)
+        if self._tracemalloc is not None and len(self.samples) > 1:
+            snapshot = self._take_snapshot()
+            stats = snapshot.compare_to(self._snapshot, "lineno")[:self.top]
+            self._snapshot = snapshot
+            self.diffs.append((sample["label"], [(str(stat.traceback), stat.size_diff, stat.count_diff)
+                                                 for stat in stats]))
+        return sample
+
+    def growth(self):
+        """States and bytes added per second and per sample between the first and last samples"""
+        if len(self.samples) < 2:
+            return {"states_per_second": 0.0, "bytes_per_second": 0.0,
+                    "states_per_sample": 0.0, "bytes_per_sample": 0.0}
+        first, last = self.samples[0], self.samples[-1]
+        seconds = (last["time"] - first["time"]) or 1e-9
+        steps = len(self.samples) - 1
+        return {
+            "states_per_second": (last["states"] - first["states"]) / seconds,
+            "bytes_per_second": (last["bytes"] - first["bytes"]) / seconds,
+            "states_per_sample": (last["states"] - first["states"]) / steps,
+            "bytes_per_sample": (last["bytes"] - first["bytes"]) / steps,
+        }
+
+    def report(self):
+        return memory_report(self.agent, monitor=self, top=self.top)
+
+    def close(self):
+        if self._started_tracing:
+            self._tracemalloc.stop()
+            self._started_tracing = False
+
+def memory_report(agent, monitor=None, top=10):
+    """Everything print_report shows, as a JSON-serialisable dict"""
+    report = {
+        "footprint": table_footprint(agent),
+        "top_prefixes": top_prefixes(agent.q, top, known=agent.actions),
+    }
+    if monitor is not None:
+        report["growth"] = monitor.growth()
+        report["samples"] = monitor.samples
+        report["tracemalloc"] = monitor.diffs
+    return report
+
+def _human(size):
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:,.1f} {unit}" if unit != "B" else f"{size:,.0f} B"
+        size /= 1024
+    return f"{size:,.1f} GiB"
+
+def print_report(report):
+    footprint = report["footprint"]
+    print(f"🧮 Q-table memory: {footprint['states']:,} states, {_human(footprint['total'])} total")
+    if footprint["rows_in_memory"] != footprint["states"]:
+        print(f"   {footprint['rows_in_memory']:,} rows in memory, the rest spilled to disk")
+    print(f"   rows {_human(footprint['rows'])} ({_human(footprint['bytes_per_row'])}/row, "
+          f"largest {_human(footprint['max_row_bytes'])})")
+    print(f"   leader cache {_human(footprint['leader_cache'])}, visit counts {_human(footprint['visit_counts'])}, "
+          f"state interner {_human(footprint['state_interner'])}")
+    if "weights" in footprint:
+        print(f"   linear weights {_human(footprint['weights'])}")
+    if report["top_prefixes"]:
+        print("🔤 Top state prefixes:")
+        for prefix, count in report["top_prefixes"]:
+            print(f"   {prefix:<20}{count:>8,}")
+    growth = report.get("growth")
+    if growth:
+        print(f"📈 Growth: {growth['states_per_sample']:+,.1f} states ({_human(growth['bytes_per_sample'])}) per sample, "
+              f"{growth['states_per_second']:+,.1f} states/s")
+    for label, stats in report.get("tracemalloc", []):
+        print(f"🔬 Allocations since previous sample ({label}):")
+        for location, size_diff, count_diff in stats:
+            print(f"   {size_diff:>+10,} B {count_diff:>+7,} blocks  {location}")
+
+def _simulate(agent, monitor, episodes, tasks_per_episode, seed):
+    """Run simulated episodes (with follow-up suggestions, which add states) and sample after each"""
+    import random
+    from agent.simulation import SimulatedUser
+
+    user = SimulatedUser(agent.actions, seed=seed)
+    random.seed(seed)
+    for episode in range(1, episodes + 1):
+        for intent_id in user.sample_intents(tasks_per_episode).tolist():
+            state = user.intents[intent_id]
+            action = agent.select_action(state)
+            reward, correction = user.respond(intent_id, agent.action_id(action))
+            agent.update_q_table(state, action, reward, state)
+            if correction >= 0:
+                agent.update_q_with_correction(state, action, agent.actions[correction])
+            agent.suggest_followup_task(state, action)
+        monitor.sample(f"episode {episode}")
+
+def main():
+    from agent.q_learning import QLearningAgent
+    from agent.simulation import DEFAULT_ACTIONS
+
+    parser = argparse.ArgumentParser(description="Report the memory held by a Q-table")
+    parser.add_argument("q_path", nargs="?", default="data/q_table.pkl", help="Q-table pickle to load")
+    parser.add_argument("--top", type=int, default=10, help="Prefixes and allocation sites to list")
+    parser.add_argument("--simulate", type=int, default=0, metavar="EPISODES",
+                        help="Train on simulated users for EPISODES episodes, sampling growth after each")
+    parser.add_argument("--tasks-per-episode", type=int, default=8)
+    parser.add_argument("--tracemalloc", action="store_true", help="Diff tracemalloc snapshots between episodes")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    agent = QLearningAgent(DEFAULT_ACTIONS, q_path=args.q_path, autosave=False)
+    monitor = MemoryMonitor(agent, tracemalloc_frames=1 if args.tracemalloc else 0, top=args.top)
+    if args.simulate:
+        _simulate(agent, monitor, args.simulate, args.tasks_per_episode, seed=0)
+    report = monitor.report()
+    monitor.close()
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Metrics: counters, gauges and latency histograms in OpenMetrics text format
+
+Metrics are off unless $RL_AGENT_METRICS is set when the agent is imported.
+Off, @timed returns the function it decorates unchanged, so the disabled mode
+costs nothing on the hot path. On, every timed call lands in a fixed-bucket
+histogram, agents report their table size and snapshot size as gauges, and
+INFO-and-up agent.events are counted by kind. The setting also picks an
+exporter:
+
+    RL_AGENT_METRICS=1                        collect only (render() / write_file())
+    RL_AGENT_METRICS=data/metrics.prom        rewrite this file every few seconds
+    RL_AGENT_METRICS=http:127.0.0.1:9464      serve http://127.0.0.1:9464/metrics
+
+Usage:
+    RL_AGENT_METRICS=data/metrics.prom python -m agent.main
+"""
+
+import atexit
+import functools
+import os
+import tempfile
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+from agent import events
+
+SETTING = os.environ.get("RL_AGENT_METRICS", "")
+ENABLED = SETTING not in ("", "0")
+PREFIX = "rl_agent_"
+
+# Upper bounds in seconds, from a cached select (~1 us) to a chart render (~seconds)
+LATENCY_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in sorted(labels.items())) + "}"
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+class Gauge:
+    """Set directly, or computed at render time by `fn` (return None to skip)"""
+
+    def __init__(self, fn=None):
+        self.value = 0
+        self.fn = fn
+
+    def set(self, value):
+        self.value = value
+
+    def read(self):
+        return self.fn() if self.fn else self.value
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+class Registry:
+    """Metric families by name; each family holds one metric per label set"""
+
+    KINDS = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}
+
+    def __init__(self):
+        self.families = {}  # name -> (kind, help, {labels_key: metric})
+        self._lock = threading.Lock()
+
+    def _get(self, kind, name, help, labels, **kwargs):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self.families.setdefault(name, (kind, help, {}))
+            if family[0] != kind:
+                raise ValueError(f"Metric {name} is already registered as a {family[0]}")
+            metric = family[2].get(key)
+            if metric is None:
+                metric = family[2][key] = self.KINDS[kind](**kwargs)
+        return metric
+
+    def counter(self, name, help="", **labels):
+        return self._get("counter", name, help, labels)
+
+    def gauge(self, name, help="", fn=None, **labels):
+        gauge = self._get("gauge", name, help, labels)
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    def histogram(self, name, help="", buckets=LATENCY_BUCKETS, **labels):
+        return self._get("histogram", name, help, labels, buckets=buckets)
+
+    def render(self):
+        """OpenMetrics text exposition of every metric"""
+        lines = []
+        with self._lock:
+            families = [(name, kind, help, list(metrics.items()))
+                        for name, (kind, help, metrics) in sorted(self.families.items())]
+        for name, kind, help, metrics in families:
+            full = PREFIX + name
+            lines.append(f"# TYPE {full} {kind}")
+            if help:
+                lines.append(f"# HELP {full} {help}")
+            for key, metric in metrics:
+                labels = dict(key)
+                if kind == "counter":
+                    lines.append(f"{full}_total{_labels(labels)} {metric.value}")
+                elif kind == "gauge":
+                    value = metric.read()
+                    if value is not None:
+                        lines.append(f"{full}{_labels(labels)} {value}")
+                else:
+                    with metric._lock:
+                        counts, total = list(metric.counts), metric.sum
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (float("inf"),), counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{full}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+                    lines.append(f"{full}_count{_labels(labels)} {cumulative}")
+                    lines.append(f"{full}_sum{_labels(labels)} {total}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+def timed(name, help="", **labels):
+    """Decorator recording the call's latency in histogram `name`; a no-op unless metrics are enabled"""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        histogram = registry.histogram(name, help, **labels)
+        perf_counter = time.perf_counter
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(perf_counter() - start)
+        return wrapper
+    return decorate
+
+def track_agent(agent):
+    """Gauges for an agent's table size and snapshot size on disk, dropped with the agent"""
+    ref = weakref.ref(agent)
+    labels = {"q_path": agent.q_path}
+
+    def states():
+        agent = ref()
+        return None if agent is None else len(agent.q)
+
+    def snapshot_bytes():
+        agent = ref()
+        if agent is None:
+            return None
+        try:
+            return os.path.getsize(getattr(agent.q, "path", agent.q_path))  # SQLite storage: the database
+        except OSError:
+            return 0
+
+    registry.gauge("q_table_states", "States in the in-memory Q-table", fn=states, **labels)
+    registry.gauge("q_table_snapshot_bytes", "Size of the Q-table snapshot on disk", fn=snapshot_bytes, **labels)
+
+def write_file(path, text=None):
+    """Write the exposition to `path` atomically"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(registry.render() if text is None else text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+class FileExporter:
+    """Rewrites the metrics file every `interval` seconds and once more at exit"""
+
+    def __init__(self, path, interval=5.0):
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-file", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            write_file(self.path)
+
+    def close(self):
+        self._stop.set()
+        write_file(self.path)
+
+def serve(host="127.0.0.1", port=9464):
+    """Serve /metrics over HTTP from a daemon thread; returns the server"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+class EventCounter(events.Subscriber):
+    """Counts agent.events by kind (INFO and up, so per-update DEBUG events stay unbuilt)"""
+
+    def __init__(self, level=events.INFO):
+        super().__init__(level)
+
+    def handle(self, event):
+        registry.counter("events", "Agent events by kind", kind=event.kind).inc()
+
+def _start():
+    events.bus.subscribe(EventCounter())
+    if SETTING.startswith("http:"):
+        host, _, port = SETTING[len("http:"):].rpartition(":")
+        serve(host or "127.0.0.1", int(port))
+    elif SETTING != "1":
+        FileExporter(SETTING)
+
+if ENABLED:
+    _start()
@@ -0,0 +1,238 @@
+"""
+Offline warm-start trainer
+
+Learns a Q-table from historical task-log CSVs (enhanced_comprehensive_log.csv,
+final_demo_log.csv, task_log.csv, ...) instead of re-running interactive
+sessions. Logs are streamed in chunks and mapped to (state, action, reward)
+arrays. Training fits each logged (state, action) pair's mean reward
+(bandit mode, the default, since logged tasks have next_state == state) or
+runs vectorized multi-epoch Q updates over the whole dataset (q_learning).
+The result is a snapshot the agent can load at startup.
+
+Usage:
+    python -m agent.offline data/*log.csv --out data/q_table.pkl
+    python -m agent.offline data/task_log.csv --init data/q_table.pkl --mode q_learning --epochs 100
+"""
+
+import argparse
+import csv
+import glob
+import os
+
+import numpy as np
+
+from agent.interning import Interner
+from agent.q_learning import read_q_snapshot, write_q_snapshot
+
+DEFAULT_ACTIONS = ["open", "mute", "play", "unmute", "close", "screenshot", "set_dnd"]
+
+# Header variants written by the different loggers and demos
+COLUMN_ALIASES = {
+    "intent": ("Parsed_Intent", "Parsed Intent"),
+    "action": ("Action_Taken", "Action Taken"),
+    "reward": ("Base_Reward", "Base Reward"),
+    "correction": ("Suggested_Correct_Action", "Suggested Correction"),
+}
+
+# Reward given to the user's suggested action, as in update_q_with_correction
+CORRECTION_REWARD = 2.0
+
+class TransitionDataset:
+    """Growing (state_id, action_id, reward) arrays with interned state and action maps"""
+
+    def __init__(self, actions):
+        self.action_index = Interner(actions)
+        self.actions = self.action_index.names
+        self.action_ids = self.action_index.ids
+        self.state_index = Interner()
+        self.states = self.state_index.names
+        self.state_ids = self.state_index.ids
+        self._chunks = []
+
+    def state_id(self, state):
+        return self.state_index.intern(state)
+
+    def add_chunk(self, states, actions, rewards):
+        if states:
+            self._chunks.append((np.array(states, dtype=np.int32),
+                                 np.array(actions, dtype=np.int32),
+                                 np.array(rewards, dtype=np.float64)))
+
+    def arrays(self):
+        if not self._chunks:
+            empty = np.zeros(0, dtype=np.int32)
+            return empty, empty, np.zeros(0, dtype=np.float64)
+        return tuple(np.concatenate(parts) for parts in zip(*self._chunks))
+
+def _resolve_columns(header):
+    columns = {}
+    for key, names in COLUMN_ALIASES.items():
+        for name in names:
+            if name in header:
+                columns[key] = header.index(name)
+                break
+    return columns
+
+def stream_log(path, dataset, chunk_size=5000):
+    """Append the transitions in one task-log CSV to `dataset`, chunk by chunk.
+
+    Returns the number of transitions read, or 0 if the file is not a task log.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        columns = _resolve_columns(header)
+        if not {"intent", "action", "reward"} <= columns.keys():
+            return 0
+
+        count = 0
+        states, actions, rewards = [], [], []
+        for row in reader:
+            try:
+                state = row[columns["intent"]]
+                action_id = dataset.action_ids.get(row[columns["action"]])
+                reward = float(row[columns["reward"]])
+            except (IndexError, ValueError):
+                continue
+            if action_id is not None:
+                states.append(dataset.state_id(state))
+                actions.append(action_id)
+                rewards.append(reward)
+
+            # A logged correction is a labelled example for the suggested action
+            if "correction" in columns and columns["correction"] < len(row):
+                correct_id = dataset.action_ids.get(row[columns["correction"]].strip().lower())
+                if correct_id is not None:
+                    states.append(dataset.state_id(state))
+                    actions.append(correct_id)
+                    rewards.append(CORRECTION_REWARD)
+
+            if len(states) >= chunk_size:
+                count += len(states)
+                dataset.add_chunk(states, actions, rewards)
+                states, actions, rewards = [], [], []
+        count += len(states)
+        dataset.add_chunk(states, actions, rewards)
+        return count
+
+def train_offline(states, actions, rewards, n_states, n_actions, alpha=0.2, gamma=0.0,
+                  epochs=50, batch_size=1024, tol=1e-6, q_init=None, seed=0):
+    """Vectorized Q updates over logged same-state transitions.
+
+    Returns (q, epochs_run, converged).
+
+    With gamma 0 (bandit mode, the default) the fixed point of the update is
+    the mean reward of each logged (state, action) pair, so it is computed
+    directly. Pairs without data keep their q_init values.
+
+    With gamma > 0 the update bootstraps from the same row, running
+    multi-epoch minibatches. Each minibatch averages the TD errors per
+    (state, action) pair, so repeated transitions in a batch do not
+    overshoot. Training stops early once an epoch moves no value by more than
+    `tol`. Otherwise `converged` is False.
+    """
+    q = np.zeros((n_states, n_actions)) if q_init is None else q_init.copy()
+    n = len(states)
+    if n == 0:
+        return q, 0, True
+    if gamma == 0:
+        totals = np.zeros_like(q)
+        counts = np.zeros_like(q)
+        np.add.at(totals, (states, actions), rewards)
+        np.add.at(counts, (states, actions), 1.0)
+        seen = counts > 0
+        q[seen] = totals[seen] / counts[seen]
+        return q, 1, True
+
+    rng = np.random.default_rng(seed)
+    converged = False
+    for epoch in range(1, epochs + 1):
+        before = q.copy()
+        order = rng.permutation(n)
+        for start in range(0, n, batch_size):
+            batch = order[start:start + batch_size]
+            s, a, r = states[batch], actions[batch], rewards[batch]
+            # Logged transitions have next_state == state
+            td = r + gamma * q[s].max(axis=1) - q[s, a]
+            delta = np.zeros_like(q)
+            counts = np.zeros_like(q)
+            np.add.at(delta, (s, a), td)
+            np.add.at(counts, (s, a), 1.0)
+            q += alpha * delta / np.maximum(counts, 1.0)
+        if np.abs(q - before).max() <= tol:
+            converged = True
+            break
+    return q, epoch, converged
+
+def table_to_matrix(table, dataset):
+    """Dense matrix for the dataset's states from an existing Q-table dict (missing values are 0)"""
+    for state in table:
+        dataset.state_id(state)
+    q = np.zeros((len(dataset.states), len(dataset.actions)))
+    for state, row in table.items():
+        i = dataset.state_ids[state]
+        for action, value in row.items():
+            j = dataset.action_ids.get(action)
+            if j is not None:
+                q[i, j] = value
+    return q
+
+def matrix_to_table(q, dataset):
+    return {state: {action: float(q[i, j]) for j, action in enumerate(dataset.actions)}
+            for i, state in enumerate(dataset.states)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm-start a Q-table from historical task logs")
+    parser.add_argument("logs", nargs="+", help="Task-log CSV files or glob patterns")
+    parser.add_argument("--out", default="data/q_table.pkl", help="Snapshot to write (pickle + CSV)")
+    parser.add_argument("--init", help="Existing Q-table pickle to start from")
+    parser.add_argument("--actions", default=",".join(DEFAULT_ACTIONS))
+    parser.add_argument("--alpha", type=float, default=0.2)
+    parser.add_argument("--gamma", type=float, default=0.9)
+    parser.add_argument("--mode", choices=["q_learning", "bandit"], default="bandit",
+                        help="bandit (default) learns each pair's mean reward without bootstrapping (gamma = 0); "
+                             "q_learning bootstraps from the same state, which logged tasks are")
+    parser.add_argument("--epochs", type=int, default=50, help="Epoch cap for --mode q_learning")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    dataset = TransitionDataset(args.actions.split(","))
+    initial = {}
+    if args.init and os.path.exists(args.init):
+        initial = read_q_snapshot(args.init)
+
+    paths = sorted({p for pattern in args.logs for p in (glob.glob(pattern) or [pattern])})
+    for path in paths:
+        try:
+            count = stream_log(path, dataset, args.chunk_size)
+        except OSError as e:
+            print(f"⚠️  Skipping {path}: {e}")
+            continue
+        if count:
+            print(f"📥 {path}: {count} transitions")
+        else:
+            print(f"⏭️  {path}: not a task log, skipped")
+
+    states, actions, rewards = dataset.arrays()
+    if not len(states):
+        print("❌ No transitions found")
+        return
+
+    q_init = table_to_matrix(initial, dataset) if initial else None
+    q, epochs_run, converged = train_offline(states, actions, rewards, len(dataset.states), len(dataset.actions),
+                                             alpha=args.alpha, gamma=0.0 if args.mode == "bandit" else args.gamma,
+                                             epochs=args.epochs, batch_size=args.batch_size, q_init=q_init,
+                                             seed=args.seed)
+    write_q_snapshot(matrix_to_table(q, dataset), args.out)
+    if converged:
+        how = "per-pair mean rewards" if args.mode == "bandit" else f"converged after {epochs_run} epochs"
+        print(f"✅ Trained on {len(states)} transitions ({how}); "
+              f"{len(dataset.states)} states written to {args.out}")
+    else:
+        print(f"⚠️  Stopped at the {args.epochs}-epoch cap without converging on {len(states)} transitions; "
+              f"{len(dataset.states)} states written to {args.out} anyway")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+asyncio feedback pipeline with speculative precomputation
+
+The interactive loop in agent/main.py is strictly sequential: decide, block on
+input(), update, log, save, sleep. FeedbackPipeline treats user feedback as
+events instead. While the user is deciding on task i, the decision for task
+i+1 (action, confidence details, next-best, follow-up) is computed
+speculatively, and logging and persistence for finished tasks run as
+background tasks. A speculative decision is only thrown away when the
+feedback for task i updated the same state it was computed from.
+
+The agent itself is only touched from the event loop thread: the console
+worker thread does terminal I/O and nothing else, and corrections are
+applied once its answer is back. Saves are coalesced: the snapshot is taken
+`save_interval` seconds after a request, normally while the user is reading
+the next prompt, and only its write runs on the I/O thread.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.feedback import get_feedback_with_correction, score_feedback
+from agent import tracing
+from agent.logger import log_episode_enhanced
+
+def compute_decision(agent, task):
+    """Everything shown to the user for one task, computed from the current table"""
+    with tracing.span("decision", task=task):
+        with tracing.span("intent_parse"):
+            parsed_intent = agent.parse_state(task)
+        with tracing.span("select_action"):
+            action = agent.select_action(parsed_intent)
+        with tracing.span("confidence_details"):
+            confidence = agent.get_action_confidence(parsed_intent, action)
+            confidence_details = agent.get_confidence_details(parsed_intent, action)
+            next_best = agent.get_next_best_action(parsed_intent)
+        with tracing.span("followup_suggestion"):
+            followup_action = agent.suggest_followup_task(parsed_intent, action)
+    return {
+        "task": task,
+        "intent": parsed_intent,
+        "action": action,
+        "confidence": confidence,
+        "confidence_details": confidence_details,
+        "next_best": next_best,
+        "followup_action": followup_action,
+    }
+
+class ConsoleFeedbackSource:
+    """Reads feedback from the terminal on a worker thread so the event loop stays free.
+
+    The worker only prompts; the returned correction is applied by the pipeline.
+    """
+
+    def __init__(self, agent):
+        self.agent = agent
+
+    async def next_feedback(self, decision):
+        feedback, correction, followup_task, followup_accepted, followup_reward = await asyncio.to_thread(
+            get_feedback_with_correction, self.agent, decision["intent"], decision["action"],
+            decision["followup_action"], apply_correction=False
+        )
+        return {
+            "feedback": feedback,
+            "correction": correction,
+            "followup_task": followup_task,
+            "followup_accepted": followup_accepted,
+            "followup_reward": followup_reward,
+        }
+
+class QueueFeedbackSource:
+    """Feedback pushed as events by another front-end (voice, web, simulator) via submit().
+
+    Events use the keys ConsoleFeedbackSource returns; the pipeline applies any "correction".
+    """
+
+    def __init__(self):
+        self.events = asyncio.Queue()
+
+    def submit(self, event):
+        self.events.put_nowait(event)
+
+    async def next_feedback(self, decision):
+        return await self.events.get()
+
+class FeedbackPipeline:
+    """Runs episodes with speculative decisions and background logging/persistence"""
+
+    def __init__(self, agent, task_log_path, feedback_source=None, on_decision=None, on_result=None,
+                 save_interval=0.5):
+        self.agent = agent
+        self.save_interval = save_interval
+        self.task_log_path = task_log_path
+        self.feedback_source = feedback_source or ConsoleFeedbackSource(agent)
+        self.on_decision = on_decision
+        self.on_result = on_result
+        self.stats = {"speculative_hits": 0, "speculative_misses": 0}
+        self._background = set()
+        self._save_task = None
+        self._save_again = False
+        # One I/O thread keeps log appends and snapshot writes ordered
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline-io")
+        # Persistence moves off the critical path; the pipeline saves in the background
+        if hasattr(agent, "autosave"):
+            agent.autosave = False
+
+    async def run_episode(self, episode, tasks):
+        """Run one episode over `tasks`, returning its total reward"""
+        total_reward = 0
+        if not tasks:
+            return total_reward
+        pending = self._speculate(tasks[0])
+
+        for task_index, task in enumerate(tasks, 1):
+            decision = await pending
+            if self.on_decision:
+                self.on_decision(episode, task_index, decision)
+
+            # Start on the next task while the user is still thinking about this one
+            following = tasks[task_index] if task_index < len(tasks) else None
+            pending = self._speculate(following) if following is not None else None
+
+            with tracing.span("feedback_wait", task=decision["task"]):
+                event = await self.feedback_source.next_feedback(decision)
+            base_reward, feedback_text = score_feedback(event["feedback"])
+            with tracing.span("q_update", reward=base_reward):
+                if event.get("correction") and hasattr(self.agent, "update_q_with_correction"):
+                    self.agent.update_q_with_correction(decision["intent"], decision["action"], event["correction"])
+                self.agent.update_q_table(decision["intent"], decision["action"], base_reward, decision["intent"])
+
+            self._in_background(self._run_io(
+                log_episode_enhanced,
+                log_path=self.task_log_path,
+                task_id=f"{episode}-{task_index}",
+                intent=decision["intent"],
+                action=decision["action"],
+                reward=base_reward,
+                feedback=feedback_text,
+                suggestion=event.get("correction") or "",
+                confidence=decision["confidence"],
+                followup_task=event.get("followup_task"),
+                followup_accepted=event.get("followup_accepted", False),
+                followup_reward=event.get("followup_reward", 0),
+                q_details=decision["confidence_details"],
+            ))
+            self.request_save()
+
+            task_reward = base_reward + event.get("followup_reward", 0)
+            total_reward += task_reward
+            if self.on_result:
+                self.on_result(episode, total_reward, task_reward)
+
+            # The speculation is stale only if this feedback touched the state it read
+            if pending is not None:
+                next_intent = self.agent.parse_state(following)
+                if next_intent == decision["intent"]:
+                    pending.cancel()
+                    pending = self._speculate(following)
+                    self.stats["speculative_misses"] += 1
+                else:
+                    self.stats["speculative_hits"] += 1
+
+        return total_reward
+
+    def request_save(self):
+        """Persist the table in the background, coalescing saves that pile up"""
+        if not hasattr(self.agent, "snapshot"):
+            return  # Remote agents (agent.service) persist on their own schedule
+        self._save_again = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = self._in_background(self._save_loop())
+
+    async def _save_loop(self):
+        while self._save_again:
+            await asyncio.sleep(self.save_interval)
+            self._save_again = False
+            snapshot = self.agent.snapshot()
+            await self._run_io(self.agent.write_snapshot, snapshot)
+
+    async def drain(self):
+        """Wait for all background logging and persistence to finish"""
+        while self._background:
+            await asyncio.gather(*list(self._background))
+
+    def _run_io(self, fn, *args, **kwargs):
+        return asyncio.get_running_loop().run_in_executor(self._io, functools.partial(fn, *args, **kwargs))
+
+    def _speculate(self, task):
+        return asyncio.ensure_future(self._decide(task))
+
+    async def _decide(self, task):
+        # Yield first so the feedback prompt for the current task is already up;
+        # the decision itself is cheap and runs on the loop thread.
+        await asyncio.sleep(0)
+        return compute_decision(self.agent, task)
+
+    def _in_background(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
@@ -2,61 +2,362 @@ import os
 import pickle
 import random
 import csv
+import tempfile
 import math
+from array import array
+
+from agent import events, metrics, tracing
+from agent.interning import Interner
+
+# Pickled snapshots hold integer-coded tables: the state and action string
+# maps plus one flat row-major array of values (NaN marks a missing entry).
+SNAPSHOT_FORMAT = "interned-v1"
+
+def encode_q_table(q, actions=()):
+    """Integer-coded snapshot of a {state: {action: value}} table"""
+    action_index = Interner(actions)
+    for row in q.values():
+        for action in row:
+            action_index.intern(action)
+    states = list(q)
+    width = len(action_index)
+    values = array('d', [math.nan]) * (len(states) * width)
+    for i, row in enumerate(q.values()):
+        base = i * width
+        for action, value in row.items():
+            values[base + action_index.ids[action]] = value
+    return {"format": SNAPSHOT_FORMAT, "states": states, "actions": action_index.names, "values": values}
+
+def decode_q_table(snapshot):
+    """Inverse of encode_q_table; legacy dict-of-dicts pickles are returned unchanged"""
+    if not isinstance(snapshot.get("format"), str):
+        return snapshot
+    if snapshot["format"] != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported Q-table snapshot format: {snapshot['format']}")
+    actions = snapshot["actions"]
+    values = snapshot["values"]
+    width = len(actions)
+    q = {}
+    for i, state in enumerate(snapshot["states"]):
+        base = i * width
+        q[state] = {action: values[base + j] for j, action in enumerate(actions)
+                    if not math.isnan(values[base + j])}
+    return q
+
+def read_q_snapshot(path):
+    """Load a pickled Q-table snapshot (either format) as a {state: {action: value}} dict"""
+    with open(path, "rb") as f:
+        return decode_q_table(pickle.load(f))
+
+@metrics.timed("snapshot_write_seconds", "Writing a Q-table snapshot (pickle + CSV)")
+def write_q_snapshot(q, path):
+    """Write a Q-table to `path` (pickle) plus a CSV copy for human readability.
+
+    The pickle is written to a temporary file and renamed into place so that
+    readers never observe a half-written table. Each call gets its own
+    temporary file, so concurrent writers of the same path cannot clobber
+    each other's data before the rename.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    
+    # Save binary pickle file atomically
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(encode_q_table(q), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    if events.enabled(events.DEBUG):
+        events.emit(events.QTableSaved(path=path))
+    
+    # Also save as CSV for human readability
+    csv_path = path.replace('.pkl', '.csv')
+    try:
+        with open(csv_path, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['State', 'Action', 'Q_Value'])
+            for state, actions in q.items():
+                for action, q_value in actions.items():
+                    writer.writerow([state, action, round(q_value, 4)])
+    except Exception as e:
+        events.emit(events.CsvExportFailed(path=csv_path, error=str(e)))
+
+MODES = ("q_learning", "bandit")
+BANDIT_STEPS = ("constant", "mean")
+STORAGES = ("pickle", "sqlite")
 
 class QLearningAgent:
-    def __init__(self, actions, alpha=0.2, gamma=0.9, epsilon=0.2, q_path="data/q_table.pkl"):
+    """Tabular Q-learning agent with confidence scoring and follow-up suggestions.
+
+    mode="bandit" treats every task as a contextual bandit: since callers
+    update with next_state == state, the bootstrapped max over the same row
+    only inflates values. Bandit updates move Q(s, a) towards the reward with
+    either the constant step `alpha` (bandit_step="constant") or the sample
+    mean (bandit_step="mean"). Visit counts are not saved with the table: a
+    value with no count (loaded from disk, or set by a correction) is weighted
+    like round(1 / alpha) - 1 earlier samples, so its first mean update takes
+    the constant step alpha and later ones shrink as 1/n.
+
+    In both modes the best and second-best action of every state are kept up
+    to date on each write, so greedy selection, next-best suggestions and the
+    ranking term of the confidence score are O(1) reads. A row is rescanned
+    only when its leader or runner-up loses value.
+
+    With max_states the table keeps at most that many rows in memory and
+    spills the coldest ones (eviction="lru" or "visits") to a scratch file
+    next to q_path, together with their bandit visit counts. States are then
+    not interned, so memory stays bounded however many states are seen
+    (state_id, used by attached replay buffers, still interns). storage="sqlite" keeps the table in a SQLite database
+    next to q_path (.db) instead of a pickle. Saves then write only the
+    changed cells, and max_states bounds the row cache. See agent.store.
+    """
+
+    def __init__(self, actions, alpha=0.2, gamma=0.9, epsilon=0.2, q_path="data/q_table.pkl", autosave=True,
+                 mode="q_learning", bandit_step="constant", max_states=None, eviction="lru", storage="pickle"):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        if bandit_step not in BANDIT_STEPS:
+            raise ValueError(f"bandit_step must be one of {BANDIT_STEPS}, got {bandit_step!r}")
+        if storage not in STORAGES:
+            raise ValueError(f"storage must be one of {STORAGES}, got {storage!r}")
         self.actions = actions
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
         self.q_path = q_path
+        self.autosave = autosave  # Save after every update; owners that persist on their own schedule turn this off
+        self.mode = mode
+        self.bandit_step = bandit_step
+        self.max_states = max_states
+        self.eviction = eviction
+        self.storage = storage
+        self.counts = {}  # state -> {action: visits}, used by bandit_step="mean"
+        self._leaders = {}  # state -> [row, best, best_value, runner_up, runner_up_value]
+        self._action_rank = {a: i for i, a in enumerate(actions)}  # Tie-break: earlier action wins
+        self.state_index = Interner()  # Canonical state strings and their dense IDs
+        self.action_index = Interner(actions)
         self.q = {}
+        self.replay_buffer = None
+        self.replay_batch_size = 0
         self.load_q_table(q_path)
+        if metrics.ENABLED:
+            metrics.track_agent(self)
+
+    def _new_table(self, rows):
+        """The mapping that holds the rows: a dict, or a BoundedQStore when max_states is set"""
+        if self.max_states is None:
+            return dict(rows)
+        from agent.store import BoundedQStore
+        old = self.__dict__.get("q")
+        if isinstance(old, BoundedQStore):
+            old.close()
+        table = BoundedQStore(self.max_states, self.actions, os.path.splitext(self.q_path)[0] + ".spill",
+                              eviction=self.eviction, on_evict=self._forget_row)
+        for state, row in rows.items():
+            table[state] = row
+        self.counts = table.counts  # Spilled and read back with their rows
+        return table
+
+    def _forget_row(self, state):
+        """Drop per-row caches for a row the bounded store wrote out to disk.
+
+        A BoundedQStore spills the row's visit counts itself; an evicted
+        SQLite row starts counting again from its stored value.
+        """
+        self._leaders.pop(state, None)
+        self.counts.pop(state, None)
+
+    def _canonical(self, state):
+        """Key object for a new row: the interned string, or `state` itself when max_states bounds memory.
+
+        Interned strings (ours and sys.intern's) live for good, so a bounded
+        table must not intern every state it sees.
+        """
+        return self.state_index.canonical(state) if self.max_states is None else state
 
     def _ensure_state(self, state):
         if state not in self.q:
-            self.q[state] = {a: 0.0 for a in self.actions}
+            self.q[self._canonical(state)] = {a: 0.0 for a in self.actions}
+
+    def _row(self, state):
+        """{action: Q-value} mapping for a state, created on first use.
+
+        Every read of Q-values goes through here, so alternative value
+        backends (see agent.linear) only need to override _row and _set_q.
+        """
+        self._ensure_state(state)
+        return self.q[state]
+
+    def parse_state(self, task):
+        """State for a task string: its first word (the parsed intent)"""
+        return task.lower().split()[0] if task else "open"
+
+    def state_id(self, state):
+        """Dense integer ID for a state string"""
+        return self.state_index.intern(state)
+
+    def action_id(self, action):
+        """Dense integer ID for an action (its position in `actions` for known actions)"""
+        return self.action_index.intern(action)
 
+    @metrics.timed("select_action_seconds", "QLearningAgent.select_action latency")
     def select_action(self, state):
         self._ensure_state(state)
         if random.random() < self.epsilon:
             return random.choice(self.actions)
-        return max(self.q[state], key=self.q[state].get)
+        return self._leaders_of(state)[1]
+
+    def select_actions(self, states):
+        """select_action for many states, looking up each distinct state's leader once"""
+        leaders = {}
+        for state in states:
+            if state not in leaders:
+                self._ensure_state(state)
+                leaders[state] = self._leaders_of(state)[1]
+        return [random.choice(self.actions) if random.random() < self.epsilon else leaders[state]
+                for state in states]
+
+    def _leaders_of(self, state):
+        """Cached [row, best, best_value, runner_up, runner_up_value] for an existing state.
+
+        Entries remember the row object they were computed from, so rows that
+        are replaced wholesale (or a reassigned/reloaded table) are rescanned.
+        """
+        row = self.q[state]
+        leaders = self._leaders.get(state)
+        if leaders is None or leaders[0] is not row:
+            leaders = self._scan_leaders(state)
+        return leaders
 
+    def _scan_leaders(self, state):
+        row = self.q[state]
+        ranked = sorted(row.items(), key=lambda kv: kv[1], reverse=True)[:2]
+        best, best_value = ranked[0] if ranked else (None, 0.0)
+        runner_up, runner_up_value = ranked[1] if len(ranked) > 1 else (None, 0.0)
+        leaders = self._leaders[state] = [row, best, best_value, runner_up, runner_up_value]
+        return leaders
+
+    def _ahead(self, action, value, other, other_value):
+        """True if (action, value) ranks above (other, other_value)"""
+        if other is None or value != other_value:
+            return other is None or value > other_value
+        rank = self._action_rank
+        return rank.get(action, len(rank)) < rank.get(other, len(rank))
+
+    def _set_q(self, state, action, value):
+        """Write Q(state, action) and keep the state's best/runner-up current"""
+        row = self.q[state]
+        leaders = self._leaders.get(state)
+        row[action] = value
+        if leaders is None or leaders[0] is not row:
+            return  # Scanned lazily on the next read
+        _, best, best_value, runner_up, runner_up_value = leaders
+        if action == best:
+            if value >= best_value or self._ahead(action, value, runner_up, runner_up_value):
+                leaders[2] = value
+            else:
+                self._scan_leaders(state)  # Leader fell behind the runner-up
+        elif action == runner_up:
+            if self._ahead(action, value, best, best_value):
+                leaders[1:] = [action, value, best, best_value]
+            elif value >= runner_up_value:
+                leaders[4] = value
+            else:
+                self._scan_leaders(state)  # Runner-up dropped; a third action may pass it
+        elif self._ahead(action, value, best, best_value):
+            leaders[1:] = [action, value, best, best_value]
+        elif self._ahead(action, value, runner_up, runner_up_value):
+            leaders[3:] = [action, value]
+
+    @metrics.timed("update_q_table_seconds", "QLearningAgent.update_q_table latency, including autosave")
     def update_q_table(self, state, action, reward, next_state):
         """Update Q-table with immediate save for persistence"""
-        self._ensure_state(state)
-        self._ensure_state(next_state)
-        old = self.q[state][action]
-        next_max = max(self.q[next_state].values()) if self.q[next_state] else 0.0
-        new = old + self.alpha * (reward + self.gamma * next_max - old)
-        self.q[state][action] = new
+        old = self._row(state)[action]
+        if self.mode == "bandit":
+            # No bootstrap: next_state is the same task, not a successor
+            td = reward - old
+            if self.bandit_step == "mean":
+                visits = self.counts.setdefault(state, {})
+                n = visits.get(action, self._prior_samples() if old else 0) + 1
+                visits[action] = n
+                new = old + td / n
+            else:
+                new = old + self.alpha * td
+        else:
+            next_max = self._leaders_of(next_state)[2] if self._row(next_state) else 0.0
+            td = reward + self.gamma * next_max - old
+            new = old + self.alpha * td
+        self._set_q(state, action, new)
+        if events.enabled(events.DEBUG):
+            events.emit(events.QValueUpdated(state=state, action=action, reward=reward, old=old, new=new))
+        
+        # Get more out of each human label by replaying past transitions
+        if self.replay_buffer is not None and action in self.actions:
+            from agent.replay import replay_minibatch
+            buffer = self.replay_buffer
+            buffer.add(self.state_id(state), self.action_id(action), reward, self.state_id(next_state),
+                       priority=td)
+            replay_minibatch(self, buffer, self.replay_batch_size)
         
         # Auto-save after each update for persistence
-        self.save_q_table()
+        if self.autosave:
+            self.save_q_table()
     
+    def _prior_samples(self):
+        """Samples a value without a visit count stands for: its first mean step is then alpha"""
+        return max(0, round(1 / self.alpha) - 1) if self.alpha > 0 else 0
+
+    def attach_replay(self, buffer, batch_size=16):
+        """Replay a minibatch from `buffer` (see agent.replay) after every update_q_table call"""
+        self.replay_buffer = buffer
+        self.replay_batch_size = batch_size
+
     def update_q_with_correction(self, state, wrong_action, correct_action, penalty=-1, bonus=2):
         """Update Q-table when user provides correction"""
-        self._ensure_state(state)
+        row = self._row(state)
         
         # Penalize wrong action
-        if wrong_action in self.q[state]:
-            self.q[state][wrong_action] += penalty
+        if wrong_action in row:
+            self._set_q(state, wrong_action, row[wrong_action] + penalty)
         
         # Reward correct action
         if correct_action in self.actions:
-            self.q[state][correct_action] += bonus
-            print(f"✅ Q-table updated: {correct_action} rewarded (+{bonus}), {wrong_action} penalized ({penalty})")
+            self._set_q(state, correct_action, self._row(state).get(correct_action, 0.0) + bonus)
+            events.emit(events.CorrectionApplied(state=state, wrong_action=wrong_action, correct_action=correct_action,
+                                                 penalty=penalty, bonus=bonus))
         
         # Save immediately
-        self.save_q_table()
+        if self.autosave:
+            self.save_q_table()
 
     def top_actions(self, state, k=2):
         """Get top k actions for a given state, sorted by Q-value"""
-        self._ensure_state(state)
-        return sorted(self.q[state].items(), key=lambda kv: kv[1], reverse=True)[:k]
+        row = self._row(state)
+        if k <= 2:
+            _, best, best_value, runner_up, runner_up_value = self._leaders_of(state)
+            ranked = [(best, best_value), (runner_up, runner_up_value)] if runner_up is not None else [(best, best_value)]
+            return ranked[:k] if best is not None else []
+        return sorted(row.items(), key=lambda kv: kv[1], reverse=True)[:k]
     
+    def _value_rank(self, state, value):
+        """Number of Q-values in the row strictly above `value`, or None if no action has it.
+
+        O(1) for the leader and runner-up values, which is what the chosen
+        action almost always has.
+        """
+        _, best, best_value, runner_up, runner_up_value = self._leaders_of(state)
+        if best is not None and value == best_value:
+            return 0
+        if runner_up is not None and value == runner_up_value:
+            return 1
+        values = self._row(state).values()
+        if value not in values:
+            return None
+        return sum(1 for q in values if q > value)
+
     def get_next_best_action(self, state):
         """Get the next best action suggestion (second highest Q-value)"""
         top_actions = self.top_actions(state, k=2)
@@ -73,20 +374,20 @@ class QLearningAgent:
         """
         import math  # Import at the beginning of the method
         
-        self._ensure_state(state)
+        row = self._row(state)
         
         # Get all Q-values for this state
-        q_values = list(self.q[state].values())
-        action_q = self.q[state].get(action, 0)
+        q_values = list(row.values())
+        action_q = row.get(action, 0)
         
         if not q_values or len(q_values) <= 1:
             return 0.5  # Neutral confidence for single or no actions
         
         # Method 1: Q-value difference from mean of other actions
-        other_actions_q = [q for a, q in self.q[state].items() if a != action]
+        other_actions_q = [q for a, q in row.items() if a != action]
         if other_actions_q:
             mean_other_q = sum(other_actions_q) / len(other_actions_q)
-            max_q = max(q_values)
+            max_q = self._leaders_of(state)[2]
             min_q = min(q_values)
             max_range = max_q - min_q if max_q != min_q else 1.0
             
@@ -109,10 +410,9 @@ class QLearningAgent:
             softmax_confidence = 0.9 if action_q == max(q_values) else 0.3
         
         # Method 3: Relative ranking confidence 
-        sorted_q = sorted(q_values, reverse=True)
-        if action_q in sorted_q:
-            rank = sorted_q.index(action_q)
-            rank_confidence = 1 - (rank / len(sorted_q))
+        rank = self._value_rank(state, action_q)
+        if rank is not None:
+            rank_confidence = 1 - (rank / len(q_values))
         else:
             rank_confidence = 0.1
         
@@ -125,15 +425,15 @@ class QLearningAgent:
         """Get detailed confidence breakdown for logging"""
         import math  # Import at the beginning of the method
         
-        self._ensure_state(state)
-        q_values = list(self.q[state].values())
-        action_q = self.q[state].get(action, 0)
+        row = self._row(state)
+        q_values = list(row.values())
+        action_q = row.get(action, 0)
         
         if not q_values:
             return {"method_1": 0.5, "method_2": 0.5, "method_3": 0.5, "final": 0.5, "q_values": [], "chosen_q": 0}
         
         # Calculate all three methods
-        other_actions_q = [q for a, q in self.q[state].items() if a != action]
+        other_actions_q = [q for a, q in row.items() if a != action]
         mean_other_q = sum(other_actions_q) / len(other_actions_q) if other_actions_q else 0
         
         # Method 1: Sigmoid difference
@@ -153,10 +453,9 @@ class QLearningAgent:
             method_2 = 0.9 if action_q == max_q else 0.3
         
         # Method 3: Ranking
-        sorted_q = sorted(q_values, reverse=True)
-        if action_q in sorted_q:
-            rank = sorted_q.index(action_q)
-            method_3 = 1 - (rank / len(sorted_q))
+        rank = self._value_rank(state, action_q)
+        if rank is not None:
+            method_3 = 1 - (rank / len(q_values))
         else:
             method_3 = 0.1
         
@@ -190,21 +489,18 @@ class QLearningAgent:
         best_followup = None
         best_combined_score = float('-inf')
         
+        # Evaluate multiple possible next states (built and interned once per call)
+        possible_states = [
+            f"{current_state}_completed",  # State after successful completion
+            f"after_{current_action}",     # General state after this action
+            current_state,                 # Same state (for repeated actions)
+            f"{current_action}_context"     # Context-specific state
+        ]
+        possible_rows = [self._row(next_state) for next_state in possible_states]
+        
         for next_action in logical_next:
-            # Evaluate multiple possible next states
-            possible_states = [
-                f"{current_state}_completed",  # State after successful completion
-                f"after_{current_action}",     # General state after this action
-                current_state,                 # Same state (for repeated actions)
-                f"{current_action}_context"     # Context-specific state
-            ]
-            
             # Calculate average Q-value across possible states
-            q_scores = []
-            for next_state in possible_states:
-                self._ensure_state(next_state)
-                q_value = self.q[next_state].get(next_action, 0)
-                q_scores.append(q_value)
+            q_scores = [row.get(next_action, 0) for row in possible_rows]
             
             avg_q_score = sum(q_scores) / len(q_scores) if q_scores else 0
             
@@ -221,9 +517,9 @@ class QLearningAgent:
         # Fallback to highest Q-value action if no good logical sequence found
         if not best_followup or best_combined_score <= 0:
             # Find action with highest Q-value in current state
-            self._ensure_state(current_state)
-            if self.q[current_state]:
-                best_followup = max(self.q[current_state], key=self.q[current_state].get)
+            current_row = self._row(current_state)
+            if current_row:
+                best_followup = max(current_row, key=current_row.get)
             else:
                 best_followup = logical_next[0] if logical_next else 'open'
         
@@ -236,41 +532,61 @@ class QLearningAgent:
         else:
             return 0  # No penalty for rejection
 
+    @metrics.timed("save_q_table_seconds", "QLearningAgent.save_q_table latency")
     def save_q_table(self, path=None):
         """Save Q-table with backup and CSV export for analysis"""
-        path = path or self.q_path
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        
-        # Save binary pickle file
-        with open(path, "wb") as f:
-            pickle.dump(self.q, f)
-        
-        # Also save as CSV for human readability
-        csv_path = path.replace('.pkl', '.csv')
-        try:
-            import csv
-            with open(csv_path, 'w', newline='') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(['State', 'Action', 'Q_Value'])
-                for state, actions in self.q.items():
-                    for action, q_value in actions.items():
-                        writer.writerow([state, action, round(q_value, 4)])
-        except Exception as e:
-            print(f"Warning: Could not save CSV version: {e}")
+        with tracing.span("persistence", path=path or self.q_path):
+            self.write_snapshot(self.snapshot() if self.storage == "sqlite" else self.q, path)
+
+    def snapshot(self):
+        """Copy of the learned values that write_snapshot can persist from another thread.
+
+        With SQLite storage: just the cells changed since the last snapshot.
+        """
+        if self.storage == "sqlite":
+            return self.q.take_dirty()
+        return {state: dict(row) for state, row in self.q.items()}
+
+    def write_snapshot(self, snapshot, path=None):
+        if self.storage == "sqlite":
+            self.q.write(snapshot)
+            if path is not None and os.path.abspath(path) != os.path.abspath(self.q_path):
+                # Saving somewhere else (e.g. final_q_table.pkl) exports a full pickle
+                write_q_snapshot({state: dict(row) for state, row in self.q.items()}, path)
+            return
+        write_q_snapshot(snapshot, path or self.q_path)
+
+    def _open_sqlite(self, path):
+        """Open the database next to `path`, importing the pickle at `path` the first time"""
+        from agent.store import SQLiteQStore
+        db_path = os.path.splitext(path)[0] + ".db"
+        old = self.__dict__.get("q")
+        if isinstance(old, SQLiteQStore):
+            old.close()
+        created = not os.path.exists(db_path)
+        self.q = SQLiteQStore(db_path, self.actions, capacity=self.max_states, on_evict=self._forget_row)
+        if created and os.path.exists(path):
+            self.q.import_rows(read_q_snapshot(path))
+        events.emit(events.QTableLoaded(path=db_path, states=len(self.q)))
 
     def load_q_table(self, path=None):
         """Load Q-table with backup handling"""
         path = path or self.q_path
+        if self.storage == "sqlite":
+            try:
+                self._open_sqlite(path)
+            except Exception as e:
+                events.emit(events.QTableLoadFailed(path=path, error=str(e)))
+                raise
+            return
         if os.path.exists(path):
             try:
-                with open(path, "rb") as f:
-                    loaded_q = pickle.load(f)
-                    self.q = loaded_q
-                    print(f"✅ Q-table loaded from {path} with {len(self.q)} states")
+                loaded_q = read_q_snapshot(path)
+                self.q = self._new_table({self._canonical(state): row for state, row in loaded_q.items()})
+                events.emit(events.QTableLoaded(path=path, states=len(self.q)))
             except Exception as e:
-                print(f"⚠️  Failed to load Q-table from {path}: {e}")
-                print("Starting with fresh Q-table")
-                self.q = {}
+                events.emit(events.QTableLoadFailed(path=path, error=str(e)))
+                self.q = self._new_table({})
         else:
-            print(f"No existing Q-table found at {path}. Starting fresh.")
-            self.q = {}
+            events.emit(events.QTableMissing(path=path))
+            self.q = self._new_table({})
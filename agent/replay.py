@@ -0,0 +1,151 @@
+"""
+Experience replay with prioritized sampling
+
+Human feedback is expensive, so each labelled transition is kept in a
+fixed-capacity ring buffer and replayed in small minibatches after every live
+update. Transitions are stored as NumPy arrays of (state_id, action_id,
+reward, next_state_id), using the agent's interned IDs; a sum-tree over the priorities gives O(log n)
+sampling proportional to |TD error|^alpha.
+
+Usage:
+    from agent.replay import PrioritizedReplayBuffer
+    agent.attach_replay(PrioritizedReplayBuffer(capacity=4096), batch_size=16)
+"""
+
+import numpy as np
+
+class SumTree:
+    """Binary tree whose internal nodes hold the sum of their children.
+
+    Leaves live at [capacity, 2 * capacity); node 1 is the root. Sampling
+    walks every query down the tree at once, so a whole minibatch costs
+    O(batch * log capacity) NumPy work.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = 1 << max(0, int(capacity - 1).bit_length())
+        self.depth = self.capacity.bit_length() - 1
+        self.tree = np.zeros(2 * self.capacity, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    def update(self, leaves, priorities):
+        """Set leaf priorities (arrays of equal length) and refresh their ancestors"""
+        nodes = np.asarray(leaves, dtype=np.int64) + self.capacity
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes >> 1)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        """Leaf index for each prefix-sum value in `values`"""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values > left_sum
+            values = np.where(go_right, values - left_sum, values)
+            nodes = left + go_right
+        return nodes - self.capacity
+
+class PrioritizedReplayBuffer:
+    """Ring buffer of transitions with proportional prioritized sampling"""
+
+    def __init__(self, capacity=4096, alpha=0.6, beta=0.4, epsilon=1e-3, seed=None):
+        self.capacity = capacity
+        self.alpha = alpha
+        self.beta = beta
+        self.epsilon = epsilon
+        self.rng = np.random.default_rng(seed)
+        self.states = np.zeros(capacity, dtype=np.int32)
+        self.actions = np.zeros(capacity, dtype=np.int32)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        self.next_states = np.zeros(capacity, dtype=np.int32)
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+        self.position = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state_id, action_id, reward, next_state_id, priority=None):
+        """Store one transition, overwriting the oldest once the buffer is full.
+
+        `priority` is the transition's TD error, on the same scale as the
+        errors passed to update_priorities. Without one the transition gets
+        the highest priority seen so far, so it is replayed at least once
+        before its TD error is known.
+        """
+        i = self.position
+        self.states[i] = state_id
+        self.actions[i] = action_id
+        self.rewards[i] = reward
+        self.next_states[i] = next_state_id
+        p = self.max_priority if priority is None else (abs(priority) + self.epsilon) ** self.alpha
+        self.tree.update([i], [p])
+        self.max_priority = max(self.max_priority, p)
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """Sample a minibatch; returns (indices, states, actions, rewards, next_states, weights)"""
+        total = self.tree.total()
+        # Stratified sampling: one draw from each of batch_size equal segments
+        segment = total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        indices = np.minimum(self.tree.find(values), self.size - 1)
+
+        priorities = self.tree.tree[indices + self.tree.capacity]
+        probabilities = priorities / total
+        weights = (self.size * probabilities) ** -self.beta
+        weights /= weights.max()
+        return (indices, self.states[indices], self.actions[indices],
+                self.rewards[indices], self.next_states[indices], weights)
+
+    def update_priorities(self, indices, td_errors):
+        priorities = (np.abs(td_errors) + self.epsilon) ** self.alpha
+        # Duplicate indices in a batch: keep the last priority for each leaf
+        unique, last = np.unique(indices[::-1], return_index=True)
+        self.tree.update(unique, priorities[::-1][last])
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+
+def replay_minibatch(agent, buffer, batch_size):
+    """Replay a prioritized minibatch into the agent with one vectorized TD step.
+
+    The rows touched by the batch are gathered into a dense matrix, updated
+    with importance-sampling-weighted TD errors and the changed cells written
+    back. A (state, action) pair sampled several times gets the average of its
+    steps, so a hot transition cannot overshoot its target.
+    """
+    if len(buffer) == 0:
+        return 0
+    indices, states, actions, rewards, next_states, weights = buffer.sample(min(batch_size, len(buffer)))
+
+    # Gather every row referenced by the batch into one matrix
+    row_ids, inverse = np.unique(np.concatenate([states, next_states]), return_inverse=True)
+    names = [agent.state_index.name(i) for i in row_ids]
+    matrix = np.array([[row[a] for a in agent.actions] for row in map(agent._row, names)], dtype=np.float64)
+    s_rows = inverse[:len(states)]
+    n_rows = inverse[len(states):]
+
+    q_sa = matrix[s_rows, actions]
+    # Bandit agents do not bootstrap from the (identical) next state
+    gamma = 0.0 if getattr(agent, "mode", "q_learning") == "bandit" else agent.gamma
+    targets = rewards + gamma * matrix[n_rows].max(axis=1)
+    td_errors = targets - q_sa
+    steps = np.zeros_like(matrix)
+    counts = np.zeros_like(matrix)
+    np.add.at(steps, (s_rows, actions), agent.alpha * weights * td_errors)
+    np.add.at(counts, (s_rows, actions), 1.0)
+    matrix += steps / np.maximum(counts, 1.0)
+
+    # Write back only the updated cells, through the agent's own write path
+    cells = np.unique(np.stack([s_rows, actions], axis=1), axis=0)
+    for row, action_id in cells:
+        agent._set_q(names[row], agent.actions[action_id], float(matrix[row, action_id]))
+
+    buffer.update_priorities(indices, td_errors)
+    return len(indices)
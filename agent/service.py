@@ -0,0 +1,430 @@
+"""
+Local Q-table service
+
+Runs one long-lived process that owns the Q-table so that the CLI, the
+Streamlit app, voice front-ends and batch scorers stop loading (and racing to
+rewrite) q_table.pkl themselves. Clients talk newline-delimited JSON over a
+Unix socket or localhost TCP:
+
+    request:  {"id": 7, "op": "select", "args": {"state": "open"}}
+    response: {"id": 7, "ok": true, "result": "open"}
+
+Requests from all connections are coalesced into batches and executed in
+arrival order on the event loop, so the table needs no locking. Consecutive
+"select" requests in a batch are answered by one select_actions call: one
+leader lookup per distinct state (one NumPy scoring pass with the linear
+backend). Persistence runs on the service's own schedule on a single writer
+thread, which shutdown waits for before the final save. An explicit "save"
+snapshots the table in arrival order and is answered once the writer thread
+has stored it; the loop keeps serving other requests meanwhile.
+
+Usage:
+    python -m agent.service --address unix:/tmp/rl_agent.sock
+    python -m agent.service --address tcp:127.0.0.1:8765 --save-interval 10
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from agent import events
+from agent.q_learning import QLearningAgent
+
+DEFAULT_ACTIONS = ["open", "mute", "play", "unmute", "close", "screenshot", "set_dnd"]
+DEFAULT_ADDRESS = "unix:/tmp/rl_agent.sock"
+
+class ServiceError(RuntimeError):
+    """Raised by QTableClient when the service rejects a request"""
+
+def parse_address(address):
+    """Split 'unix:/path', 'tcp:host:port' or 'host:port' into (kind, target)"""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    if address.startswith("tcp:"):
+        address = address[len("tcp:"):]
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+class QTableService:
+    """Owns a QLearningAgent and serves batched requests against it"""
+
+    # Operations that modify the table and therefore schedule a save
+    WRITE_OPS = {"update", "correct"}
+
+    def __init__(self, agent, save_interval=5.0, batch_window=0.002, max_batch=256):
+        self.agent = agent
+        self.agent.autosave = False  # The service decides when to persist
+        self.save_interval = save_interval
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.dirty = False
+        self.stats = {"requests": 0, "batches": 0, "saves": 0}
+        self._queue = None
+        self._writer = None  # Single thread for snapshot writes, so they never overlap
+        self._replies = set()  # Tasks finishing responses off the batch (saves)
+        self._handlers = {
+            "info": lambda: {"actions": self.agent.actions, "states": len(self.agent.q), **self.stats},
+            "parse": self.agent.parse_state,
+            "select": self.agent.select_action,
+            "confidence": self.agent.get_action_confidence,
+            "details": self.agent.get_confidence_details,
+            "top_k": lambda state, k=2: [list(item) for item in self.agent.top_actions(state, k)],
+            "next_best": self.agent.get_next_best_action,
+            "followup": self.agent.suggest_followup_task,
+            "update": self.agent.update_q_table,
+            "correct": self.agent.update_q_with_correction,
+            "save": self._save_now,
+        }
+
+    async def serve(self, address):
+        """Listen on `address` until cancelled, then write a final snapshot"""
+        self._queue = asyncio.Queue()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="q-table-service-writer")
+        kind, target = parse_address(address)
+        if kind == "unix":
+            if os.path.exists(target):
+                os.unlink(target)
+            server = await asyncio.start_unix_server(self._handle_connection, path=target)
+        else:
+            server = await asyncio.start_server(self._handle_connection, host=target[0], port=target[1])
+        events.emit(events.ServiceStarted(address=address, states=len(self.agent.q)))
+
+        tasks = [asyncio.create_task(self._batch_loop()), asyncio.create_task(self._persist_loop())]
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Cancelling _persist_loop does not stop a write already on the writer
+            # thread; the final save queues behind it instead of racing it.
+            if self.dirty:
+                self._writer.submit(self._write_snapshot, self._snapshot(), self.agent.q_path)
+            await asyncio.get_running_loop().run_in_executor(None, self._writer.shutdown)
+            self._writer = None
+            if kind == "unix" and os.path.exists(target):
+                os.unlink(target)
+            events.emit(events.ServiceStopped())
+
+    async def _handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                future = loop.create_future()
+                await self._queue.put((line, future))
+                task = asyncio.create_task(self._reply(writer, future))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+    async def _reply(self, writer, future):
+        response = await future
+        writer.write(response)
+        await writer.drain()
+
+    async def _batch_loop(self):
+        """Drain the request queue in batches and execute each batch in one pass"""
+        while True:
+            batch = [await self._queue.get()]
+            if self.batch_window:
+                await asyncio.sleep(self.batch_window)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(batch)
+            self._run_batch([(self._decode(line), future) for line, future in batch])
+
+    def _run_batch(self, batch):
+        """Answer (request, future) pairs in order; runs of selects share one select_actions call"""
+        i = 0
+        while i < len(batch):
+            end = i
+            while end < len(batch) and self._is_plain_select(batch[end][0]):
+                end += 1
+            if end - i > 1:
+                self._execute_selects(batch[i:end])
+                i = end
+                continue
+            request, future = batch[i]
+            if not future.done():
+                response = self._execute(request)
+                if isinstance(response, bytes):
+                    future.set_result(response)
+                else:
+                    self._reply_later(response, future)
+            i += 1
+
+    def _reply_later(self, response, future):
+        """Answer `future` when the awaitable `response` completes, without holding up the batch"""
+        task = asyncio.ensure_future(response)
+        self._replies.add(task)
+        task.add_done_callback(self._replies.discard)
+        task.add_done_callback(lambda task: future.done() or task.cancelled() or future.set_result(task.result()))
+
+    @staticmethod
+    def _decode(line):
+        """The request dict, or the ValueError explaining why the line is not one"""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return e
+        return request if isinstance(request, dict) else ValueError("Request must be a JSON object")
+
+    def _is_plain_select(self, request):
+        return (isinstance(request, dict) and request.get("op") == "select"
+                and hasattr(self.agent, "select_actions")
+                and isinstance(request.get("args"), dict) and set(request["args"]) == {"state"})
+
+    def _execute_selects(self, batch):
+        try:
+            actions = self.agent.select_actions([request["args"]["state"] for request, _ in batch])
+        except Exception:
+            # Answer one by one so each request gets its own error
+            for request, future in batch:
+                if not future.done():
+                    future.set_result(self._execute(request))
+            return
+        for (request, future), action in zip(batch, actions):
+            if not future.done():
+                future.set_result(self._response(request.get("id"), result=action))
+
+    def _execute(self, request):
+        """Response bytes, or an awaitable of them when the handler finishes off the loop"""
+        if isinstance(request, Exception):
+            return self._response(None, error=str(request))
+        try:
+            op = request.get("op")
+            handler = self._handlers.get(op)
+            if handler is None:
+                raise ValueError(f"Unknown operation: {op!r}")
+            result = handler(**request.get("args", {}))
+            if op in self.WRITE_OPS:
+                self.dirty = True
+            if inspect.isawaitable(result):
+                return self._await_response(request.get("id"), result)
+            return self._response(request.get("id"), result=result)
+        except Exception as e:
+            return self._response(request.get("id"), error=str(e))
+
+    async def _await_response(self, request_id, result):
+        try:
+            return self._response(request_id, result=await result)
+        except Exception as e:
+            return self._response(request_id, error=str(e))
+
+    @staticmethod
+    def _response(request_id, result=None, error=None):
+        if error is None:
+            response = {"id": request_id, "ok": True, "result": result}
+        else:
+            response = {"id": request_id, "ok": False, "error": error}
+        return (json.dumps(response) + "\n").encode()
+
+    async def _persist_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.save_interval)
+            if self.dirty:
+                self.dirty = False
+                try:
+                    await loop.run_in_executor(self._writer, self._write_snapshot, self._snapshot(),
+                                               self.agent.q_path)
+                except Exception as e:
+                    self.dirty = True  # Retry on the next tick
+                    events.emit(events.QTableSaveFailed(path=self.agent.q_path, error=str(e)))
+
+    def _snapshot(self):
+        return self.agent.snapshot()
+
+    def _write_snapshot(self, snapshot, path):
+        self.agent.write_snapshot(snapshot, path)
+        self.stats["saves"] += 1
+
+    def _save_now(self, path=None):
+        """Snapshot the table now; while serving, the write runs on the writer thread and this returns an awaitable"""
+        snapshot = self._snapshot()
+        if path is None:
+            self.dirty = False  # Updates after the snapshot mark it dirty again
+        if self._writer is None:
+            self._write_snapshot(snapshot, path or self.agent.q_path)
+            return True
+        return self._write_in_background(snapshot, path)
+
+    async def _write_in_background(self, snapshot, path):
+        # Behind any background write, never alongside it
+        try:
+            await asyncio.get_running_loop().run_in_executor(self._writer, self._write_snapshot, snapshot,
+                                                             path or self.agent.q_path)
+        except Exception:
+            if path is None:
+                self.dirty = True
+            raise
+        return True
+
+class QTableClient:
+    """Blocking client exposing the QLearningAgent methods the front-ends use.
+
+    Instances are safe to share between threads; requests from one client are
+    sent one at a time. Use `pipeline()` to send many requests in one write.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=10.0):
+        self.address = address
+        kind, target = parse_address(address)
+        family = socket.AF_UNIX if kind == "unix" else socket.AF_INET
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(target)
+        self._file = self._sock.makefile("rb")
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.actions = self.call("info")["actions"]
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def call(self, op, **args):
+        """Send one request and return its result"""
+        return self.pipeline([(op, args)])[0]
+
+    def pipeline(self, calls):
+        """Send [(op, args), ...] in one write and return the results in order"""
+        with self._lock:
+            payload = []
+            for op, args in calls:
+                self._next_id += 1
+                payload.append(json.dumps({"id": self._next_id, "op": op, "args": args}))
+            self._sock.sendall(("\n".join(payload) + "\n").encode())
+            responses = [json.loads(self._file.readline()) for _ in calls]
+        results = []
+        for response in responses:
+            if not response.get("ok"):
+                raise ServiceError(response.get("error", "unknown service error"))
+            results.append(response["result"])
+        return results
+
+    # QLearningAgent-compatible surface
+    def select_action(self, state):
+        return self.call("select", state=state)
+
+    def get_action_confidence(self, state, action):
+        return self.call("confidence", state=state, action=action)
+
+    def get_confidence_details(self, state, action):
+        return self.call("details", state=state, action=action)
+
+    def top_actions(self, state, k=2):
+        return [tuple(item) for item in self.call("top_k", state=state, k=k)]
+
+    def get_next_best_action(self, state):
+        return self.call("next_best", state=state)
+
+    def suggest_followup_task(self, current_state, current_action):
+        return self.call("followup", current_state=current_state, current_action=current_action)
+
+    def update_q_table(self, state, action, reward, next_state):
+        self.call("update", state=state, action=action, reward=reward, next_state=next_state)
+
+    def update_q_with_correction(self, state, wrong_action, correct_action, penalty=-1, bonus=2):
+        self.call("correct", state=state, wrong_action=wrong_action, correct_action=correct_action,
+                  penalty=penalty, bonus=bonus)
+
+    def calculate_followup_reward(self, user_accepted):
+        return 1 if user_accepted else 0
+
+    def parse_state(self, task):
+        return self.call("parse", task=task)
+
+    def save_q_table(self, path=None):
+        self.call("save", path=path)
+
+def connect_or_create_agent(actions, q_path="data/q_table.pkl"):
+    """Use the service named by $RL_AGENT_SERVICE if set, otherwise a local QLearningAgent
+
+    The local agent's update rule follows $RL_AGENT_MODE ("q_learning" or "bandit");
+    $RL_AGENT_BACKEND=linear swaps the table for hashed-feature linear weights
+    stored next to `q_path` as .npz, and $RL_AGENT_STORAGE=sqlite keeps the
+    table in a SQLite database next to `q_path` as .db.
+    """
+    address = os.environ.get("RL_AGENT_SERVICE")
+    if address:
+        try:
+            client = QTableClient(address)
+            events.emit(events.ServiceConnected(address=address))
+            return client
+        except OSError as e:
+            events.emit(events.ServiceUnavailable(address=address, error=str(e)))
+    backend = os.environ.get("RL_AGENT_BACKEND", "table")
+    storage = os.environ.get("RL_AGENT_STORAGE")
+    if backend == "linear" and storage and storage != "pickle":
+        raise ValueError(f"RL_AGENT_STORAGE={storage} needs RL_AGENT_BACKEND=table; "
+                         "the linear backend always stores its weights as .npz")
+    return create_agent(actions, q_path, backend=backend, mode=os.environ.get("RL_AGENT_MODE", "q_learning"),
+                        **({"storage": storage} if storage else {}))
+
+# QLearningAgent options that HashedLinearQAgent has no use for: it keeps no rows
+TABLE_OPTIONS = {"max_states", "eviction", "storage"}
+
+def create_agent(actions, q_path="data/q_table.pkl", backend="table", **kwargs):
+    """Local agent for `backend`: "table" (QLearningAgent) or "linear" (HashedLinearQAgent)"""
+    if backend == "linear":
+        table_only = sorted(TABLE_OPTIONS & set(kwargs))
+        if table_only:
+            raise ValueError(f"{', '.join(table_only)} only apply to the table backend")
+        from agent.linear import HashedLinearQAgent
+        return HashedLinearQAgent(actions=actions, q_path=os.path.splitext(q_path)[0] + ".npz", **kwargs)
+    if backend != "table":
+        raise ValueError(f"Unknown agent backend: {backend!r}")
+    return QLearningAgent(actions=actions, q_path=q_path, **kwargs)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a Q-table to local clients")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="unix:/path or tcp:host:port")
+    parser.add_argument("--q-path", default="data/q_table.pkl")
+    parser.add_argument("--save-interval", type=float, default=5.0, help="Seconds between snapshot writes")
+    parser.add_argument("--batch-window", type=float, default=0.002, help="Seconds to wait for a batch to fill")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--mode", choices=["q_learning", "bandit"], default="q_learning", help="Update rule")
+    parser.add_argument("--bandit-step", choices=["constant", "mean"], default="constant")
+    parser.add_argument("--backend", choices=["table", "linear"], default="table",
+                        help="linear: hashed-feature weights stored as <q-path>.npz")
+    parser.add_argument("--max-states", type=int, default=None,
+                        help="Keep at most this many Q-table rows in memory, spilling the rest to disk")
+    parser.add_argument("--eviction", choices=["lru", "visits"], default="lru", help="Which rows to spill first")
+    parser.add_argument("--storage", choices=["pickle", "sqlite"], default="pickle",
+                        help="sqlite: keep the table in <q-path>.db and save only changed cells")
+    args = parser.parse_args()
+    if args.backend == "linear" and (args.max_states or args.storage != "pickle"):
+        parser.error("--max-states and --storage only apply to --backend table")
+
+    table_options = {"max_states": args.max_states, "eviction": args.eviction} if args.max_states else {}
+    if args.storage != "pickle":
+        table_options["storage"] = args.storage
+    agent = create_agent(DEFAULT_ACTIONS, args.q_path, backend=args.backend, autosave=False,
+                         mode=args.mode, bandit_step=args.bandit_step, **table_options)
+    events.attach_console()
+    service = QTableService(agent, save_interval=args.save_interval,
+                            batch_window=args.batch_window, max_batch=args.max_batch)
+    try:
+        asyncio.run(service.serve(args.address))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Simulated users for headless training
+
+The demos simulate feedback with ad-hoc `random.random() < success_rate`
+checks. The users here instead know the correct action for every intent (the
+oracle) and answer like a person at the console would: 👍/👎 with some
+noise, and a correction for most wrong answers. They work on the dense
+intent/action IDs the trainers use, with their own NumPy Generator so every
+worker gets an independent, reproducible stream.
+
+SimulatedUser answers one task at a time. BatchFeedbackEnv steps B
+independent episodes at once with array operations, optionally delaying
+feedback, and train_batched drives a QLearningAgent with it at hundreds of
+thousands of simulated steps per second.
+
+Usage:
+    python -m agent.simulation --batch 1024 --steps 500 --noise 0.1 --delay 2
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+DEFAULT_ACTIONS = ["open", "mute", "play", "unmute", "close", "screenshot", "set_dnd"]
+
+# Parsed intent (first word of a task) -> the action the user wants
+DEFAULT_ORACLE = {
+    "open": "open",
+    "mute": "mute",
+    "play": "play",
+    "unmute": "unmute",
+    "close": "close",
+    "screenshot": "screenshot",
+    "take": "screenshot",
+    "set_dnd": "set_dnd",
+    "enable": "set_dnd",
+}
+
+# Same scale as score_feedback and update_q_with_correction
+CORRECT_REWARD = 2.0
+INCORRECT_REWARD = -2.0
+CORRECTION_PENALTY = -1.0
+CORRECTION_BONUS = 2.0
+
+def oracle_ids(actions, oracle=None):
+    """(intents, correct action ID per intent) for an intent -> action oracle"""
+    oracle = DEFAULT_ORACLE if oracle is None else oracle
+    actions = list(actions)
+    return list(oracle), np.array([actions.index(oracle[intent]) for intent in oracle])
+
+class SimulatedUser:
+    """Draws tasks and answers feedback for an intent -> correct-action oracle.
+
+    noise is the probability that the 👍/👎 answer is flipped;
+    correction_rate the probability that a 👎 comes with the right action.
+    """
+
+    def __init__(self, actions=DEFAULT_ACTIONS, oracle=None, noise=0.0, correction_rate=1.0, seed=None):
+        self.actions = list(actions)
+        self.intents, self.correct = oracle_ids(self.actions, oracle)
+        self.noise = noise
+        self.correction_rate = correction_rate
+        self.rng = np.random.default_rng(seed)
+
+    def sample_intents(self, n):
+        """IDs (indices into `intents`) of the next n tasks"""
+        return self.rng.integers(len(self.intents), size=n)
+
+    def respond(self, intent_id, action_id):
+        """(reward, correction action ID or -1) for the agent's answer"""
+        correct = action_id == self.correct[intent_id]
+        draws = self.rng.random(2)
+        if draws[0] < self.noise:
+            correct = not correct
+        if correct:
+            return CORRECT_REWARD, -1
+        if draws[1] < self.correction_rate:
+            return INCORRECT_REWARD, int(self.correct[intent_id])
+        return INCORRECT_REWARD, -1
+
+class BatchFeedbackEnv:
+    """B simulated users answering in lockstep, one task per episode slot per step.
+
+    step(action_ids) takes one action per slot and returns
+    (next_intents, feedback, done). `feedback` holds the answers that arrive
+    this step as arrays ("intents", "actions", "rewards", "corrections", with
+    -1 for no correction). With delay=d an answer arrives d steps after its
+    action, the way a user replies while the next task is already on screen;
+    the first d steps return empty feedback and flush() returns the rest.
+    Corrections come with probability correction_rate and name a random
+    action instead of the right one with probability correction_noise.
+    """
+
+    def __init__(self, actions=DEFAULT_ACTIONS, oracle=None, batch_size=256, tasks_per_episode=8, noise=0.0,
+                 correction_rate=1.0, correction_noise=0.0, delay=0, intent_probs=None, seed=None):
+        self.actions = list(actions)
+        self.intents, self.correct = oracle_ids(self.actions, oracle)
+        self.batch_size = batch_size
+        self.tasks_per_episode = tasks_per_episode
+        self.noise = noise
+        self.correction_rate = correction_rate
+        self.correction_noise = correction_noise
+        self.delay = delay
+        self.intent_probs = intent_probs
+        self.rng = np.random.default_rng(seed)
+        self._pending = []
+        self.current = None
+        self.t = 0
+
+    def reset(self):
+        self._pending = []
+        self.t = 0
+        self.current = self._sample_intents()
+        return self.current
+
+    def _sample_intents(self):
+        return self.rng.choice(len(self.intents), size=self.batch_size, p=self.intent_probs)
+
+    def respond(self, intents, action_ids):
+        """Vectorized SimulatedUser.respond: (rewards, corrections) arrays"""
+        right = self.correct[intents]
+        draws = self.rng.random((3, len(intents)))
+        correct = (action_ids == right) ^ (draws[0] < self.noise)
+        rewards = np.where(correct, CORRECT_REWARD, INCORRECT_REWARD)
+        suggested = np.where(draws[2] < self.correction_noise,
+                             self.rng.integers(len(self.actions), size=len(intents)), right)
+        corrections = np.where(~correct & (draws[1] < self.correction_rate), suggested, -1)
+        return rewards, corrections
+
+    def step(self, action_ids):
+        if self.current is None:
+            raise RuntimeError("Call reset() before step()")
+        action_ids = np.asarray(action_ids)
+        rewards, corrections = self.respond(self.current, action_ids)
+        self._pending.append({"intents": self.current, "actions": action_ids,
+                              "rewards": rewards, "corrections": corrections})
+        feedback = self._pending.pop(0) if len(self._pending) > self.delay else self._empty()
+
+        self.t += 1
+        done = self.t % self.tasks_per_episode == 0
+        self.current = self._sample_intents()
+        return self.current, feedback, np.full(self.batch_size, done)
+
+    def flush(self):
+        """Feedback still in flight, oldest first"""
+        pending, self._pending = self._pending, []
+        return pending
+
+    def _empty(self):
+        empty = np.zeros(0, dtype=np.int64)
+        return {"intents": empty, "actions": empty, "rewards": np.zeros(0), "corrections": empty}
+
+def _apply_feedback(q, feedback, alpha, gamma):
+    """One batched update; repeated (intent, action) pairs get their average step"""
+    s, a, r, c = feedback["intents"], feedback["actions"], feedback["rewards"], feedback["corrections"]
+    if not len(s):
+        return
+    # Task feedback updates with next_state == state, as in the interactive loop
+    delta = np.zeros_like(q)
+    counts = np.zeros_like(q)
+    np.add.at(delta, (s, a), alpha * (r + gamma * q[s].max(axis=1) - q[s, a]))
+    np.add.at(counts, (s, a), 1.0)
+    q += delta / np.maximum(counts, 1.0)
+
+    # Corrections, as update_q_with_correction: penalize the answer, reward the suggestion
+    corrected = c >= 0
+    if corrected.any():
+        s, a, c = s[corrected], a[corrected], c[corrected]
+        delta[:] = 0.0
+        counts[:] = 0.0
+        np.add.at(delta, (s, a), CORRECTION_PENALTY)
+        np.add.at(counts, (s, a), 1.0)
+        np.add.at(delta, (s, c), CORRECTION_BONUS)
+        np.add.at(counts, (s, c), 1.0)
+        q += delta / np.maximum(counts, 1.0)
+
+def train_batched(agent, env, steps, seed=None):
+    """Train `agent` for `steps` batched steps of `env`; returns (episode accuracies, stats).
+
+    The agent's rows for the env's intents are gathered into one matrix,
+    trained there with the agent's alpha/gamma/epsilon (bandit mode: no
+    bootstrap, constant step) and written back through the agent at the end.
+    """
+    if list(env.actions) != list(agent.actions):
+        raise ValueError("env and agent must use the same actions in the same order")
+    rng = np.random.default_rng(seed)
+    gamma = 0.0 if getattr(agent, "mode", "q_learning") == "bandit" else agent.gamma
+    q = np.array([[agent._row(state)[action] for action in agent.actions] for state in env.intents])
+    before = q.copy()
+
+    accuracies = []
+    correct = 0
+    intents = env.reset()
+    start = time.perf_counter()
+    for _ in range(steps):
+        explore = rng.random(env.batch_size) < agent.epsilon
+        actions = np.where(explore, rng.integers(len(agent.actions), size=env.batch_size), q[intents].argmax(axis=1))
+        intents, feedback, done = env.step(actions)
+        _apply_feedback(q, feedback, agent.alpha, gamma)
+        correct += int((feedback["rewards"] > 0).sum())
+        if done[0]:
+            accuracies.append(correct / (env.batch_size * env.tasks_per_episode))
+            correct = 0
+    for feedback in env.flush():
+        _apply_feedback(q, feedback, agent.alpha, gamma)
+    elapsed = time.perf_counter() - start
+
+    for i, j in zip(*np.nonzero(q != before)):
+        agent._set_q(env.intents[i], agent.actions[j], float(q[i, j]))
+    return accuracies, {"steps": steps * env.batch_size, "seconds": elapsed,
+                        "steps_per_second": steps * env.batch_size / elapsed if elapsed else 0.0}
+
+def evaluate(agent, env):
+    """Share of the env's intents whose greedy action is the oracle's"""
+    return float(np.mean([agent.top_actions(state, 1)[0][0] == env.actions[env.correct[i]]
+                          for i, state in enumerate(env.intents)]))
+
+def main():
+    from agent.q_learning import QLearningAgent
+
+    parser = argparse.ArgumentParser(description="Train a Q-table against a batch of simulated users")
+    parser.add_argument("--batch", type=int, default=1024, help="Parallel episodes")
+    parser.add_argument("--steps", type=int, default=500, help="Batched steps")
+    parser.add_argument("--tasks-per-episode", type=int, default=8)
+    parser.add_argument("--noise", type=float, default=0.0, help="Probability a feedback answer is flipped")
+    parser.add_argument("--correction-rate", type=float, default=1.0)
+    parser.add_argument("--correction-noise", type=float, default=0.0, help="Probability a correction is random")
+    parser.add_argument("--delay", type=int, default=0, help="Steps before feedback arrives")
+    parser.add_argument("--alpha", type=float, default=0.2)
+    parser.add_argument("--gamma", type=float, default=0.9)
+    parser.add_argument("--epsilon", type=float, default=0.2)
+    parser.add_argument("--mode", choices=["q_learning", "bandit"], default="q_learning")
+    parser.add_argument("--out", help="Q-table pickle to start from and save to")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    agent = QLearningAgent(DEFAULT_ACTIONS, alpha=args.alpha, gamma=args.gamma, epsilon=args.epsilon,
+                           q_path=args.out or os.devnull + ".pkl", autosave=False, mode=args.mode)
+    env = BatchFeedbackEnv(agent.actions, batch_size=args.batch, tasks_per_episode=args.tasks_per_episode,
+                           noise=args.noise, correction_rate=args.correction_rate,
+                           correction_noise=args.correction_noise, delay=args.delay, seed=args.seed)
+    accuracies, stats = train_batched(agent, env, args.steps, seed=args.seed)
+    print(f"✅ {stats['steps']:,} simulated steps in {stats['seconds']:.2f}s "
+          f"({stats['steps_per_second']:,.0f} steps/s)")
+    if accuracies:
+        print(f"📈 Episode accuracy {accuracies[0]:.1%} -> {accuracies[-1]:.1%}; greedy accuracy {evaluate(agent, env):.1%}")
+    if args.out:
+        agent.save_q_table()
+        print(f"💾 Q-table saved to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,573 @@
+"""
+Q-table storage backends
+
+By default a QLearningAgent keeps its rows in a dict and pickles the whole
+table on every save. The stores here are the alternatives, behind the same
+{state: {action: value}} mapping interface.
+
+BoundedQStore (max_states): a QLearningAgent built with max_states keeps at most that many rows in RAM.
+When a new row would exceed the limit, the coldest rows go to a spill file
+on disk: the least recently used (eviction="lru") or the least visited
+(eviction="visits"). A spilled row is read back transparently the next time
+its state is used, so nothing learned is lost. Snapshots still cover every
+row, in memory or spilled.
+
+The spill file is a private SQLite scratch database for one store, with one
+fixed-size record per state: one float per action (NaN for a missing
+entry), the action's bandit visit count, and the row's use count. SQLite
+keeps the state -> record index on disk too, so RAM holds nothing per
+spilled row and stays flat however many states have been seen.
+
+SQLiteQStore (storage="sqlite"): the table lives in a SQLite database next
+to q_path, with an in-memory cache in front. Saves write only the cells that
+changed since the last save, as one transaction, instead of pickling the
+whole table. Several processes can share the database: each save adds this
+process's changes to the values currently stored, so no update is lost.
+
+Usage:
+    agent = QLearningAgent(actions, max_states=10_000, eviction="lru")
+    agent = QLearningAgent(actions, storage="sqlite")                    # data/q_table.db
+    agent = QLearningAgent(actions, storage="sqlite", max_states=10_000)  # bounded cache
+"""
+
+import math
+import os
+import tempfile
+import threading
+import time
+import weakref
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from agent import metrics
+
+EVICTION_POLICIES = ("lru", "visits")
+
+class SpillFile:
+    """Fixed-size row records on disk, addressed by state.
+
+    Each instance creates its own SQLite scratch database next to `path`
+    (named after it, with a unique suffix), so agents sharing a q_path never
+    share scratch space. The database is also the state -> record index, so
+    nothing is kept in RAM per spilled row. The file is removed when the
+    instance is closed or collected.
+    """
+
+    def __init__(self, path, actions):
+        import sqlite3
+
+        self.actions = list(actions)
+        self.action_ids = {action: i for i, action in enumerate(self.actions)}
+        directory, name = os.path.split(path)
+        os.makedirs(directory or ".", exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix=name + ".", dir=directory or ".")
+        os.close(fd)
+        self.conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=OFF")  # Scratch space: nothing to recover after a crash
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("CREATE TABLE rows (state TEXT PRIMARY KEY, record BLOB NOT NULL) WITHOUT ROWID")
+        self._count = 0
+        self._finalizer = weakref.finalize(self, SpillFile._remove, self.conn, self.path)  # Also runs at exit
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, state):
+        return self.conn.execute("SELECT 1 FROM rows WHERE state = ?", (state,)).fetchone() is not None
+
+    def __iter__(self):
+        return iter([state for state, in self.conn.execute("SELECT state FROM rows")])
+
+    def _encode(self, row, visits, counts):
+        """One action's value per slot (NaN if missing), then its visit count, then the row's uses"""
+        n = len(self.actions)
+        values = array('d', [math.nan]) * n + array('d', [0.0]) * n + array('d', [visits])
+        for action, value in row.items():
+            index = self.action_ids.get(action)
+            if index is None:
+                raise ValueError(f"Cannot spill a row with unknown action {action!r}")
+            values[index] = value
+        for action, count in (counts or {}).items():
+            values[n + self.action_ids[action]] = count
+        return values.tobytes()
+
+    def _decode(self, record):
+        values = array('d')
+        values.frombytes(record)
+        n = len(self.actions)
+        row = {action: value for action, value in zip(self.actions, values) if not math.isnan(value)}
+        counts = {action: int(count) for action, count in zip(self.actions, values[n:2 * n]) if count}
+        return row, int(values[-1]), counts or None
+
+    def write(self, state, row, visits, counts=None):
+        record = self._encode(row, visits, counts)
+        if not self.conn.execute("UPDATE rows SET record = ? WHERE state = ?", (record, state)).rowcount:
+            self.conn.execute("INSERT INTO rows (state, record) VALUES (?, ?)", (state, record))
+            self._count += 1
+
+    def read(self, state):
+        """(row, visits, counts) for a spilled state; counts is None if the row has none"""
+        found = self.conn.execute("SELECT record FROM rows WHERE state = ?", (state,)).fetchone()
+        if found is None:
+            raise KeyError(state)
+        return self._decode(found[0])
+
+    def rows(self):
+        """(state, row) for every spilled state, in one pass"""
+        for state, record in self.conn.execute("SELECT state, record FROM rows"):
+            yield state, self._decode(record)[0]
+
+    def pop(self, state):
+        found = self.read(state)
+        self.conn.execute("DELETE FROM rows WHERE state = ?", (state,))
+        self._count -= 1
+        return found
+
+    def clear(self):
+        self.conn.execute("DELETE FROM rows")
+        self._count = 0
+
+    @staticmethod
+    def _remove(conn, path):
+        conn.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def close(self):
+        self._finalizer()
+
+class BoundedQStore(MutableMapping):
+    """{state: {action: value}} mapping holding at most `capacity` rows in RAM.
+
+    Reading a state counts as a use (for LRU order and visit counts) and pulls
+    a spilled row back into memory. items()/values() read spilled rows
+    without promoting them, so a snapshot does not churn the hot set.
+    `counts` holds the per-action visit counts of hot rows (the agent's
+    bandit_step="mean" counts); they are spilled and read back with their
+    row. `on_evict(state)` runs for every row written out, so callers can drop
+    anything they cache per row. All operations take one lock, because a read
+    reorders the hot set.
+    """
+
+    def __init__(self, capacity, actions, spill_path, eviction="lru", on_evict=None):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"eviction must be one of {EVICTION_POLICIES}, got {eviction!r}")
+        self.capacity = capacity
+        self.eviction = eviction
+        self.on_evict = on_evict
+        self.hot = OrderedDict()  # state -> row; oldest use first
+        self.visits = {}  # state -> uses, for hot rows
+        self.counts = {}  # state -> {action: visits}, for hot rows
+        self.spill = SpillFile(spill_path, actions)
+        self._lock = threading.RLock()
+        self._evicted = metrics.registry.counter("q_rows_evicted", "Q-table rows spilled to disk") if metrics.ENABLED else None
+        self._reloaded = metrics.registry.counter("q_rows_reloaded", "Spilled Q-table rows read back") if metrics.ENABLED else None
+
+    def __len__(self):
+        return len(self.hot) + len(self.spill)
+
+    def __contains__(self, state):
+        return state in self.hot or state in self.spill
+
+    def __iter__(self):
+        with self._lock:
+            states = list(self.hot) + list(self.spill)
+        return iter(states)
+
+    def __getitem__(self, state):
+        with self._lock:
+            row = self.hot.get(state)
+            if row is None:
+                if state not in self.spill:
+                    raise KeyError(state)
+                row, visits, counts = self.spill.pop(state)
+                if self._reloaded is not None:
+                    self._reloaded.inc()
+                self._insert(state, row, visits, counts)
+            else:
+                self.hot.move_to_end(state)
+            self.visits[state] += 1
+            return row
+
+    def __setitem__(self, state, row):
+        with self._lock:
+            if state in self.hot:
+                self.hot[state] = row
+                self.hot.move_to_end(state)
+                return
+            _, visits, counts = self.spill.pop(state) if state in self.spill else (None, 0, None)
+            self._insert(state, row, visits, counts)
+
+    def __delitem__(self, state):
+        with self._lock:
+            if state in self.hot:
+                del self.hot[state]
+                del self.visits[state]
+                self.counts.pop(state, None)
+            else:
+                self.spill.pop(state)
+
+    def _insert(self, state, row, visits, counts=None):
+        self.hot[state] = row
+        self.visits[state] = visits
+        if counts:
+            self.counts[state] = counts
+        if len(self.hot) > self.capacity:
+            self._evict()
+
+    def _evict(self):
+        """Spill rows until the hot set is back under capacity.
+
+        The visit policy evicts a batch at a time (down to 90% of capacity),
+        so its sort is paid once per batch rather than once per new state.
+        """
+        if self.eviction == "lru":
+            victims = [next(iter(self.hot))]
+        else:
+            excess = len(self.hot) - max(1, int(self.capacity * 0.9))
+            newest = next(reversed(self.hot))  # Never evict the row being inserted
+            candidates = (state for state in self.hot if state != newest)
+            victims = sorted(candidates, key=self.visits.__getitem__)[:excess]
+        for state in victims:
+            self.spill.write(state, self.hot.pop(state), self.visits.pop(state), self.counts.pop(state, None))
+            if self.on_evict is not None:
+                self.on_evict(state)
+        if self._evicted is not None:
+            self._evicted.inc(len(victims))
+
+    def items(self):
+        with self._lock:
+            rows = list(self.hot.items())
+            rows.extend(self.spill.rows())
+        return rows
+
+    def values(self):
+        return [row for _, row in self.items()]
+
+    def clear(self):
+        with self._lock:
+            self.hot.clear()
+            self.visits.clear()
+            self.counts.clear()
+            self.spill.clear()
+
+    def close(self):
+        self.spill.close()
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS q_values (
+    state TEXT NOT NULL,
+    action TEXT NOT NULL,
+    value REAL NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (state, action)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS q_values_updated ON q_values (updated);
+"""
+
+UPSERT = ("INSERT INTO q_values (state, action, value, updated) VALUES (?, ?, ?, ?) "
+          "ON CONFLICT (state, action) DO UPDATE SET value = excluded.value, updated = excluded.updated")
+
+class _Row(dict):
+    """A cached row that reports every write to its store as a dirty cell"""
+
+    __slots__ = ("_dirty", "_state")
+
+    def __init__(self, dirty, state, values=()):
+        super().__init__(values)
+        self._dirty = dirty
+        self._state = state
+
+    def __setitem__(self, action, value):
+        super().__setitem__(action, value)
+        self._dirty()[(self._state, action)] = value
+
+class SQLiteQStore(MutableMapping):
+    """{state: {action: value}} mapping over a SQLite database, with a write-back cache.
+
+    The database is authoritative: one row per (state, action), in WAL mode
+    so several processes can read while one writes. States are read through
+    on first use and cached. Writes only touch the cache and are recorded as
+    dirty cells. take_dirty() + write() (or flush()) store them as one small
+    transaction. Opening loads just the `preload` most recently updated
+    states. With a `capacity`, the cache drops its least recently used rows,
+    flushing first if any cell is dirty.
+
+    Every cached cell remembers the value this process last read or wrote
+    (its base). write() re-reads the cells inside a BEGIN IMMEDIATE
+    transaction and stores current + (value - base), so concurrent writers'
+    changes add up instead of overwriting each other. A row assigned
+    wholesale without being read first is stored as given. Cached rows do not
+    see other processes' changes until they are evicted or refresh() drops
+    the clean ones, but the stored values always include them. Rows
+    read back list their actions in the order of `actions`, as rows built in
+    memory do, so ties between equal values break the same way.
+    """
+
+    def __init__(self, path, actions=(), capacity=None, preload=1000, on_evict=None):
+        import sqlite3
+
+        if capacity is not None and capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        self.path = path
+        self.capacity = capacity
+        self.on_evict = on_evict
+        self.action_rank = {action: i for i, action in enumerate(actions)}
+        self.hot = OrderedDict()  # state -> _Row; oldest use first
+        self.dirty = {}  # (state, action) -> value not yet written
+        self.base = {}  # (state, action) -> value last read from or sent to the database
+        self._inflight = []  # Cell sets taken by take_dirty() and not yet committed
+        self._unsaved = set()  # Cached states with no row in the database yet
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # One connection shared by the agent thread and background writers, serialized by _lock
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SQLITE_SCHEMA)
+        self._stored = self.conn.execute("SELECT COUNT(DISTINCT state) FROM q_values").fetchone()[0]
+        if preload:
+            self._preload(min(preload, capacity or preload))
+
+    def _dirty_cells(self):
+        return self.dirty
+
+    def _ordered(self, cells):
+        """{action: value} for (action, value) pairs, in `actions` order (unknown actions last)"""
+        rank = self.action_rank
+        return dict(sorted(cells, key=lambda cell: rank.get(cell[0], len(rank))))
+
+    def _preload(self, n):
+        rows = self.conn.execute(
+            "SELECT state, action, value FROM q_values WHERE state IN "
+            "(SELECT state FROM q_values GROUP BY state ORDER BY MAX(updated) DESC LIMIT ?)", (n,))
+        cells = {}
+        for state, action, value in rows:
+            cells.setdefault(state, []).append((action, value))
+            self.base[(state, action)] = value
+        for state, row in cells.items():
+            self.hot[state] = _Row(self._dirty_cells, state, self._ordered(row))
+
+    def __len__(self):
+        return self._stored + len(self._unsaved)
+
+    def __contains__(self, state):
+        if state in self.hot:
+            return True
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM q_values WHERE state = ? LIMIT 1", (state,)).fetchone() is not None
+
+    def __iter__(self):
+        return iter([state for state, _ in self.items()])
+
+    def __getitem__(self, state):
+        row = self.hot.get(state)
+        if row is not None:
+            if self.capacity is not None:
+                with self._lock:
+                    self.hot.move_to_end(state)
+            return row
+        with self._lock:
+            values = self._ordered(self.conn.execute("SELECT action, value FROM q_values WHERE state = ?",
+                                                     (state,)).fetchall())
+            if not values:
+                raise KeyError(state)
+            # Writes still on their way to the database are newer than what it returned
+            pending = self._pending_cells()
+            for action, value in values.items():
+                key = (state, action)
+                if key in pending:
+                    values[action] = pending[key]
+                else:
+                    self.base[key] = value
+            row = _Row(self._dirty_cells, state, values)
+            self._cache(state, row)
+            return row
+
+    def __setitem__(self, state, row):
+        with self._lock:
+            new = state not in self.hot and state not in self
+            if new:
+                self._unsaved.add(state)
+            elif state not in self.hot:
+                self._forget_base(state)  # Replaced without being read: store as given
+            row = _Row(self._dirty_cells, state, row)
+            for action, value in row.items():
+                self.dirty[(state, action)] = value
+                if new:
+                    self.base[(state, action)] = 0.0  # Adds to a row another process may create too
+            self._cache(state, row)
+
+    def setdefault(self, state, default=None):
+        with self._lock:
+            if state in self:
+                return self[state]
+            self[state] = default
+            return self.hot[state]
+
+    def __delitem__(self, state):
+        with self._lock:
+            self.flush()
+            self.hot.pop(state, None)
+            self._unsaved.discard(state)
+            self._forget_base(state)
+            deleted = self.conn.execute("DELETE FROM q_values WHERE state = ?", (state,)).rowcount
+            if deleted:
+                self._stored -= 1
+            elif state not in self.hot:
+                raise KeyError(state)
+
+    def _cache(self, state, row):
+        self.hot[state] = row
+        if self.capacity is not None and len(self.hot) > self.capacity:
+            # Drop the oldest 10% at once so the flush below is shared by many evictions
+            excess = max(1, len(self.hot) - int(self.capacity * 0.9))
+            victims = [victim for victim in self.hot if victim != state][:excess]  # Never the row being cached
+            if self.dirty or self._unsaved:
+                self.flush()
+            pending = self._pending_cells()
+            for victim in victims:
+                self._drop(victim, pending)
+
+    def _pending_cells(self):
+        """{(state, action): value} for every cell not yet committed, newest last"""
+        pending = {}
+        for cells in self._inflight:
+            pending.update((key, value) for key, (value, _) in cells.items())
+        pending.update(self.dirty)
+        return pending
+
+    def _forget_base(self, state):
+        for key in [key for key in self.base if key[0] == state]:
+            del self.base[key]
+
+    def _drop(self, state, pending):
+        """Remove a cached row; bases are kept only for its uncommitted cells"""
+        row = self.hot.pop(state, None)
+        for action in row or ():
+            if (state, action) not in pending:
+                self.base.pop((state, action), None)
+        if self.on_evict is not None:
+            self.on_evict(state)
+
+    def take_dirty(self):
+        """Hand over the cells written since the last take; pass them to write().
+
+        Returns {(state, action): (value, base)}, base being None for cells to
+        store as given.
+        """
+        with self._lock:
+            cells = {key: (value, self.base.get(key)) for key, value in self.dirty.items()}
+            self.dirty = {}
+            for key, (value, _) in cells.items():
+                self.base[key] = value  # Later changes are relative to what this write sends
+            self._inflight.append(cells)
+            return cells
+
+    def write(self, cells):
+        """Store cells taken by take_dirty() in one transaction, merged with other processes' changes"""
+        with self._lock:
+            try:
+                if cells:
+                    now = time.time()
+                    with self.conn:
+                        self.conn.execute("BEGIN IMMEDIATE")
+                        current = self._read_cells({state for state, _ in cells})
+                        rows = []
+                        for (state, action), (value, base) in cells.items():
+                            if base is not None:
+                                value = current.get((state, action), 0.0) + (value - base)
+                            rows.append((state, action, value, now))
+                        self.conn.executemany(UPSERT, rows)
+                    new_states = {state for state, _ in cells} & self._unsaved
+                    self._stored += len(new_states)
+                    self._unsaved -= new_states
+            except Exception:
+                # Keep the cells for the next write, behind anything written since
+                for key, (value, base) in cells.items():
+                    self.dirty.setdefault(key, value)
+                    if base is None:
+                        self.base.pop(key, None)
+                    else:
+                        self.base[key] = base
+                raise
+            finally:
+                self._inflight = [pending for pending in self._inflight if pending is not cells]
+
+    def _read_cells(self, states):
+        """{(state, action): value} stored for `states`"""
+        values = {}
+        states = list(states)
+        for start in range(0, len(states), 500):
+            chunk = states[start:start + 500]
+            rows = self.conn.execute(f"SELECT state, action, value FROM q_values WHERE state IN "
+                                     f"({','.join('?' * len(chunk))})", chunk)
+            values.update(((state, action), value) for state, action, value in rows)
+        return values
+
+    def flush(self):
+        with self._lock:
+            self.write(self.take_dirty())
+
+    def items(self):
+        """Every (state, row): cached rows as they are, the rest straight from the database"""
+        with self._lock:
+            rows = list(self.hot.items())
+            cached = set(self.hot)
+            current_state, current = None, None
+            for state, action, value in self.conn.execute(
+                    "SELECT state, action, value FROM q_values ORDER BY state"):
+                if state in cached:
+                    continue
+                if state != current_state:
+                    if current:
+                        rows.append((current_state, self._ordered(current)))
+                    current_state, current = state, []
+                current.append((action, value))
+            if current:
+                rows.append((current_state, self._ordered(current)))
+        return rows
+
+    def values(self):
+        return [row for _, row in self.items()]
+
+    def import_rows(self, rows):
+        """Bulk-load a {state: {action: value}} table (e.g. a pickle snapshot) in one transaction"""
+        with self._lock:
+            now = time.time()
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                self.conn.executemany(UPSERT, [(state, action, value, now)
+                                               for state, row in rows.items() for action, value in row.items()])
+            self._stored = self.conn.execute("SELECT COUNT(DISTINCT state) FROM q_values").fetchone()[0]
+
+    def refresh(self):
+        """Forget clean cached rows so other processes' updates are read again"""
+        with self._lock:
+            pending = self._pending_cells()
+            dirty_states = {state for state, _ in pending} | self._unsaved
+            for state in [state for state in self.hot if state not in dirty_states]:
+                self._drop(state, pending)
+            self._stored = self.conn.execute("SELECT COUNT(DISTINCT state) FROM q_values").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self.hot.clear()
+            self.dirty.clear()
+            self.base.clear()
+            self._unsaved.clear()
+            with self.conn:
+                self.conn.execute("DELETE FROM q_values")
+            self._stored = 0
+
+    def close(self):
+        with self._lock:
+            try:
+                self.flush()
+            finally:
+                self.conn.close()
@@ -0,0 +1,177 @@
+"""
+Hyperparameter sweep for alpha / gamma / epsilon
+
+Trains one QLearningAgent per configuration against a SimulatedUser and
+ranks the configurations by how well and how fast they learn. Runs fan out
+over a process pool; every configuration sees the same seeds, so differences
+come from the hyperparameters rather than from luck.
+
+Values are comma-separated lists (grid search over every combination) or,
+with --random N, lo:hi ranges sampled uniformly (lists are sampled from).
+
+Usage:
+    python -m agent.sweep --alpha 0.05,0.1,0.2,0.5 --gamma 0,0.5,0.9 --epsilon 0.05,0.1,0.2
+    python -m agent.sweep --random 300 --alpha 0.01:0.8 --gamma 0:0.99 --epsilon 0:0.4 --out data/sweep.csv
+    python -m agent.sweep --mode q_learning bandit --alpha 0.1,0.2 --gamma 0.9 --epsilon 0.1
+"""
+
+import argparse
+import csv
+import itertools
+import multiprocessing as mp
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from agent.q_learning import MODES, QLearningAgent
+from agent.simulation import DEFAULT_ACTIONS, SimulatedUser
+
+PARAMETERS = ("alpha", "gamma", "epsilon")
+
+def parse_space(spec):
+    """'0.1,0.2' -> [0.1, 0.2]; '0.05:0.5' -> (0.05, 0.5) for random sampling"""
+    if ":" in spec:
+        lo, hi = spec.split(":")
+        return float(lo), float(hi)
+    return [float(value) for value in spec.split(",")]
+
+def grid_configs(space, modes):
+    if any(isinstance(values, tuple) for values in space.values()):
+        raise ValueError("lo:hi ranges need --random N")
+    return [dict(zip(PARAMETERS, values), mode=mode)
+            for mode in modes for values in itertools.product(*(space[p] for p in PARAMETERS))]
+
+def random_configs(space, modes, n, seed=0):
+    rng = np.random.default_rng(seed)
+    configs = []
+    for _ in range(n):
+        config = {}
+        for parameter in PARAMETERS:
+            values = space[parameter]
+            if isinstance(values, tuple):
+                config[parameter] = round(float(rng.uniform(*values)), 4)
+            else:
+                config[parameter] = float(rng.choice(values))
+        config["mode"] = modes[int(rng.integers(len(modes)))]
+        configs.append(config)
+    return configs
+
+def simulate(config, seed, episodes=100, tasks_per_episode=8, noise=0.0, correction_rate=1.0,
+             target=0.9, window=5):
+    """Train one agent; returns per-run metrics for `config`.
+
+    episodes_to_converge is the first episode at which the accuracy averaged
+    over the last `window` episodes reaches `target` (None if it never does);
+    final_accuracy is the share of intents whose greedy action is correct.
+    """
+    user = SimulatedUser(DEFAULT_ACTIONS, noise=noise, correction_rate=correction_rate, seed=seed)
+    random.seed(seed)  # select_action explores with the random module
+    agent = QLearningAgent(DEFAULT_ACTIONS, alpha=config["alpha"], gamma=config["gamma"],
+                           epsilon=config["epsilon"], q_path=os.devnull + ".pkl", autosave=False,
+                           mode=config["mode"])
+    accuracies = []
+    converged = None
+    for episode in range(1, episodes + 1):
+        correct = 0
+        for intent_id in user.sample_intents(tasks_per_episode).tolist():
+            state = user.intents[intent_id]
+            action = agent.select_action(state)
+            reward, correction = user.respond(intent_id, agent.action_index.ids[action])
+            agent.update_q_table(state, action, reward, state)
+            if correction >= 0:
+                agent.update_q_with_correction(state, action, DEFAULT_ACTIONS[correction])
+            correct += reward > 0
+        accuracies.append(correct / tasks_per_episode)
+        if converged is None and episode >= window and np.mean(accuracies[-window:]) >= target:
+            converged = episode
+
+    greedy = [agent.top_actions(state, 1)[0][0] == DEFAULT_ACTIONS[user.correct[i]]
+              for i, state in enumerate(user.intents)]
+    return {
+        "episodes_to_converge": converged,
+        "train_accuracy": float(np.mean(accuracies[-window:])),
+        "final_accuracy": float(np.mean(greedy)),
+    }
+
+def run_config(config, seeds, **kwargs):
+    """Average simulate() over `seeds` (runs inside a pool worker)"""
+    start = time.perf_counter()
+    runs = [simulate(config, seed, **kwargs) for seed in seeds]
+    converged = [run["episodes_to_converge"] for run in runs if run["episodes_to_converge"] is not None]
+    return {
+        **config,
+        # Mean over the seeds that converged; the fraction shows how many did
+        "episodes_to_converge": round(float(np.mean(converged)), 1) if converged else None,
+        "converged_runs": len(converged) / len(runs),
+        "train_accuracy": round(float(np.mean([run["train_accuracy"] for run in runs])), 4),
+        "final_accuracy": round(float(np.mean([run["final_accuracy"] for run in runs])), 4),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+def _rank_key(result):
+    converge = result["episodes_to_converge"]
+    return (-result["final_accuracy"], -result["converged_runs"], converge if converge is not None else float("inf"))
+
+def run_sweep(configs, seeds=(0, 1, 2), workers=None, **kwargs):
+    """Run every configuration across a process pool; returns results best-first"""
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        futures = [pool.submit(run_config, config, list(seeds), **kwargs) for config in configs]
+        results = [future.result() for future in futures]
+    return sorted(results, key=_rank_key)
+
+COLUMNS = ["mode", "alpha", "gamma", "epsilon", "final_accuracy", "train_accuracy",
+           "episodes_to_converge", "converged_runs", "seconds"]
+
+def print_results(results, limit=20):
+    print(f"{'mode':<11}{'alpha':>7}{'gamma':>7}{'eps':>7}{'final':>8}{'train':>8}{'conv@':>8}{'conv%':>7}")
+    print("-" * 63)
+    for result in results[:limit]:
+        converge = result["episodes_to_converge"]
+        print(f"{result['mode']:<11}{result['alpha']:>7.3f}{result['gamma']:>7.3f}{result['epsilon']:>7.3f}"
+              f"{result['final_accuracy']:>8.1%}{result['train_accuracy']:>8.1%}"
+              f"{'-' if converge is None else converge:>8}{result['converged_runs']:>7.0%}")
+
+def write_results(results, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(results)
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep alpha/gamma/epsilon over simulated training runs")
+    parser.add_argument("--alpha", default="0.05,0.1,0.2,0.5")
+    parser.add_argument("--gamma", default="0,0.5,0.9")
+    parser.add_argument("--epsilon", default="0.05,0.1,0.2")
+    parser.add_argument("--mode", nargs="+", choices=MODES, default=["q_learning"], help="Update modes to include")
+    parser.add_argument("--random", type=int, default=0, help="Sample N configurations instead of the full grid")
+    parser.add_argument("--seeds", type=int, default=3, help="Runs per configuration (seeds 0..N-1)")
+    parser.add_argument("--episodes", type=int, default=100)
+    parser.add_argument("--tasks-per-episode", type=int, default=8)
+    parser.add_argument("--noise", type=float, default=0.0, help="Probability a feedback answer is flipped")
+    parser.add_argument("--correction-rate", type=float, default=1.0)
+    parser.add_argument("--target", type=float, default=0.9, help="Accuracy that counts as converged")
+    parser.add_argument("--workers", type=int, default=None, help="Pool size (default: one per core)")
+    parser.add_argument("--top", type=int, default=20, help="Rows to print")
+    parser.add_argument("--out", help="Write the full results table to this CSV")
+    args = parser.parse_args()
+
+    space = {parameter: parse_space(getattr(args, parameter)) for parameter in PARAMETERS}
+    configs = random_configs(space, args.mode, args.random) if args.random else grid_configs(space, args.mode)
+    print(f"🔍 Sweeping {len(configs)} configurations x {args.seeds} seeds")
+
+    start = time.perf_counter()
+    results = run_sweep(configs, seeds=range(args.seeds), workers=args.workers, episodes=args.episodes,
+                        tasks_per_episode=args.tasks_per_episode, noise=args.noise,
+                        correction_rate=args.correction_rate, target=args.target)
+    print(f"✅ Done in {time.perf_counter() - start:.1f}s\n")
+    print_results(results, args.top)
+    if args.out:
+        write_results(results, args.out)
+        print(f"\n📄 Full results written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+SQLite task-log store
+
+The CSV task log is re-read in full for every chart. Given a log path ending
+in .db, the logger writes task and episode records into this SQLite database
+instead. Inserts are buffered and written in batches, one transaction each.
+The indexes cover the dashboard's aggregate queries: reward per intent,
+counts and feedback per action, reward per episode, time windows. Those
+queries read index pages only, not the whole table.
+
+Usage:
+    python -m agent.main --log-db                      # data/task_log.db
+    python -m agent.task_store import data/comprehensive_task_log.csv --db data/task_log.db
+    python -m agent.task_store summary --db data/task_log.db
+
+    from agent.task_store import get_task_store
+    store = get_task_store("data/task_log.db")
+    store.intent_rewards()  # [(intent, tasks, mean reward)]
+"""
+
+import argparse
+import atexit
+import csv
+import os
+import threading
+
+# Same columns, in the same order, as the CSV written by log_episode_enhanced
+TASK_COLUMNS = [
+    "Task_ID", "Parsed_Intent", "Action_Taken", "Base_Reward", "Total_Reward",
+    "Timestamp", "Confidence_Score", "User_Feedback", "Suggested_Correct_Action",
+    "Sigmoid_Confidence", "Softmax_Confidence", "Ranking_Confidence", "Follow_up_Task", "Follow_up_Accepted",
+    "Follow_up_Reward", "Chosen_Q_Value", "Mean_Other_Q_Values",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    Task_ID TEXT, Episode INTEGER,
+    Parsed_Intent TEXT, Action_Taken TEXT, Base_Reward REAL, Total_Reward REAL,
+    Timestamp TEXT, Confidence_Score REAL, User_Feedback TEXT, Suggested_Correct_Action TEXT,
+    Sigmoid_Confidence REAL, Softmax_Confidence REAL, Ranking_Confidence REAL, Follow_up_Task TEXT,
+    Follow_up_Accepted INTEGER, Follow_up_Reward REAL, Chosen_Q_Value REAL, Mean_Other_Q_Values REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_intent ON tasks (Parsed_Intent, Total_Reward);
+CREATE INDEX IF NOT EXISTS tasks_action ON tasks (Action_Taken, User_Feedback);
+CREATE INDEX IF NOT EXISTS tasks_episode ON tasks (Episode, Total_Reward);
+CREATE INDEX IF NOT EXISTS tasks_timestamp ON tasks (Timestamp);
+CREATE TABLE IF NOT EXISTS episodes (
+    Episode INTEGER, Total_Reward REAL, Timestamp TEXT
+);
+CREATE INDEX IF NOT EXISTS episodes_episode ON episodes (Episode, Total_Reward);
+"""
+
+INSERT_TASK = (f"INSERT INTO tasks (Episode, {', '.join(TASK_COLUMNS)}) "
+               f"VALUES ({', '.join('?' * (len(TASK_COLUMNS) + 1))})")
+
+def is_task_store_path(path):
+    return os.path.splitext(path)[1] in (".db", ".sqlite", ".sqlite3")
+
+def episode_of(task_id):
+    """Episode number from a "<episode>-<index>" task ID, or None"""
+    head = str(task_id).split("-", 1)[0]
+    return int(head) if head.isdigit() else None
+
+class TaskLogStore:
+    """Task and episode records in SQLite, with buffered batch inserts.
+
+    add_task() buffers a row; every `batch_size` rows (and on flush(),
+    add_episode(), any query and close()) the buffer is written in one
+    transaction. One connection is shared by all threads, serialized by a
+    lock, so the async pipeline's background logging can use the same store.
+    """
+
+    def __init__(self, path, batch_size=64):
+        import sqlite3
+
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def add_task(self, row):
+        """Buffer one task record ({column: value}, columns as in TASK_COLUMNS)"""
+        values = [episode_of(row.get("Task_ID"))] + [row.get(column) for column in TASK_COLUMNS]
+        with self._lock:
+            self._pending.append(values)
+            if len(self._pending) >= self.batch_size:
+                self._write_pending()
+
+    def add_episode(self, episode, total_reward, timestamp):
+        with self._lock:
+            self._write_pending()
+            self.conn.execute("INSERT INTO episodes (Episode, Total_Reward, Timestamp) VALUES (?, ?, ?)",
+                              (episode, total_reward, timestamp))
+
+    def _write_pending(self):
+        if self._pending:
+            rows, self._pending = self._pending, []
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                self.conn.executemany(INSERT_TASK, rows)
+
+    def flush(self):
+        with self._lock:
+            self._write_pending()
+
+    def query(self, sql, params=()):
+        """Rows of a query, after writing any buffered records"""
+        with self._lock:
+            self._write_pending()
+            return self.conn.execute(sql, params).fetchall()
+
+    def frame(self, sql, params=()):
+        """A query as a pandas DataFrame"""
+        import pandas as pd
+        with self._lock:
+            self._write_pending()
+            return pd.read_sql_query(sql, self.conn, params=params)
+
+    # Aggregates for the dashboard; each is answered from one of the indexes
+    def task_count(self):
+        return self.query("SELECT COUNT(*) FROM tasks")[0][0]
+
+    def intent_rewards(self):
+        """[(intent, tasks, mean total reward)], by intent"""
+        return self.query("SELECT Parsed_Intent, COUNT(*), AVG(Total_Reward) FROM tasks "
+                          "GROUP BY Parsed_Intent ORDER BY Parsed_Intent")
+
+    def action_counts(self):
+        """[(action, tasks)], most frequent first"""
+        return self.query("SELECT Action_Taken, COUNT(*) AS n FROM tasks GROUP BY Action_Taken ORDER BY n DESC")
+
+    def feedback_counts(self, action=None):
+        """(positive, negative) feedback counts, overall or for one action"""
+        where, params = ("WHERE Action_Taken = ?", (action,)) if action is not None else ("", ())
+        positive, negative = self.query(
+            "SELECT COALESCE(SUM(User_Feedback LIKE '%👍%'), 0), COALESCE(SUM(User_Feedback LIKE '%👎%'), 0) "
+            f"FROM tasks INDEXED BY tasks_action {where}", params)[0]
+        return positive, negative
+
+    def episode_rewards(self):
+        """[(episode, tasks, summed total reward)] from the task records"""
+        return self.query("SELECT Episode, COUNT(*), SUM(Total_Reward) FROM tasks "
+                          "WHERE Episode IS NOT NULL GROUP BY Episode ORDER BY Episode")
+
+    def episode_totals(self):
+        """Total reward of every logged episode, in logging order"""
+        return [total for total, in self.query("SELECT Total_Reward FROM episodes ORDER BY rowid")]
+
+    def tasks_between(self, start, end, columns=("Task_ID", "Parsed_Intent", "Action_Taken", "Total_Reward")):
+        """Task records with start <= Timestamp < end (ISO strings)"""
+        return self.query(f"SELECT {', '.join(columns)} FROM tasks WHERE Timestamp >= ? AND Timestamp < ? "
+                          "ORDER BY Timestamp", (start, end))
+
+    def reward_series(self):
+        """[(total reward, confidence)] per task in logging order, for the progression charts"""
+        return self.query("SELECT Total_Reward, Confidence_Score FROM tasks ORDER BY rowid")
+
+    def recent_frame(self, n=5):
+        return self.frame(f"SELECT {', '.join(TASK_COLUMNS)} FROM tasks ORDER BY rowid DESC LIMIT ?",
+                          (n,)).iloc[::-1]
+
+    def import_csv(self, path, batch_size=1000):
+        """Append the rows of a CSV task log; returns the number imported"""
+        imported = 0
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                record = {column: row.get(column) or row.get(column.replace("_", " ")) for column in TASK_COLUMNS}
+                if record["Follow_up_Accepted"] in ("True", "False"):
+                    record["Follow_up_Accepted"] = int(record["Follow_up_Accepted"] == "True")
+                self.add_task(record)
+                imported += 1
+                if imported % batch_size == 0:
+                    self.flush()
+        self.flush()
+        return imported
+
+    def close(self):
+        with self._lock:
+            try:
+                self._write_pending()
+            finally:
+                self.conn.close()
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_task_store(path):
+    """The process-wide TaskLogStore for `path`, opened once and flushed at exit"""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = TaskLogStore(path)
+            atexit.register(store.close)
+        return store
+
+def main():
+    parser = argparse.ArgumentParser(description="Import task logs into, or summarize, a SQLite task-log store")
+    parser.add_argument("command", choices=["import", "summary"])
+    parser.add_argument("csv_paths", nargs="*", help="CSV task logs to import")
+    parser.add_argument("--db", default="data/task_log.db")
+    args = parser.parse_args()
+
+    store = get_task_store(args.db)
+    if args.command == "import":
+        for path in args.csv_paths:
+            print(f"📥 Imported {store.import_csv(path):,} tasks from {path}")
+    print(f"🗃️  {store.task_count():,} tasks in {args.db}")
+    positive, negative = store.feedback_counts()
+    print(f"📝 Feedback: {positive:,} 👍 / {negative:,} 👎")
+    print("🧠 Average reward by intent:")
+    for intent, count, reward in store.intent_rewards():
+        print(f"   {intent:<20}{count:>7,}{reward:>9.2f}")
+
+if __name__ == "__main__":
+    main()
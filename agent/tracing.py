@@ -0,0 +1,145 @@
+"""
+Span tracing in Chrome trace format
+
+Records nested, timed spans (episode -> task -> select, feedback wait, Q
+update, persistence, logging, charts, the UX sleep) and writes them as a
+Chrome trace JSON file, which chrome://tracing and https://ui.perfetto.dev
+show as one timeline per thread. Only the latest `max_events` spans are
+kept, so a long-running process traces in bounded memory. Tracing is off unless start() is called or
+$RL_AGENT_TRACE names an output file; off, span() hands back a shared no-op
+context manager.
+
+Usage:
+    python -m agent.main --trace data/trace.json
+    RL_AGENT_TRACE=data/trace.json python quick_demo.py
+
+    from agent import tracing
+    with tracing.span("select", state=state):
+        ...
+"""
+
+import atexit
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+
+MAX_EVENTS = 200_000  # ~100 MB of span dicts at most
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class Span:
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+    def set(self, **args):
+        """Attach arguments known only once the span is running (e.g. the chosen action)"""
+        self.args.update(args)
+
+class Tracer:
+    """Collects complete ("X") events; nesting comes from time containment per thread
+
+    Spans go to a ring buffer of `max_events`: once full, the oldest are
+    dropped and counted in the trace's otherData.
+    """
+
+    def __init__(self, path=None, max_events=MAX_EVENTS):
+        self.path = path
+        self.pid = os.getpid()
+        self.events = deque(maxlen=max_events)
+        self.threads = {}  # Native thread id -> "thread_name" metadata event, never dropped
+        self.recorded = 0
+        self._counter = itertools.count(1)
+        self._origin = time.perf_counter_ns()
+
+    def span(self, name, **args):
+        return Span(self, name, args)
+
+    def record(self, name, start_ns, end_ns, args=None):
+        tid = threading.get_native_id()
+        if tid not in self.threads:
+            self.threads[tid] = {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+                                 "args": {"name": threading.current_thread().name}}
+        self.recorded = next(self._counter)
+        # deque.append and next() on a count are atomic, so spans from several threads need no lock
+        self.events.append({
+            "name": name, "ph": "X", "pid": self.pid, "tid": tid,
+            "ts": (start_ns - self._origin) / 1000, "dur": (end_ns - start_ns) / 1000,
+            "args": args or {},
+        })
+
+    @property
+    def dropped(self):
+        """Spans pushed out of the ring buffer so far"""
+        return max(0, self.recorded - len(self.events))
+
+    def write(self, path=None):
+        """Write the trace atomically, like write_q_snapshot"""
+        path = path or self.path
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        trace = {"traceEvents": list(self.threads.values()) + list(self.events), "displayTimeUnit": "ms",
+                 "otherData": {"dropped_spans": self.dropped}}
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(trace, f, default=str)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+_tracer = None
+
+def start(path):
+    """Start recording; the trace is written to `path` by stop() or at exit"""
+    global _tracer
+    _tracer = Tracer(path)
+    atexit.register(stop)
+    return _tracer
+
+def stop():
+    """Write the trace and stop recording; returns the path written, if any"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return None
+    tracer.write()
+    return tracer.path
+
+def enabled():
+    return _tracer is not None
+
+def span(name, **args):
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, **args)
+
+if os.environ.get("RL_AGENT_TRACE"):
+    start(os.environ["RL_AGENT_TRACE"])
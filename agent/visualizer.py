@@ -1,10 +1,25 @@
 import os
-import matplotlib.pyplot as plt
-import numpy as np
+import sys
 from datetime import datetime
 
+from agent import metrics
+from agent.task_store import get_task_store, is_task_store_path
+
+CHART_HELP = "Rendering and saving one chart"
+
+def _pyplot():
+    """Import pyplot on first use, forcing the non-interactive Agg backend"""
+    if "matplotlib.pyplot" not in sys.modules:
+        import matplotlib
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+@metrics.timed("chart_render_seconds", CHART_HELP, chart="learning_curve")
 def plot_rewards(rewards, output_path="data/learning_curve.png"):
     """Enhanced reward plotting with better visualization"""
+    import numpy as np
+    plt = _pyplot()
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
     # Create figure with subplots
@@ -51,23 +66,60 @@ def plot_rewards(rewards, output_path="data/learning_curve.png"):
     plt.close()
     print(f"💾 Saved enhanced reward chart to: {output_path}")
 
+def _dashboard_data(task_log_path):
+    """What the dashboard plots: per-task series plus aggregates.
+
+    A SQLite task log (.db) answers the aggregates with indexed SQL queries;
+    a CSV log is read whole and aggregated in pandas.
+    """
+    import pandas as pd
+    
+    if is_task_store_path(task_log_path):
+        store = get_task_store(task_log_path)
+        series = pd.DataFrame(store.reward_series(), columns=['Total_Reward', 'Confidence_Score'])
+        actions = store.action_counts()
+        intents = store.intent_rewards()
+        return {
+            'rewards': series['Total_Reward'],
+            'confidence': series['Confidence_Score'],
+            'action_counts': pd.Series([n for _, n in actions], index=[a for a, _ in actions]),
+            'feedback': store.feedback_counts(),
+            'intent_rewards': pd.Series([r for _, _, r in intents], index=[i for i, _, _ in intents]),
+        }
+    
+    df = pd.read_csv(task_log_path)
+    data = {
+        'rewards': df['Total_Reward'],
+        'confidence': df['Confidence_Score'] if 'Confidence_Score' in df.columns else None,
+        'action_counts': df['Action_Taken'].value_counts(),
+        'feedback': None,
+        'intent_rewards': df.groupby('Parsed_Intent')['Total_Reward'].mean() if 'Total_Reward' in df.columns else pd.Series([1]),
+    }
+    if 'User_Feedback' in df.columns:
+        data['feedback'] = (len(df[df['User_Feedback'].str.contains('👍', na=False)]),
+                            len(df[df['User_Feedback'].str.contains('👎', na=False)]))
+    if 'Q_Value_Difference' in df.columns and data['confidence'] is not None:
+        data['q_value_difference'] = df['Q_Value_Difference']
+    return data
+
+@metrics.timed("chart_render_seconds", CHART_HELP, chart="dashboard")
 def create_performance_dashboard(task_log_path, output_path="data/dashboard.png"):
-    """Create a comprehensive performance dashboard"""
+    """Create a comprehensive performance dashboard from a CSV or SQLite (.db) task log"""
     try:
-        import pandas as pd
+        plt = _pyplot()
         
         # Read task log data
-        df = pd.read_csv(task_log_path)
+        data = _dashboard_data(task_log_path)
         
         # Create dashboard with multiple subplots
         fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12))
         
         # 1. Reward over time with confidence overlay
-        task_numbers = range(len(df))
-        ax1.plot(task_numbers, df['Total_Reward'], marker='o', label='Total Reward', linewidth=2)
-        if 'Confidence_Score' in df.columns:
+        task_numbers = range(len(data['rewards']))
+        ax1.plot(task_numbers, data['rewards'], marker='o', label='Total Reward', linewidth=2)
+        if data['confidence'] is not None:
             ax1_twin = ax1.twinx()
-            ax1_twin.plot(task_numbers, df['Confidence_Score'], '--', color='orange', alpha=0.7, label='Confidence')
+            ax1_twin.plot(task_numbers, data['confidence'], '--', color='orange', alpha=0.7, label='Confidence')
             ax1_twin.set_ylabel('Confidence Score', color='orange')
             ax1_twin.legend(loc='upper right')
         ax1.set_title('🎯 Reward & Confidence Progression')
@@ -77,16 +129,14 @@ def create_performance_dashboard(task_log_path, output_path="data/dashboard.png"
         ax1.grid(True, alpha=0.3)
         
         # 2. Action frequency
-        action_counts = df['Action_Taken'].value_counts()
+        action_counts = data['action_counts']
         ax2.pie(action_counts.values, labels=action_counts.index, autopct='%1.1f%%', startangle=90)
         ax2.set_title('🔄 Action Distribution')
         
         # 3. Feedback distribution with follow-up acceptance
         feedback_data = []
-        if 'User_Feedback' in df.columns:
-            positive = len(df[df['User_Feedback'].str.contains('👍', na=False)])
-            negative = len(df[df['User_Feedback'].str.contains('👎', na=False)])
-            feedback_data = [positive, negative]
+        if data['feedback'] is not None:
+            feedback_data = list(data['feedback'])
             labels = ['👍 Positive', '👎 Negative']
             colors = ['green', 'red']
         else:
@@ -99,16 +149,16 @@ def create_performance_dashboard(task_log_path, output_path="data/dashboard.png"
         ax3.set_ylabel('Count')
         
         # 4. Learning trend by confidence and Q-value differences
-        if 'Q_Value_Difference' in df.columns and 'Confidence_Score' in df.columns:
-            scatter = ax4.scatter(df['Q_Value_Difference'], df['Confidence_Score'], 
-                                c=df['Total_Reward'], cmap='RdYlGn', alpha=0.6, s=50)
+        if 'q_value_difference' in data:
+            scatter = ax4.scatter(data['q_value_difference'], data['confidence'], 
+                                c=data['rewards'], cmap='RdYlGn', alpha=0.6, s=50)
             ax4.set_xlabel('Q-Value Difference')
             ax4.set_ylabel('Confidence Score')
             ax4.set_title('🧠 Q-Value vs Confidence (Color = Reward)')
             plt.colorbar(scatter, ax=ax4, label='Total Reward')
         else:
             # Fallback: show average reward by intent
-            intent_rewards = df.groupby('Parsed_Intent')['Total_Reward'].mean() if 'Total_Reward' in df.columns else pd.Series([1])
+            intent_rewards = data['intent_rewards']
             ax4.barh(range(len(intent_rewards)), intent_rewards.values)
             ax4.set_yticks(range(len(intent_rewards)))
             ax4.set_yticklabels(intent_rewards.index if len(intent_rewards) > 1 else ['Sample'])
@@ -125,17 +175,25 @@ def create_performance_dashboard(task_log_path, output_path="data/dashboard.png"
     except Exception as e:
         print(f"⚠️ Error creating dashboard: {e}")
 
+@metrics.timed("chart_render_seconds", CHART_HELP, chart="confidence")
 def plot_confidence_analysis(task_log_path, output_path="data/confidence_analysis.png"):
-    """Create detailed confidence score analysis visualization"""
+    """Create detailed confidence score analysis visualization from a CSV or SQLite (.db) task log"""
     try:
+        import numpy as np
         import pandas as pd
         
-        df = pd.read_csv(task_log_path)
+        if is_task_store_path(task_log_path):
+            # Only the two columns plotted, not whole records
+            df = pd.DataFrame(get_task_store(task_log_path).reward_series(),
+                              columns=['Total_Reward', 'Confidence_Score'])
+        else:
+            df = pd.read_csv(task_log_path)
         
         if 'Confidence_Score' not in df.columns:
             print("⚠️ No confidence data available for analysis")
             return
         
+        plt = _pyplot()
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
         
         # Confidence distribution
@@ -6,39 +6,645 @@ addressing reviewer concern #9 about voice-ready infrastructure.
 
 Note: This is infrastructure preparation. Full voice integration 
 would require platform-specific optimizations and user microphone setup.
+
+Recognition goes through a backend: "google" (the web API), "local"
+(offline, via pocketsphinx, vosk or whisper) or "stub" (deterministic
+transcripts, no model). Batch mode transcribes a directory of WAV files across
+a process pool and reports throughput, and accuracy where a transcript sits
+next to a WAV file (take_1.wav + take_1.txt).
+
+Usage:
+    python -m agent.voice_interface                                  # demo
+    python -m agent.voice_interface transcribe data/voice --backend local --workers 4
+    python -m agent.voice_interface transcribe data/voice --backend stub --transcripts data/voice/stub.json
 """
 
+import heapq
+import itertools
+import math
 import os
+import queue
 import sys
+import threading
+import time
+from array import array
+
+# Voice libraries are imported on first use so that importing this module
+# stays cheap and silent for callers that never touch the microphone.
+sr = None
+pyttsx3 = None
+VOICE_AVAILABLE = None  # Resolved by load_voice_dependencies()
+
+def load_speech_recognition():
+    """Import speech_recognition once, returning whether it is available"""
+    global sr
+    if sr is None:
+        try:
+            import speech_recognition as _sr
+            sr = _sr
+        except ImportError:
+            return False
+    return True
+
+def load_voice_dependencies():
+    """Import speech_recognition and pyttsx3 once, returning whether they are available"""
+    global pyttsx3, VOICE_AVAILABLE
+    if VOICE_AVAILABLE is None:
+        try:
+            import pyttsx3 as _pyttsx3
+            pyttsx3 = _pyttsx3
+            VOICE_AVAILABLE = load_speech_recognition()
+        except ImportError:
+            VOICE_AVAILABLE = False
+        if not VOICE_AVAILABLE:
+            print("⚠️ Voice dependencies not installed. Run: pip install speechrecognition pyttsx3 pyaudio")
+    return VOICE_AVAILABLE
+
+class RecognizerBackend:
+    """Turns captured AudioData into text.
+
+    transcribe() raises sr.UnknownValueError when the audio holds nothing it
+    can make out, and sr.RequestError when the recognizer itself fails.
+    `name` is the audio's file name, when it came from one.
+    """
+
+    name = None
+
+    def __init__(self, recognizer=None):
+        load_speech_recognition()
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def transcribe(self, audio, name=None):
+        raise NotImplementedError
+
+    def read(self, path):
+        """The whole of an audio file (WAV, AIFF or FLAC) as AudioData"""
+        with sr.AudioFile(path) as source:
+            return self.recognizer.record(source)
+
+class GoogleBackend(RecognizerBackend):
+    """Google's web speech API: a network round trip per utterance"""
+
+    name = "google"
+
+    def transcribe(self, audio, name=None):
+        return self.recognizer.recognize_google(audio)
+
+class LocalBackend(RecognizerBackend):
+    """Offline recognition with a locally installed engine.
+
+    engine is "sphinx" (pip install pocketsphinx), "vosk" (pip install vosk,
+    model in ./model), "whisper" (pip install openai-whisper) or
+    "faster_whisper"; `options` go to the matching recognize_<engine> call,
+    e.g. model="base.en" for whisper.
+    """
+
+    name = "local"
+    ENGINES = ("sphinx", "vosk", "whisper", "faster_whisper")
+
+    def __init__(self, engine="sphinx", recognizer=None, **options):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown local engine {engine!r}; expected one of {', '.join(self.ENGINES)}")
+        super().__init__(recognizer)
+        self.engine = engine
+        self.options = options
+        self._recognize = getattr(self.recognizer, f"recognize_{engine}")
+
+    def transcribe(self, audio, name=None):
+        text = self._recognize(audio, **self.options)
+        if self.engine == "vosk":
+            import json
+            text = json.loads(text).get("text", "")  # recognize_vosk returns the raw JSON result
+        if not text.strip():
+            raise sr.UnknownValueError()
+        return text
+
+class StubBackend(RecognizerBackend):
+    """Deterministic transcripts for tests and throughput benchmarks; no model, no network.
+
+    `transcripts` maps a WAV file name or the SHA-1 of the raw audio to its
+    text (a dict, or the path of a JSON file holding one). Audio with no entry
+    gets `default`, or is reported as unintelligible when default is None.
+    `delay` adds a fixed cost per utterance to stand in for a real model.
+    """
+
+    name = "stub"
+
+    def __init__(self, transcripts=None, default=None, delay=0.0, recognizer=None):
+        super().__init__(recognizer)
+        if isinstance(transcripts, str):
+            import json
+            with open(transcripts, encoding="utf-8") as f:
+                transcripts = json.load(f)
+        self.transcripts = transcripts or {}
+        self.default = default
+        self.delay = delay
+
+    def transcribe(self, audio, name=None):
+        import hashlib
+
+        if self.delay:
+            time.sleep(self.delay)
+        text = self.transcripts.get(name) if name is not None else None
+        if text is None:
+            text = self.transcripts.get(hashlib.sha1(audio.get_raw_data()).hexdigest(), self.default)
+        if text is None:
+            raise sr.UnknownValueError()
+        return text
+
+BACKENDS = {backend.name: backend for backend in (GoogleBackend, LocalBackend, StubBackend)}
+
+def get_backend(name="google", **options):
+    """A recognizer backend by name ("google", "local", "stub")"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown recognizer backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name](**options)
+
+POSITIVE_WORDS = ('correct', 'good', 'right', 'yes', 'positive')
+NEGATIVE_WORDS = ('incorrect', 'wrong', 'bad', 'no', 'negative')
+
+def classify_feedback(text):
+    """'👍', '👎' or None for a transcript, matching whole feedback words"""
+    words = set(text.lower().replace(",", " ").replace(".", " ").split()) if text else set()
+    if words & set(NEGATIVE_WORDS):
+        return "👎"  # Checked first: a correction ("no, the right one is ...") is negative
+    if words & set(POSITIVE_WORDS):
+        return "👍"
+    return None
+
+_SAMPLE_TYPES = {1: "b", 2: "h", 4: "i"}  # Signed PCM sample width -> array typecode
+
+def frame_rms(frame, sample_width):
+    """Root mean square of signed little-endian PCM samples, like audioop.rms (gone in Python 3.13)"""
+    scale = 1
+    if sample_width == 3:  # No 24-bit array type: widen each sample with a low zero byte
+        frame = b"".join(b"\0" + frame[i:i + 3] for i in range(0, len(frame) - 2, 3))
+        sample_width, scale = 4, 256
+    samples = array(_SAMPLE_TYPES[sample_width], frame[:len(frame) - len(frame) % sample_width])
+    if not samples:
+        return 0
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return int(math.sqrt(sum(sample * sample for sample in samples) / len(samples)) / scale)
+
+class KeywordSpotter:
+    """Listens for a small vocabulary on short frames, without full transcription.
+
+    listen() reads `frame_seconds` of audio at a time. Nothing is spotted until
+    a frame is louder than the recognizer's energy threshold. From then on
+    every frame goes to feed(), and the first spotted feedback word ends the
+    listen. The return value is (feedback, audio heard); feedback is None when
+    no word was spotted, and the audio is kept for a full-recognition fallback.
+    Subclasses implement reset() and feed(frame, sample_rate, sample_width),
+    which returns spotted text or None.
+    """
+
+    def __init__(self, words=POSITIVE_WORDS + NEGATIVE_WORDS, frame_seconds=0.05, pause_seconds=0.5):
+        self.words = tuple(words)
+        self.frame_seconds = frame_seconds
+        self.pause_seconds = pause_seconds  # Silence that ends the utterance
+
+    def reset(self):
+        pass
+
+    def feed(self, frame, sample_rate, sample_width):
+        raise NotImplementedError
+
+    def finish(self):
+        """Spotted text once the utterance has ended, or None"""
+        return None
+
+    def listen(self, source, energy_threshold, timeout=3, max_seconds=2.0):
+        frame_size = max(1, int(source.SAMPLE_RATE * self.frame_seconds))
+        frame_time = frame_size / source.SAMPLE_RATE
+        preroll = []  # A little audio from before the onset, so the first syllable is not clipped
+        heard = []
+        waited = spoken = quiet = 0.0
+        feedback = None
+        self.reset()
+        while True:
+            frame = source.stream.read(frame_size)
+            if not frame:
+                break  # A file source has run out
+            loud = frame_rms(frame, source.SAMPLE_WIDTH) > energy_threshold
+            if not heard and not loud:
+                waited += frame_time
+                if waited >= timeout:
+                    return None, None
+                preroll = (preroll + [frame])[-2:]
+                continue
+            if not heard:
+                for early in preroll:
+                    self.feed(early, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+                heard.extend(preroll)
+            heard.append(frame)
+            spoken += frame_time
+            quiet = 0.0 if loud else quiet + frame_time
+            feedback = classify_feedback(self.feed(frame, source.SAMPLE_RATE, source.SAMPLE_WIDTH))
+            if feedback or quiet >= self.pause_seconds or spoken >= max_seconds:
+                break
+        if heard and not feedback:
+            feedback = classify_feedback(self.finish())
+        audio = sr.AudioData(b"".join(heard), source.SAMPLE_RATE, source.SAMPLE_WIDTH) if heard else None
+        return feedback, audio
+
+class SphinxKeywordSpotter(KeywordSpotter):
+    """PocketSphinx keyword search, streaming: one decoder, loaded once, fed frame by frame.
+
+    Needs pocketsphinx (pip install pocketsphinx) and speech_recognition's
+    bundled en-US model. `sensitivity` runs from 0 (misses words) to 1 (false
+    alarms), as in recognize_sphinx's keyword_entries.
+    """
+
+    def __init__(self, words=POSITIVE_WORDS + NEGATIVE_WORDS, sensitivity=0.7, language="en-US", **kwargs):
+        super().__init__(words, **kwargs)
+        import tempfile
+
+        load_speech_recognition()
+        try:
+            from pocketsphinx import pocketsphinx
+        except ImportError:
+            raise sr.RequestError("missing PocketSphinx module: pip install pocketsphinx")
+        language_directory = os.path.join(os.path.dirname(sr.__file__), "pocketsphinx-data", language)
+        config = pocketsphinx.Config()
+        config.set_string("-hmm", os.path.join(language_directory, "acoustic-model"))
+        config.set_string("-dict", os.path.join(language_directory, "pronounciation-dictionary.dict"))
+        config.set_string("-logfn", os.devnull)
+        self.decoder = pocketsphinx.Decoder(config)
+        with tempfile.NamedTemporaryFile("w", suffix=".kws", delete=False) as f:
+            f.writelines(f"{word} /1e{100 * sensitivity - 110}/\n" for word in self.words)
+        try:
+            self.decoder.add_kws("feedback", f.name)
+        finally:
+            os.remove(f.name)
+        self.decoder.activate_search("feedback")
+        self._in_utterance = False
+
+    def reset(self):
+        if self._in_utterance:
+            self.decoder.end_utt()
+        self.decoder.start_utt()
+        self._in_utterance = True
+
+    def feed(self, frame, sample_rate, sample_width):
+        raw = sr.AudioData(frame, sample_rate, sample_width).get_raw_data(convert_rate=16000, convert_width=2)
+        self.decoder.process_raw(raw, False, False)
+        hypothesis = self.decoder.hyp()
+        return hypothesis.hypstr if hypothesis is not None else None
+
+    def finish(self):
+        self.decoder.end_utt()
+        self._in_utterance = False
+        hypothesis = self.decoder.hyp()
+        return hypothesis.hypstr if hypothesis is not None else None
+
+class BackendKeywordSpotter(KeywordSpotter):
+    """Spots words by running a recognizer backend over a short sliding window.
+
+    Every `hop_seconds` of speech the last `window_seconds` are transcribed.
+    With a StubBackend this is a deterministic spotter for tests; with a fast
+    local backend it trades some accuracy for not waiting on the whole phrase.
+    """
+
+    def __init__(self, backend, window_seconds=1.0, hop_seconds=0.2, **kwargs):
+        super().__init__(**kwargs)
+        self.backend = backend
+        self.window_seconds = window_seconds
+        self.hop_seconds = hop_seconds
+
+    def reset(self):
+        self._frames = []
+        self._since_check = 0.0
+        self._format = None
+
+    def feed(self, frame, sample_rate, sample_width):
+        self._format = (sample_rate, sample_width)
+        self._frames.append(frame)
+        self._since_check += len(frame) / (sample_rate * sample_width)
+        if self._since_check < self.hop_seconds:
+            return None
+        self._since_check = 0.0
+        keep = int(self.window_seconds * sample_rate) * sample_width
+        window = b"".join(self._frames)[-keep:]
+        self._frames = [window]
+        return self._transcribe(window, sample_rate, sample_width)
+
+    def finish(self):
+        if not self._frames:
+            return None
+        return self._transcribe(b"".join(self._frames), *self._format)
+
+    def _transcribe(self, window, sample_rate, sample_width):
+        try:
+            return self.backend.transcribe(sr.AudioData(window, sample_rate, sample_width))
+        except sr.UnknownValueError:
+            return None
+
+_END = object()  # Queued after the last phrase of a finite source (a WAV file)
+
+class BackgroundListener:
+    """Continuous capture on one thread, recognition on another.
+
+    The capture thread opens `source` once, calibrates the recognizer's
+    energy threshold once (again every `calibrate_every` seconds, between
+    phrases, if set) and then listens back to back, putting each finished
+    phrase on a bounded audio queue. When recognition falls behind, the
+    oldest phrase is dropped. The recognition thread turns phrases into text
+    with `recognize(audio)`, and get_phrase() hands the text out.
+
+    `source` is any speech_recognition AudioSource: sr.Microphone() live, or
+    sr.AudioFile("task.wav") to replay a recording. A file source ends the
+    listener when it runs out.
+    """
+
+    def __init__(self, recognizer, source, recognize, calibration_duration=1.0, calibrate_every=None,
+                 phrase_time_limit=3, max_queued=8, listen_timeout=1.0):
+        load_speech_recognition()
+        self.recognizer = recognizer
+        self.source = source
+        self.recognize = recognize
+        self.calibration_duration = calibration_duration
+        self.calibrate_every = calibrate_every
+        self.phrase_time_limit = phrase_time_limit
+        self.listen_timeout = listen_timeout  # How often the capture loop checks for stop()
+        self.audio = queue.Queue(max_queued)
+        self.phrases = queue.Queue()
+        self.dropped = 0
+        self.calibrations = 0
+        self.errors = 0
+        self._calibrated_at = None
+        self._stop = threading.Event()
+        self._capture_thread = threading.Thread(target=self._capture, name="voice-capture", daemon=True)
+        self._recognize_thread = threading.Thread(target=self._recognize, name="voice-recognize", daemon=True)
+
+    def start(self):
+        self._capture_thread.start()
+        self._recognize_thread.start()
+        return self
+
+    def _calibrate(self, source):
+        self.recognizer.adjust_for_ambient_noise(source, duration=self.calibration_duration)
+        self._calibrated_at = time.monotonic()
+        self.calibrations += 1
 
-try:
-    import speech_recognition as sr
-    import pyttsx3
-    VOICE_AVAILABLE = True
-except ImportError:
-    VOICE_AVAILABLE = False
-    print("⚠️ Voice dependencies not installed. Run: pip install speechrecognition pyttsx3 pyaudio")
+    def _capture(self):
+        try:
+            with self.source as source:
+                self._calibrate(source)
+                while not self._stop.is_set():
+                    if self.calibrate_every and time.monotonic() - self._calibrated_at >= self.calibrate_every:
+                        self._calibrate(source)
+                    try:
+                        audio = self.recognizer.listen(source, timeout=self.listen_timeout,
+                                                       phrase_time_limit=self.phrase_time_limit)
+                    except sr.WaitTimeoutError:
+                        continue
+                    if not audio.frame_data:
+                        break  # A file source has run out
+                    self._enqueue(audio)
+        except Exception as e:
+            self.errors += 1
+            print(f"❌ Voice capture error: {e}")
+        finally:
+            self.audio.put(_END)
+
+    def _enqueue(self, audio):
+        while True:
+            try:
+                self.audio.put_nowait(audio)
+                return
+            except queue.Full:
+                try:
+                    self.audio.get_nowait()  # Drop the oldest phrase; a fresh one matters more
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _recognize(self):
+        while True:
+            audio = self.audio.get()
+            if audio is _END:
+                self.phrases.put(_END)
+                return
+            try:
+                text = self.recognize(audio)
+            except sr.UnknownValueError:
+                continue  # Not speech, or not intelligible
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Voice recognition error: {e}")
+                continue
+            if text:
+                self.phrases.put(text.lower().strip())
+
+    def get_phrase(self, timeout=None):
+        """Next recognized phrase, or None on timeout or once the source has ended"""
+        try:
+            text = self.phrases.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if text is _END:
+            self.phrases.put(_END)  # Every later call sees the end too
+            return None
+        return text
+
+    def __iter__(self):
+        """Phrases until the source ends (for file sources)"""
+        while True:
+            text = self.phrases.get()
+            if text is _END:
+                self.phrases.put(_END)
+                return
+            yield text
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._capture_thread.join(timeout)
+        self._recognize_thread.join(timeout)
+
+class SpeechQueue:
+    """Speaks announcements on a worker thread so callers never wait for TTS.
+
+    say() queues text and returns at once. The worker speaks the most urgent
+    announcement first (lowest priority number), in order within a priority.
+    Announcements with the same `key` supersede each other: a newer progress
+    message replaces one still waiting. Beyond `max_pending` waiting
+    announcements the least urgent is dropped, and an announcement that waited
+    longer than its max_age seconds is skipped as stale.
+
+    Only the worker thread drives the engine, as pyttsx3 expects.
+    """
+
+    URGENT, NORMAL, LOW = 0, 1, 2
+
+    def __init__(self, engine, max_pending=8, max_age=10.0):
+        self.engine = engine
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.spoken = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.expired = 0
+        self._heap = []  # [priority, seq, text, key, deadline]; text None once cancelled
+        self._keys = {}
+        self._seq = itertools.count()
+        self._pending = 0
+        self._speaking = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="voice-tts", daemon=True)
+        self._thread.start()
+
+    def say(self, text, priority=NORMAL, key=None, max_age=None):
+        """Queue `text`; returns False if it was dropped instead"""
+        max_age = self.max_age if max_age is None else max_age
+        with self._cond:
+            if self._closed:
+                return False
+            superseded = self._keys.get(key) if key is not None else None
+            if superseded is not None:
+                self._cancel(superseded)
+                self.coalesced += 1
+            if self._pending >= self.max_pending:
+                least = max((entry for entry in self._heap if entry[2] is not None), key=lambda e: (e[0], -e[1]))
+                if least[0] < priority:
+                    self.dropped += 1  # Everything waiting is more urgent
+                    return False
+                self._cancel(least)
+                self.dropped += 1
+            entry = [priority, next(self._seq), text, key, time.monotonic() + max_age if max_age else None]
+            heapq.heappush(self._heap, entry)
+            self._pending += 1
+            if key is not None:
+                self._keys[key] = entry
+            self._cond.notify_all()
+        return True
+
+    def _cancel(self, entry):
+        # Left in the heap and skipped when popped
+        entry[2] = None
+        self._pending -= 1
+        if self._keys.get(entry[3]) is entry:
+            del self._keys[entry[3]]
+
+    def _next(self):
+        with self._cond:
+            while True:
+                while self._heap:
+                    entry = heapq.heappop(self._heap)
+                    if entry[2] is None:
+                        continue
+                    self._pending -= 1
+                    if self._keys.get(entry[3]) is entry:
+                        del self._keys[entry[3]]
+                    if entry[4] is not None and time.monotonic() > entry[4]:
+                        self.expired += 1
+                        continue
+                    self._speaking = True
+                    return entry[2]
+                self._speaking = False
+                self._cond.notify_all()
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+    def _run(self):
+        while True:
+            text = self._next()
+            if text is None:
+                return
+            try:
+                self.engine.say(text)
+                self.engine.runAndWait()
+                self.spoken += 1
+            except Exception as e:
+                print(f"❌ Text-to-speech error: {e}")
+
+    def pending(self):
+        with self._cond:
+            return self._pending
+
+    def wait(self, timeout=None):
+        """Block until everything queued has been spoken; returns False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._speaking, timeout)
+
+    def close(self, timeout=None):
+        """Stop after the current announcement; anything still queued is discarded"""
+        with self._cond:
+            self._closed = True
+            for entry in self._heap:
+                entry[2] = None
+            self._heap.clear()
+            self._keys.clear()
+            self._pending = 0
+            self._cond.notify_all()
+        self._thread.join(timeout)
 
 class VoiceInterface:
     """Voice-to-text and text-to-speech interface for the RL agent"""
     
-    def __init__(self):
-        """Initialize voice interface components"""
-        self.speech_available = VOICE_AVAILABLE
+    def __init__(self, source=None, backend="google", spotter="sphinx", **backend_options):
+        """Initialize voice interface components
+
+        Args:
+            source: AudioSource to listen to instead of the microphone,
+                e.g. sr.AudioFile("task.wav")
+            backend: Recognizer backend name ("google", "local", "stub") or instance
+            spotter: KeywordSpotter for feedback words, "sphinx", or None to
+                always use full recognition for feedback
+        """
+        self.speech_available = load_voice_dependencies()
+        self.listener = None
+        self.spotter = spotter
+        self._calibrated = False
         
         if self.speech_available:
             self.recognizer = sr.Recognizer()
-            self.microphone = sr.Microphone()
+            self.backend = (get_backend(backend, recognizer=self.recognizer, **backend_options)
+                            if isinstance(backend, str) else backend)
+            self.microphone = source if source is not None else sr.Microphone()
             self.tts_engine = pyttsx3.init()
             
             # Configure TTS
             self.tts_engine.setProperty('rate', 150)  # Speed
             self.tts_engine.setProperty('volume', 0.8)  # Volume
+            self.speech = SpeechQueue(self.tts_engine)
             
             print("🎤 Voice interface initialized successfully")
         else:
             print("🔇 Voice interface not available - dependencies missing")
     
+    def recognize(self, audio):
+        """Text for captured audio, from the configured backend"""
+        return self.backend.transcribe(audio)
+    
+    def start_listening(self, calibrate_every=300, **kwargs):
+        """Capture continuously in the background (see BackgroundListener).
+
+        listen_for_task and listen_for_feedback then take the next phrase
+        recognized in the background, with no calibration or microphone
+        start-up per prompt.
+        """
+        if not self.speech_available:
+            return None
+        if self.listener is None:
+            self.listener = BackgroundListener(self.recognizer, self.microphone, self.recognize,
+                                               calibrate_every=calibrate_every, **kwargs).start()
+            print("🎤 Listening in the background")
+        return self.listener
+    
+    def stop_listening(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+    
+    def close(self):
+        """Stop background listening and the speech worker"""
+        self.stop_listening()
+        if self.speech_available:
+            self.speech.close()
+    
     def listen_for_task(self, timeout=5, phrase_limit=3):
         """
         Listen for voice input and convert to text task
@@ -54,12 +660,22 @@ class VoiceInterface:
             print("❌ Voice recognition not available")
             return None
         
+        if self.listener is not None:
+            text = self.listener.get_phrase(timeout=timeout)
+            if text is None:
+                print("⏰ No speech detected within timeout")
+            else:
+                print(f"📝 Recognized: '{text}'")
+            return text
+        
         try:
             print("🎤 Listening for task... (speak now)")
             
             with self.microphone as source:
-                # Adjust for ambient noise
-                self.recognizer.adjust_for_ambient_noise(source, duration=1)
+                # Adjust for ambient noise once, not before every prompt
+                if not self._calibrated:
+                    self.recognizer.adjust_for_ambient_noise(source, duration=1)
+                    self._calibrated = True
                 
                 # Listen for audio
                 audio = self.recognizer.listen(
@@ -71,7 +687,7 @@ class VoiceInterface:
             print("🔄 Processing speech...")
             
             # Convert speech to text
-            text = self.recognizer.recognize_google(audio)
+            text = self.recognize(audio)
             print(f"📝 Recognized: '{text}'")
             
             return text.lower().strip()
@@ -89,10 +705,37 @@ class VoiceInterface:
             print(f"❌ Voice recognition error: {e}")
             return None
     
+    def _keyword_spotter(self):
+        """The feedback spotter, built on first use; None if unavailable (falls back to full recognition)"""
+        if self.spotter == "sphinx":
+            try:
+                self.spotter = SphinxKeywordSpotter()
+            except Exception as e:
+                print(f"⚠️ Keyword spotting unavailable, using full recognition for feedback: {e}")
+                self.spotter = None
+        return self.spotter
+    
+    def spot_feedback(self, timeout=3, max_seconds=2.0):
+        """
+        Listen for a feedback word with the keyword spotter, stopping as soon as one is heard
+        
+        Returns:
+            tuple: ('👍', '👎' or None, AudioData heard or None)
+        """
+        with self.microphone as source:
+            if not self._calibrated:
+                self.recognizer.adjust_for_ambient_noise(source, duration=1)
+                self._calibrated = True
+            return self._keyword_spotter().listen(source, self.recognizer.energy_threshold,
+                                                  timeout=timeout, max_seconds=max_seconds)
+    
     def listen_for_feedback(self, timeout=3):
         """
         Listen for voice feedback (positive/negative)
         
+        The keyword spotter answers as soon as it hears a feedback word.
+        Anything else it heard (say, a correction) goes to full recognition.
+        
         Returns:
             str: '👍' or '👎' or None
         """
@@ -102,48 +745,48 @@ class VoiceInterface:
         try:
             print("🎤 Say 'correct' or 'incorrect' for feedback...")
             
-            text = self.listen_for_task(timeout=timeout, phrase_limit=2)
-            
-            if text:
-                # Parse feedback
-                positive_words = ['correct', 'good', 'right', 'yes', 'positive']
-                negative_words = ['incorrect', 'wrong', 'bad', 'no', 'negative']
-                
-                text_lower = text.lower()
-                
-                if any(word in text_lower for word in positive_words):
-                    print("✅ Voice feedback: Positive")
-                    return "👍"
-                elif any(word in text_lower for word in negative_words):
-                    print("❌ Voice feedback: Negative")
-                    return "👎"
-                else:
-                    print("❓ Voice feedback unclear")
-                    return None
+            if self.listener is None and self._keyword_spotter() is not None:
+                feedback, audio = self.spot_feedback(timeout=timeout)
+                if feedback is None and audio is not None:
+                    try:
+                        feedback = classify_feedback(self.recognize(audio))
+                    except sr.UnknownValueError:
+                        pass
+                elif audio is None:
+                    print("⏰ No speech detected within timeout")
+            else:
+                feedback = classify_feedback(self.listen_for_task(timeout=timeout, phrase_limit=2))
             
-            return None
+            if feedback == "👍":
+                print("✅ Voice feedback: Positive")
+            elif feedback == "👎":
+                print("❌ Voice feedback: Negative")
+            else:
+                print("❓ Voice feedback unclear")
+            return feedback
             
         except Exception as e:
             print(f"❌ Voice feedback error: {e}")
             return None
     
-    def speak(self, text):
+    def speak(self, text, priority=SpeechQueue.NORMAL, key=None, wait=False):
         """
-        Convert text to speech
+        Convert text to speech on the speech worker, without waiting for it
         
         Args:
             text (str): Text to speak
+            priority (int): SpeechQueue.URGENT, NORMAL or LOW
+            key (str): Announcements with the same key replace each other while queued
+            wait (bool): Block until the speech queue has drained
         """
         if not self.speech_available:
             print(f"🔇 TTS not available: {text}")
             return
         
-        try:
-            print(f"🔊 Speaking: {text}")
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
-        except Exception as e:
-            print(f"❌ Text-to-speech error: {e}")
+        print(f"🔊 Speaking: {text}")
+        self.speech.say(text, priority=priority, key=key)
+        if wait:
+            self.speech.wait()
     
     def announce_task(self, task, action, confidence):
         """
@@ -155,16 +798,86 @@ class VoiceInterface:
             confidence (float): Confidence score
         """
         message = f"Task: {task}. I will {action}. Confidence: {confidence:.1%}"
-        self.speak(message)
+        self.speak(message, key="task")
     
     def announce_feedback_request(self):
         """Request feedback via voice"""
-        self.speak("Was that action correct? Say correct or incorrect.")
+        self.speak("Was that action correct? Say correct or incorrect.", priority=SpeechQueue.URGENT, key="feedback")
     
     def announce_learning_progress(self, episode, reward):
-        """Announce learning progress"""
+        """Announce learning progress; only the latest waiting progress message is spoken"""
         message = f"Episode {episode} complete. Total reward: {reward}"
-        self.speak(message)
+        self.speak(message, priority=SpeechQueue.LOW, key="progress")
+
+_worker_backend = None
+
+def _init_worker(backend, options):
+    # One backend per pool process, so a local model is loaded once, not per file
+    global _worker_backend
+    _worker_backend = get_backend(backend, **options)
+
+def _transcribe_path(path):
+    start = time.perf_counter()
+    name = os.path.basename(path)
+    text, error, audio_seconds = None, None, 0.0
+    try:
+        audio = _worker_backend.read(path)
+        audio_seconds = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+        text = _worker_backend.transcribe(audio, name=name).lower().strip()
+    except sr.UnknownValueError:
+        error = "unintelligible"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {"file": name, "text": text, "error": error,
+            "audio_seconds": round(audio_seconds, 3), "seconds": round(time.perf_counter() - start, 4)}
+
+def _expected_text(path):
+    transcript = os.path.splitext(path)[0] + ".txt"
+    if not os.path.exists(transcript):
+        return None
+    with open(transcript, encoding="utf-8") as f:
+        return f.read().lower().strip()
+
+def transcribe_directory(directory, backend="stub", workers=None, pattern="*.wav", **options):
+    """Transcribe every WAV file in `directory` across a process pool.
+
+    Returns one dict per file, in file-name order: file, text, error, expected
+    (from a .txt transcript beside the WAV, if any), audio_seconds, seconds.
+    workers=1 transcribes in this process.
+    """
+    import glob
+    import multiprocessing as mp
+    from concurrent.futures import ProcessPoolExecutor
+
+    load_speech_recognition()
+    paths = sorted(glob.glob(os.path.join(directory, pattern)))
+    if workers == 1 or len(paths) <= 1:
+        _init_worker(backend, options)
+        results = [_transcribe_path(path) for path in paths]
+    else:
+        workers = min(workers or os.cpu_count() or 1, len(paths))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(backend, options)) as pool:
+            results = list(pool.map(_transcribe_path, paths, chunksize=max(1, len(paths) // (workers * 4))))
+    for path, result in zip(paths, results):
+        result["expected"] = _expected_text(path)
+    return results
+
+def batch_summary(results, wall_seconds):
+    """Throughput and, where transcripts exist, exact-match accuracy of a batch"""
+    audio = sum(result["audio_seconds"] for result in results)
+    checked = [result for result in results if result["expected"] is not None]
+    return {
+        "files": len(results),
+        "errors": sum(result["error"] is not None for result in results),
+        "audio_seconds": round(audio, 2),
+        "wall_seconds": round(wall_seconds, 3),
+        "files_per_second": round(len(results) / wall_seconds, 2) if wall_seconds else None,
+        "real_time_factor": round(wall_seconds / audio, 4) if audio else None,  # < 1 is faster than real time
+        "checked": len(checked),
+        "accuracy": (round(sum(result["text"] == result["expected"] for result in checked) / len(checked), 4)
+                     if checked else None),
+    }
 
 def demo_voice_interface():
     """Demonstrate voice interface capabilities"""
@@ -189,7 +902,7 @@ def demo_voice_interface():
     print("   • TTS: Agent announcements and confirmations")
     
     # Demo TTS
-    voice.speak("Voice interface is ready for reinforcement learning training")
+    voice.speak("Voice interface is ready for reinforcement learning training", wait=True)
     
     print("\n✅ Voice infrastructure verified and ready")
     print("🏗️ Infrastructure includes:")
@@ -199,5 +912,44 @@ def demo_voice_interface():
     print("   • Error handling and fallbacks")
     print("   • Configurable speech parameters")
 
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Voice interface demo, or batch transcription of WAV files")
+    parser.add_argument("command", nargs="?", choices=["demo", "transcribe"], default="demo")
+    parser.add_argument("directory", nargs="?", help="Directory of WAV files to transcribe")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="stub")
+    parser.add_argument("--engine", default="sphinx", help=f"Local engine: {', '.join(LocalBackend.ENGINES)}")
+    parser.add_argument("--transcripts", help="Stub backend: JSON of {file name or audio SHA-1: text}")
+    parser.add_argument("--workers", type=int, default=None, help="Pool size (default: one per core)")
+    parser.add_argument("--json", action="store_true", help="Print per-file results and the summary as JSON")
+    args = parser.parse_args()
+
+    if args.command == "demo":
+        demo_voice_interface()
+        return
+    if not args.directory:
+        parser.error("transcribe needs a directory of WAV files")
+    if not load_speech_recognition():
+        sys.exit("⚠️ speechrecognition is not installed. Run: pip install speechrecognition")
+
+    options = {"local": {"engine": args.engine}, "stub": {"transcripts": args.transcripts}}.get(args.backend, {})
+    start = time.perf_counter()
+    results = transcribe_directory(args.directory, backend=args.backend, workers=args.workers, **options)
+    summary = batch_summary(results, time.perf_counter() - start)
+    if args.json:
+        print(json.dumps({"results": results, "summary": summary}, indent=2))
+        return
+    for result in results:
+        mark = "" if result["expected"] is None else (" ✅" if result["text"] == result["expected"] else " ❌")
+        print(f"   {result['file']:<30}{result['seconds']:>8.3f}s  {result['text'] or result['error']}{mark}")
+    print(f"🎧 {summary['files']} files, {summary['audio_seconds']:.1f}s of audio in {summary['wall_seconds']:.2f}s "
+          f"({summary['files_per_second']} files/s, real-time factor {summary['real_time_factor']})")
+    if summary["accuracy"] is not None:
+        print(f"🎯 Accuracy: {summary['accuracy']:.1%} of {summary['checked']} transcribed files")
+    if summary["errors"]:
+        print(f"❌ {summary['errors']} files failed")
+
 if __name__ == "__main__":
-    demo_voice_interface()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for the agent package
+
+Short-lived CLI invocations pay the full cost of importing the agent before
+any task runs, so this script measures a cold `import agent.q_learning` in a
+fresh interpreter and fails if it exceeds the budget. It also verifies that
+importing the core modules does not drag in heavy optional dependencies.
+
+Usage:
+    python benchmarks/import_time.py [--budget-ms 50] [--runs 7]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported when a feature actually needs them
+HEAVY_MODULES = ["matplotlib", "numpy", "pandas", "speech_recognition", "pyttsx3"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"elapsed": elapsed, "heavy": heavy}}))
+"""
+
+def measure_import(module, runs):
+    """Import a module in `runs` fresh interpreters, returning (best_seconds, heavy_modules_loaded)"""
+    best = float("inf")
+    heavy = set()
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        best = min(best, sample["elapsed"])
+        heavy.update(sample["heavy"])
+    return best, sorted(heavy)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if importing the agent core exceeds a time budget")
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.environ.get("RL_AGENT_IMPORT_BUDGET_MS", 50)),
+                        help="Maximum allowed cold import time for agent.q_learning (default: 50 ms)")
+    parser.add_argument("--runs", type=int, default=7, help="Fresh interpreters per module (best run is kept)")
+    args = parser.parse_args()
+
+    failed = False
+    print("⏱️  Agent import-time benchmark")
+    print("-" * 50)
+    for module in ("agent.q_learning", "agent.main", "agent.voice_interface"):
+        best, heavy = measure_import(module, args.runs)
+        print(f"{module:<24} {best * 1000:8.2f} ms   heavy deps: {', '.join(heavy) or 'none'}")
+        if heavy:
+            print(f"❌ {module} eagerly imports: {', '.join(heavy)}")
+            failed = True
+        if module == "agent.q_learning" and best * 1000 > args.budget_ms:
+            print(f"❌ agent.q_learning import took {best * 1000:.2f} ms (budget {args.budget_ms:.0f} ms)")
+            failed = True
+    print("-" * 50)
+
+    if failed:
+        sys.exit(1)
+    print(f"✅ Within budget ({args.budget_ms:.0f} ms) with no heavy imports")
+
+if __name__ == "__main__":
+    main()
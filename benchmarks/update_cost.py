@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Per-update cost of Q-learning vs. bandit updates
+
+Every front-end calls update_q_table(intent, action, reward, intent). In
+q_learning mode each update also bootstraps from the (identical) next-state
+row; bandit mode does not. This script times updates and greedy selection
+in both modes with persistence disabled.
+
+Usage:
+    python benchmarks/update_cost.py [--updates 200000] [--states 50]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.q_learning import QLearningAgent
+
+ACTIONS = ["open", "mute", "play", "unmute", "close", "screenshot", "set_dnd"]
+
+def make_agent(mode, bandit_step="constant"):
+    agent = QLearningAgent(ACTIONS, q_path=os.devnull + ".pkl", autosave=False, epsilon=0.0,
+                           mode=mode, bandit_step=bandit_step)
+    agent.q = {}
+    return agent
+
+def time_updates(agent, workload):
+    start = time.perf_counter()
+    for state, action, reward in workload:
+        agent.update_q_table(state, action, reward, state)
+    return (time.perf_counter() - start) / len(workload)
+
+def time_selects(agent, states, n):
+    start = time.perf_counter()
+    for i in range(n):
+        agent.select_action(states[i % len(states)])
+    return (time.perf_counter() - start) / n
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-update cost of q_learning and bandit modes")
+    parser.add_argument("--updates", type=int, default=200000)
+    parser.add_argument("--states", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    states = [f"intent_{i}" for i in range(args.states)]
+    workload = [(rng.choice(states), rng.choice(ACTIONS), rng.choice((2, -2))) for _ in range(args.updates)]
+
+    print(f"⏱️  {args.updates} updates over {args.states} states x {len(ACTIONS)} actions")
+    print("-" * 60)
+    print(f"{'mode':<22}{'update (µs)':>14}{'select (µs)':>14}")
+    baseline = None
+    for label, mode, step in (("q_learning", "q_learning", "constant"),
+                              ("bandit (constant)", "bandit", "constant"),
+                              ("bandit (mean)", "bandit", "mean")):
+        agent = make_agent(mode, step)
+        per_update = time_updates(agent, workload)
+        per_select = time_selects(agent, states, args.updates)
+        baseline = baseline or per_update
+        print(f"{label:<22}{per_update * 1e6:>14.3f}{per_select * 1e6:>14.3f}"
+              f"   ({baseline / per_update:.2f}x update speed)")
+    print("-" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ import time
 from datetime import datetime
 sys.path.append('.')
 
+from agent import events
 from agent.q_learning import QLearningAgent
 from agent.logger import log_episode_enhanced, log_total_reward
 from agent.feedback import get_feedback_with_correction
@@ -202,6 +203,7 @@ def verify_q_table_persistence():
         os.remove("data/persistence_test.pkl")
 
 if __name__ == "__main__":
+    events.attach_console()
     try:
         run_enhanced_demo()
         verify_q_table_persistence()
@@ -10,6 +10,7 @@ import sys
 import time
 sys.path.append('.')
 
+from agent import events
 from agent.q_learning import QLearningAgent
 from agent.logger import log_episode
 from agent.feedback import get_feedback
@@ -204,4 +205,5 @@ if __name__ == "__main__":
         print("⚠️ Please run: python3 generate_complete_demo.py first")
         sys.exit(1)
     
+    events.attach_console()
     run_complete_demo()
\ No newline at end of file
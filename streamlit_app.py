@@ -1,17 +1,21 @@
 import streamlit as st
 import pandas as pd
 import os
-import time
-from datetime import datetime
-import matplotlib.pyplot as plt
-import pickle
 
 # Import our modules
 import sys
 sys.path.append('.')
-from agent.q_learning import QLearningAgent
+from agent.concurrency import get_shared_agent
+from agent.service import QTableClient
 from agent.logger import log_episode, log_total_reward
-from agent.visualizer import plot_rewards, create_performance_dashboard
+from agent.task_store import get_task_store, is_task_store_path
+
+ACTIONS = ["open", "mute", "play", "unmute", "close", "screenshot", "set_dnd"]
+Q_TABLE_PATH = os.path.join("data", "q_table.pkl")
+TASK_FILE_PATH = os.path.join("data", "task_log.txt")
+# $RL_AGENT_TASK_DB=data/task_log.db logs to the indexed SQLite store and queries it with SQL
+TASK_LOG_PATH = os.environ.get("RL_AGENT_TASK_DB") or os.path.join("data", "task_log.csv")
+EPISODE_LOG_PATH = TASK_LOG_PATH if is_task_store_path(TASK_LOG_PATH) else os.path.join("data", "episode_log.txt")
 
 # Configure Streamlit page
 st.set_page_config(
@@ -45,12 +49,57 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_agent(q_path=Q_TABLE_PATH):
+    """Load the Q-table once per server process and share the handle across reruns and sessions"""
+    address = os.environ.get("RL_AGENT_SERVICE")
+    if address:
+        return QTableClient(address)
+    return get_shared_agent(ACTIONS, q_path=q_path, mode=os.environ.get("RL_AGENT_MODE", "q_learning"))
+
+def file_mtime(path):
+    """Modification time used as a cache key, or None when the file is missing"""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+@st.cache_data
+def load_task_list(path, mtime):
+    """Parse the task file; cached until the file's mtime changes"""
+    if mtime is None:
+        return []
+    with open(path, "r") as f:
+        return [line.strip().split(" - ")[1] for line in f.readlines() if " - " in line]
+
+@st.cache_data
+def load_log_frame(path, mtime):
+    """Read the task log CSV; cached until the file's mtime changes"""
+    if mtime is None:
+        return pd.DataFrame()
+    return pd.read_csv(path)
+
+def recent_activity(n=5):
+    """Last n task records: an indexed tail query on the SQLite store, else the tail of the cached CSV"""
+    if is_task_store_path(TASK_LOG_PATH):
+        return get_task_store(TASK_LOG_PATH).recent_frame(n)
+    return load_log_frame(TASK_LOG_PATH, file_mtime(TASK_LOG_PATH)).tail(n)
+
+def intent_rewards():
+    """Tasks and mean reward per intent: a GROUP BY over the intent index, or a pandas groupby for CSV"""
+    if is_task_store_path(TASK_LOG_PATH):
+        rows = get_task_store(TASK_LOG_PATH).intent_rewards()
+        return pd.DataFrame(rows, columns=["Intent", "Tasks", "Mean Reward"]).set_index("Intent")
+    df = load_log_frame(TASK_LOG_PATH, file_mtime(TASK_LOG_PATH))
+    if df.empty:
+        return df
+    grouped = df.groupby("Parsed_Intent")["Total_Reward"]
+    return pd.DataFrame({"Tasks": grouped.size(), "Mean Reward": grouped.mean()}).rename_axis("Intent")
+
 def initialize_session_state():
     """Initialize session state variables"""
     if 'agent' not in st.session_state:
-        st.session_state.agent = QLearningAgent(
-            actions=["open", "mute", "play", "unmute", "close", "screenshot", "set_dnd"]
-        )
+        st.session_state.agent = get_agent()
     if 'current_task_index' not in st.session_state:
         st.session_state.current_task_index = 0
     if 'current_episode' not in st.session_state:
@@ -59,75 +108,88 @@ def initialize_session_state():
         st.session_state.episode_reward = 0
     if 'total_rewards' not in st.session_state:
         st.session_state.total_rewards = []
-    if 'task_list' not in st.session_state:
-        load_tasks()
+    if 'awaiting_correction' not in st.session_state:
+        st.session_state.awaiting_correction = False
+    load_tasks()
 
 def load_tasks():
-    """Load tasks from file"""
-    task_file_path = os.path.join("data", "task_log.txt")
-    try:
-        with open(task_file_path, "r") as f:
-            st.session_state.task_list = [
-                line.strip().split(" - ")[1] for line in f.readlines() 
-                if " - " in line
-            ]
-    except FileNotFoundError:
-        st.error(f"Task file not found: {task_file_path}")
-        st.session_state.task_list = []
+    """Load tasks from file (served from the mtime-keyed cache)"""
+    mtime = file_mtime(TASK_FILE_PATH)
+    if mtime is None:
+        st.error(f"Task file not found: {TASK_FILE_PATH}")
+    st.session_state.task_list = load_task_list(TASK_FILE_PATH, mtime)
+
+def current_decision():
+    """Agent decision for the current task, computed once per task rather than on every rerun"""
+    index = st.session_state.current_task_index
+    if index >= len(st.session_state.task_list):
+        return None
+    decision = st.session_state.get('decision')
+    if decision is None or decision['index'] != index or decision['episode'] != st.session_state.current_episode:
+        agent = st.session_state.agent
+        task = st.session_state.task_list[index]
+        parsed_intent = agent.parse_state(task)
+        action = agent.select_action(parsed_intent)
+        decision = {
+            'index': index,
+            'episode': st.session_state.current_episode,
+            'task': task,
+            'intent': parsed_intent,
+            'action': action,
+            'next_best': agent.get_next_best_action(parsed_intent),
+            'confidence': agent.get_action_confidence(parsed_intent, action),
+        }
+        st.session_state.decision = decision
+    return decision
 
 def display_current_task():
     """Display the current task and get agent's action"""
-    if st.session_state.current_task_index < len(st.session_state.task_list):
-        task = st.session_state.task_list[st.session_state.current_task_index]
-        parsed_intent = task.lower().split()[0]
-        
-        # Get agent's action
-        action = st.session_state.agent.select_action(parsed_intent)
-        next_best = st.session_state.agent.get_next_best_action(parsed_intent)
-        confidence = st.session_state.agent.get_action_confidence(parsed_intent, action)
-        
-        # Display task information
-        st.markdown(f"""
-        <div class="task-card">
-            <h3>📋 Task {st.session_state.current_task_index + 1} (Episode {st.session_state.current_episode})</h3>
-            <p><strong>Task:</strong> {task}</p>
-            <p><strong>🎯 Agent's Action:</strong> <code>{action}</code></p>
-            <p><strong>💡 Next Best Option:</strong> <code>{next_best}</code></p>
-            <p><strong>📊 Confidence:</strong> {confidence:.2f}</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        return task, parsed_intent, action, next_best, confidence
-    else:
+    decision = current_decision()
+    if decision is None:
         return None, None, None, None, None
+    
+    # Display task information
+    st.markdown(f"""
+    <div class="task-card">
+        <h3>📋 Task {st.session_state.current_task_index + 1} (Episode {st.session_state.current_episode})</h3>
+        <p><strong>Task:</strong> {decision['task']}</p>
+        <p><strong>🎯 Agent's Action:</strong> <code>{decision['action']}</code></p>
+        <p><strong>💡 Next Best Option:</strong> <code>{decision['next_best']}</code></p>
+        <p><strong>📊 Confidence:</strong> {decision['confidence']:.2f}</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    return decision['task'], decision['intent'], decision['action'], decision['next_best'], decision['confidence']
 
 def handle_feedback(task, parsed_intent, action, feedback_type, correction=None):
     """Enhanced feedback handler with proper confidence integration"""
     task_id = f"{st.session_state.current_episode}-{st.session_state.current_task_index + 1}"
+    agent = st.session_state.agent
     
-    # Get actual agent confidence
-    confidence = st.session_state.agent.get_action_confidence(parsed_intent, action)
+    # Confidence shown to the user for this decision
+    confidence = st.session_state.decision['confidence']
     
     # Calculate reward based on feedback
     if feedback_type == "👍":
         reward = 2
         feedback_text = "👍 Correct"
         suggestion = ""
+        st.session_state.flash = ("success", "✅ Positive feedback recorded!")
     else:  # feedback_type == "👎"
         reward = -2
         feedback_text = "👎 Incorrect"
         suggestion = correction or "No suggestion provided"
+        st.session_state.flash = ("error", "❌ Negative feedback recorded" + (f" — 📝 Suggestion: {correction}" if correction else ""))
         # Bonus reward for providing correction
         if correction:
             reward += 1
-            st.success("🎆 Bonus +1 reward for providing correction!")
     
     # Update Q-table
-    st.session_state.agent.update_q_table(parsed_intent, action, reward, parsed_intent)
+    agent.update_q_table(parsed_intent, action, reward, parsed_intent)
     
     # Enhanced logging with actual confidence
     log_episode(
-        log_path=os.path.join("data", "task_log.csv"),
+        log_path=TASK_LOG_PATH,
         task_id=task_id,
         intent=parsed_intent,
         action=action,
@@ -142,26 +204,42 @@ def handle_feedback(task, parsed_intent, action, feedback_type, correction=None)
     
     # Move to next task
     st.session_state.current_task_index += 1
+    st.session_state.awaiting_correction = False
     
     # Check if episode is complete
     if st.session_state.current_task_index >= len(st.session_state.task_list):
         complete_episode()
 
+def on_correct(task, parsed_intent, action):
+    """Button callback: runs before the rerun, so no explicit rerun or sleep is needed"""
+    handle_feedback(task, parsed_intent, action, "👍")
+
+def on_incorrect():
+    """Button callback: open the correction form for the current task"""
+    st.session_state.awaiting_correction = True
+
+def on_submit_correction(task, parsed_intent, action):
+    """Form callback: record negative feedback with the suggested action"""
+    correction = st.session_state.get(f"correction_{st.session_state.current_task_index}", "").strip()
+    handle_feedback(task, parsed_intent, action, "👎", correction)
+
 def complete_episode():
     """Complete the current episode and start a new one"""
     # Log episode reward
     log_total_reward(
         st.session_state.current_episode, 
         st.session_state.episode_reward, 
-        os.path.join("data", "episode_log.txt")
+        EPISODE_LOG_PATH
     )
     
-    # Store episode reward
+    # Store episode reward for the learning curve
     st.session_state.total_rewards.append(st.session_state.episode_reward)
     
     # Show episode summary
-    st.success(f"✅ Episode {st.session_state.current_episode} Complete!")
-    st.info(f"Total Reward: {st.session_state.episode_reward}")
+    st.session_state.flash = (
+        "success",
+        f"✅ Episode {st.session_state.current_episode} Complete! Total Reward: {st.session_state.episode_reward}"
+    )
     
     # Reset for next episode
     st.session_state.current_episode += 1
@@ -169,7 +247,30 @@ def complete_episode():
     st.session_state.episode_reward = 0
     
     # Save Q-table
-    st.session_state.agent.save_q_table("data/q_table.pkl")
+    st.session_state.agent.save_q_table(Q_TABLE_PATH)
+
+def reset_training():
+    """Button callback: clear all session state"""
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+
+def render_learning_curve():
+    """Native line chart of the reward of every finished episode.
+
+    The chart's frame lives in session state and only the episodes finished
+    since the last run are appended to it. The chart element itself is
+    redrawn on every run: Streamlit rebuilds all elements on a rerun, and
+    add_rows only appends to an element created earlier in the same run.
+    """
+    rewards = st.session_state.total_rewards
+    frame = st.session_state.get('reward_frame')
+    if frame is None or len(frame) > len(rewards):
+        frame = pd.DataFrame({"Total Reward": []}, dtype=float)
+    if len(frame) < len(rewards):
+        new = pd.DataFrame({"Total Reward": rewards[len(frame):]}, index=range(len(frame), len(rewards)), dtype=float)
+        frame = new if frame.empty else pd.concat([frame, new])
+    st.session_state.reward_frame = frame
+    st.line_chart(frame)
 
 def main():
     """Main Streamlit application"""
@@ -179,6 +280,10 @@ def main():
     st.markdown('<h1 class="main-header">🤖 RL Controlled Agent</h1>', unsafe_allow_html=True)
     st.markdown("---")
     
+    flash = st.session_state.pop('flash', None)
+    if flash:
+        getattr(st, flash[0])(flash[1])
+    
     # Sidebar for statistics and controls
     with st.sidebar:
         st.header("📊 Statistics")
@@ -192,14 +297,12 @@ def main():
         
         st.markdown("---")
         st.header("🎮 Controls")
-        if st.button("🔄 Reset Training"):
-            # Reset all session state
-            for key in list(st.session_state.keys()):
-                del st.session_state[key]
-            st.experimental_rerun()
+        st.button("🔄 Reset Training", on_click=reset_training)
         
         if st.button("💾 Save Q-Table"):
-            st.session_state.agent.save_q_table("data/q_table.pkl")
+            st.session_state.agent.save_q_table(Q_TABLE_PATH)
+            if hasattr(st.session_state.agent, 'writer'):
+                st.session_state.agent.writer.flush()
             st.success("Q-table saved!")
     
     # Main content area
@@ -212,6 +315,7 @@ def main():
         task_data = display_current_task()
         if task_data[0] is not None:
             task, parsed_intent, action, next_best, confidence = task_data
+            index = st.session_state.current_task_index
             
             st.markdown("### 💭 Provide Live Feedback")
             
@@ -219,25 +323,20 @@ def main():
             col_feedback1, col_feedback2 = st.columns(2)
             
             with col_feedback1:
-                if st.button("👍 Correct Action", use_container_width=True, key=f"correct_{st.session_state.current_task_index}"):
-                    handle_feedback(task, parsed_intent, action, "👍")
-                    st.success("✅ Positive feedback recorded!")
-                    time.sleep(1)
-                    st.rerun()
+                st.button("👍 Correct Action", use_container_width=True, key=f"correct_{index}",
+                          on_click=on_correct, args=(task, parsed_intent, action))
             
             with col_feedback2:
-                if st.button("👎 Incorrect Action", use_container_width=True, key=f"incorrect_{st.session_state.current_task_index}"):
-                    # Correction input in sidebar for better UX
-                    with st.sidebar:
-                        st.header("💡 Correction Suggestion")
-                        correction = st.text_input("Suggest correct action:", key=f"correction_{st.session_state.current_task_index}")
-                        if st.button("Submit Correction", key=f"submit_{st.session_state.current_task_index}"):
-                            handle_feedback(task, parsed_intent, action, "👎", correction)
-                            st.error("❌ Negative feedback recorded")
-                            if correction:
-                                st.info(f"📝 Suggestion: {correction}")
-                            time.sleep(1)
-                            st.rerun()
+                st.button("👎 Incorrect Action", use_container_width=True, key=f"incorrect_{index}",
+                          on_click=on_incorrect)
+            
+            if st.session_state.awaiting_correction:
+                # Correction input in sidebar for better UX
+                with st.sidebar:
+                    st.header("💡 Correction Suggestion")
+                    st.text_input("Suggest correct action:", key=f"correction_{index}")
+                    st.button("Submit Correction", key=f"submit_{index}",
+                              on_click=on_submit_correction, args=(task, parsed_intent, action))
             
             # Real-time confidence and next-best display
             st.markdown(f"""ℹ️ **Agent Confidence:** {confidence:.2f} | **Alternative:** {next_best}""")
@@ -250,24 +349,18 @@ def main():
         
         # Show learning curve if we have data
         if st.session_state.total_rewards:
-            fig, ax = plt.subplots(figsize=(8, 6))
-            episodes = range(1, len(st.session_state.total_rewards) + 1)
-            ax.plot(episodes, st.session_state.total_rewards, marker='o', linewidth=2)
-            ax.set_title("Learning Curve")
-            ax.set_xlabel("Episode")
-            ax.set_ylabel("Total Reward")
-            ax.grid(True, alpha=0.3)
-            st.pyplot(fig)
+            render_learning_curve()
         
         # Show recent task log
         st.header("📝 Recent Activity")
-        try:
-            df = pd.read_csv("data/task_log.csv")
-            if not df.empty:
-                # Show last 5 entries
-                st.dataframe(df.tail(5), use_container_width=True)
-        except FileNotFoundError:
+        df = recent_activity(5)
+        if not df.empty:
+            # Show last 5 entries
+            st.dataframe(df, use_container_width=True)
+            st.header("🧠 Reward by Intent")
+            st.dataframe(intent_rewards(), use_container_width=True)
+        else:
             st.info("No task log available yet.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,47 @@
+import pytest
+
+from agent.concurrency import ConcurrentQLearningAgent, get_shared_agent
+from agent.q_learning import QLearningAgent
+
+ACTIONS = ["open", "close", "mute"]
+
+def test_constant_step_does_not_bootstrap(tmp_path):
+    agent = QLearningAgent(ACTIONS, alpha=0.5, q_path=str(tmp_path / "q.pkl"), autosave=False, mode="bandit")
+    agent.q["open"] = {"open": 0.0, "close": 10.0, "mute": 0.0}  # A bootstrapped update would pull this in
+    agent.update_q_table("open", "open", 2, "open")
+    assert agent.q["open"]["open"] == pytest.approx(1.0)
+
+def test_mean_step_averages_rewards(tmp_path):
+    agent = QLearningAgent(ACTIONS, q_path=str(tmp_path / "q.pkl"), autosave=False, mode="bandit",
+                           bandit_step="mean")
+    for reward in (2, -2, 2, 2):
+        agent.update_q_table("open", "open", reward, "open")
+    assert agent.q["open"]["open"] == pytest.approx(1.0)
+    assert agent.counts["open"] == {"open": 4}
+
+def test_reloaded_values_take_the_constant_step_first(tmp_path):
+    q_path = str(tmp_path / "q.pkl")
+    agent = QLearningAgent(ACTIONS, alpha=0.25, q_path=q_path, autosave=False, mode="bandit", bandit_step="mean")
+    agent.update_q_table("open", "open", 2, "open")
+    agent.save_q_table()
+
+    reloaded = QLearningAgent(ACTIONS, alpha=0.25, q_path=q_path, autosave=False, mode="bandit",
+                              bandit_step="mean")
+    assert reloaded.counts == {}  # Counts are not part of the snapshot
+    reloaded.update_q_table("open", "open", -2, "open")
+    assert reloaded.q["open"]["open"] == pytest.approx(2 + 0.25 * (-2 - 2))
+    reloaded.update_q_table("open", "open", 2, "open")
+    assert reloaded.q["open"]["open"] == pytest.approx(1 + (2 - 1) / 5)
+
+def test_concurrent_agent_passes_the_update_rule_through(tmp_path):
+    agent = ConcurrentQLearningAgent(ACTIONS, q_path=str(tmp_path / "q.pkl"), mode="bandit", bandit_step="mean")
+    shared = get_shared_agent(ACTIONS, q_path=str(tmp_path / "shared.pkl"), mode="bandit", bandit_step="mean")
+    try:
+        for candidate in (agent, shared):
+            assert (candidate.mode, candidate.bandit_step) == ("bandit", "mean")
+            for reward in (2, -2):
+                candidate.update_q_table("open", "open", reward, "open")
+            assert candidate.q["open"]["open"] == pytest.approx(0.0)
+    finally:
+        agent.writer.close()
+        shared.writer.close()
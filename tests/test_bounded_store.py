@@ -0,0 +1,85 @@
+import gc
+import glob
+import os
+import tracemalloc
+
+import pytest
+
+from agent.q_learning import QLearningAgent
+from agent.store import BoundedQStore
+
+ACTIONS = ["open", "close", "mute"]
+
+def test_spilled_rows_read_back(tmp_path):
+    store = BoundedQStore(2, ACTIONS, str(tmp_path / "q.spill"))
+    for i in range(5):
+        store[f"s{i}"] = {"open": float(i), "close": -float(i)}
+    assert len(store.hot) == 2
+    assert len(store) == 5
+    assert store["s0"] == {"open": 0.0, "close": -0.0}
+    assert dict(store.items())["s3"] == {"open": 3.0, "close": -3.0}
+    store.close()
+
+def test_visit_eviction_keeps_hot_rows(tmp_path):
+    store = BoundedQStore(10, ACTIONS, str(tmp_path / "q.spill"), eviction="visits")
+    store["busy"] = {"open": 1.0}
+    for _ in range(5):
+        store["busy"]
+    for i in range(20):
+        store[f"s{i}"] = {"open": 0.0}
+    assert "busy" in store.hot
+    store.close()
+
+def test_agents_sharing_q_path_get_separate_spill_files(tmp_path):
+    q_path = str(tmp_path / "q_table.pkl")
+    first = QLearningAgent(ACTIONS, q_path=q_path, autosave=False, max_states=2)
+    for i in range(6):
+        first.update_q_table(f"s{i}", "open", 1, f"s{i}")
+    second = QLearningAgent(ACTIONS, q_path=q_path, autosave=False, max_states=2)
+    for i in range(6):
+        second.update_q_table(f"t{i}", "close", 1, f"t{i}")
+    assert first.q.spill.path != second.q.spill.path
+    assert first.q["s0"]["open"] > 0  # Spilled before the second agent existed
+    second.q.close()
+    del second
+    assert first.q["s1"]["open"] > 0  # Still readable after the other store is gone
+    spill_file = first.q.spill.path
+    first.q.close()
+    assert not os.path.exists(spill_file)
+    assert glob.glob(str(tmp_path / "q_table.spill*")) == []
+
+def test_visit_counts_spill_with_their_rows(tmp_path):
+    agent = QLearningAgent(ACTIONS, q_path=str(tmp_path / "q_table.pkl"), autosave=False, max_states=2,
+                           mode="bandit", bandit_step="mean")
+    for reward in (1, 3):
+        agent.update_q_table("s0", "open", reward, "s0")
+    for i in range(1, 5):
+        agent.update_q_table(f"s{i}", "open", 1, f"s{i}")
+    assert "s0" not in agent.q.hot and len(agent.counts) <= 2
+    agent.update_q_table("s0", "open", 5, "s0")
+    assert agent.counts["s0"] == {"open": 3}
+    assert agent.q["s0"]["open"] == pytest.approx(3.0)  # Mean of 1, 3 and 5
+    agent.q.close()
+
+def test_memory_stays_flat_as_states_grow(tmp_path):
+    agent = QLearningAgent(ACTIONS, q_path=str(tmp_path / "q_table.pkl"), autosave=False, max_states=50,
+                           mode="bandit", bandit_step="mean")
+
+    def visit(states):
+        for i in states:
+            agent.update_q_table(f"state number {i}", "open", 1, f"state number {i}")
+
+    visit(range(1000))
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        visit(range(1000, 6000))
+        gc.collect()
+        grown = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    assert len(agent.q) == 6000
+    assert len(agent.state_index) == 0 and len(agent.counts) <= 50 and len(agent._leaders) <= 50
+    assert grown < 100_000, grown  # 5000 more states; a live row alone is several hundred bytes
+    agent.q.close()
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from agent.concurrency import ConcurrentQLearningAgent, ReadWriteLock
+from agent.q_learning import read_q_snapshot
+
+ACTIONS = ["open", "close", "mute"]
+
+def test_readers_hold_the_lock_together():
+    lock = ReadWriteLock()
+    barrier = threading.Barrier(2, timeout=2)
+
+    def read():
+        with lock.read_locked():
+            barrier.wait()  # Only passes if both readers are inside at once
+
+    threads = [threading.Thread(target=read) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not barrier.broken
+
+def test_writer_excludes_readers():
+    lock = ReadWriteLock()
+    entered = threading.Event()
+
+    def read():
+        with lock.read_locked():
+            entered.set()
+
+    with lock.write_locked():
+        with lock.read_locked():  # The writer itself may read
+            pass
+        reader = threading.Thread(target=read)
+        reader.start()
+        assert not entered.wait(0.1)
+    assert entered.wait(2)
+    reader.join()
+
+def test_read_lock_cannot_be_upgraded():
+    lock = ReadWriteLock()
+    with lock.read_locked():
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+
+def test_concurrent_updates_are_not_lost(tmp_path):
+    q_path = str(tmp_path / "q_table.pkl")
+    agent = ConcurrentQLearningAgent(ACTIONS, q_path=q_path, save_interval=0.01)
+
+    def work():
+        for _ in range(50):
+            agent.update_q_with_correction("open", "open", "close", penalty=0, bonus=1)
+            agent.select_action(f"state-{threading.get_ident()}")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert agent.q["open"]["close"] == 200
+    assert agent.writer.flush(5)
+    assert read_q_snapshot(q_path)["open"]["close"] == 200
+    agent.writer.close()
+
+def test_failed_saves_are_reported_and_retried(tmp_path):
+    agent = ConcurrentQLearningAgent(ACTIONS, q_path=str(tmp_path / "q_table.pkl"), save_interval=0.01)
+    write_snapshot = agent.write_snapshot
+    failing = [True]
+
+    def flaky_write(snapshot, path=None):
+        if failing[0]:
+            raise OSError("disk full")
+        write_snapshot(snapshot, path)
+
+    agent.write_snapshot = flaky_write
+    agent.update_q_table("open", "open", 2, "open")
+    assert not agent.writer.flush(5)
+    assert "disk full" in str(agent.writer.last_error)
+    failing[0] = False
+    assert agent.writer.flush(5)
+    agent.writer.close()
@@ -0,0 +1,41 @@
+import io
+
+from agent import events
+
+def test_warnings_reach_stderr_without_subscribers(capsys):
+    bus = events.EventBus(fallback=events.StderrSubscriber())
+    bus.emit(events.QTableSaveFailed(path="q.pkl", error="disk full"))
+    bus.emit(events.QTableMissing(path="q.pkl"))
+    err = capsys.readouterr().err
+    assert "disk full" in err
+    assert "Starting fresh" not in err
+
+def test_counting_subscribers_keep_the_fallback(capsys):
+    bus = events.EventBus(fallback=events.StderrSubscriber())
+    seen = bus.subscribe(events.MetricsSubscriber())
+    bus.emit(events.QTableSaveFailed(path="q.pkl", error="disk full"))
+    assert seen.counts["q_table_save_failed"] == 1
+    assert "disk full" in capsys.readouterr().err
+
+def test_a_console_replaces_the_fallback(capsys):
+    stream = io.StringIO()
+    bus = events.EventBus(fallback=events.StderrSubscriber())
+    bus.subscribe(events.MetricsSubscriber())
+    console = bus.subscribe(events.ConsoleSubscriber(stream=stream))
+    bus.emit(events.QTableSaveFailed(path="q.pkl", error="disk full"))
+    bus.flush()
+    assert "disk full" in stream.getvalue()
+    assert capsys.readouterr().err == ""
+    bus.unsubscribe(console)  # Back to stderr once no console is left
+    bus.emit(events.QTableSaveFailed(path="q.pkl", error="still full"))
+    assert "still full" in capsys.readouterr().err
+
+def test_quiet_console_skips_notices():
+    stream = io.StringIO()
+    bus = events.EventBus()
+    bus.subscribe(events.ConsoleSubscriber(level=events.WARNING, pretty=False, stream=stream))
+    bus.emit(events.Notice(text="🎉 Training Complete!"))
+    bus.emit(events.TaskFileMissing(path="data/task_log.txt"))
+    bus.close()
+    assert "Training Complete" not in stream.getvalue()
+    assert "task_file_missing" in stream.getvalue()
@@ -0,0 +1,17 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from agent.hogwild import train_hogwild
+from agent.q_learning import read_q_snapshot
+from agent.simulation import DEFAULT_ACTIONS
+
+def test_states_outside_the_oracle_survive(tmp_path):
+    q_path = str(tmp_path / "q_table.pkl")
+    q_init = {"launch": {"open": 1.5, "close": -0.5}, "open": {"open": 0.25, "legacy": 3.0}}
+    table, stats = train_hogwild(DEFAULT_ACTIONS, workers=1, episodes=20, q_init=q_init, q_path=q_path)
+    saved = read_q_snapshot(q_path)
+    assert saved["launch"] == {"open": 1.5, "close": -0.5}
+    assert saved["open"]["legacy"] == 3.0  # Actions outside `actions` are kept too
+    assert set(saved) == set(table) and len(saved) > len(q_init)
+    assert stats["steps"] == 20 * 8
@@ -0,0 +1,32 @@
+import random
+
+import pytest
+
+from agent.q_learning import QLearningAgent
+
+ACTIONS = ["open", "close", "mute", "play", "screenshot"]
+STATES = [f"s{i}" for i in range(6)]
+
+def brute_force_leaders(row):
+    """(best, best_value, runner_up, runner_up_value) by a full scan; ties go to the earlier action"""
+    ranked = sorted(row.items(), key=lambda kv: (-kv[1], ACTIONS.index(kv[0])))
+    return ranked[0][0], ranked[0][1], ranked[1][0], ranked[1][1]
+
+@pytest.mark.parametrize("mode, max_states", [("q_learning", None), ("bandit", None), ("bandit", 3)])
+def test_cached_leaders_match_a_full_scan(tmp_path, mode, max_states):
+    agent = QLearningAgent(ACTIONS, alpha=0.5, epsilon=0.0, q_path=str(tmp_path / "q.pkl"), autosave=False,
+                           mode=mode, max_states=max_states)
+    rng = random.Random(7)
+    for step in range(3000):
+        state = rng.choice(STATES)
+        if rng.random() < 0.2:
+            agent.update_q_with_correction(state, rng.choice(ACTIONS), rng.choice(ACTIONS),
+                                           penalty=rng.choice([-1, -2]), bonus=rng.choice([1, 2]))
+        else:
+            # Few distinct rewards, so values tie often
+            agent.update_q_table(state, rng.choice(ACTIONS), rng.choice([-2, 0, 2]), rng.choice(STATES))
+        checked = rng.choice(STATES)
+        best, best_value, runner_up, runner_up_value = brute_force_leaders(dict(agent._row(checked)))
+        assert agent.select_action(checked) == best, step
+        assert agent.top_actions(checked, 2) == [(best, best_value), (runner_up, runner_up_value)], step
+        assert agent.get_next_best_action(checked) == runner_up, step
@@ -0,0 +1,58 @@
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from agent import service
+from agent.linear import HashedLinearQAgent, hashed_features
+
+ACTIONS = ["open", "close", "mute"]
+
+def make_agent(tmp_path, **kwargs):
+    return HashedLinearQAgent(ACTIONS, q_path=str(tmp_path / "linear.npz"), autosave=False, **kwargs)
+
+def test_update_moves_q_to_the_tabular_target(tmp_path):
+    agent = make_agent(tmp_path, alpha=0.5, epsilon=0.0, mode="bandit")
+    agent.update_q_table("open the browser", "close", 2, "open the browser")
+    assert agent._row("open the browser")["close"] == pytest.approx(1.0)
+    assert agent.select_action("open the browser") == "close"
+    assert agent.select_actions(["open the browser", "mute"]) == ["close", "close"]  # Via the shared bias
+    assert agent._row("open the editor")["close"] > 0  # Shares the words "open the"
+
+def test_colliding_features_stay_unit_norm():
+    for text in ("open the browser", "mute", "a b c d e f g h"):
+        indices, values = hashed_features(text, 4)
+        assert len(indices) <= 4
+        assert values @ values == pytest.approx(1.0)
+
+def test_score_batch_matches_single_scores(tmp_path):
+    agent = make_agent(tmp_path, n_features=8)  # Small enough that states collide
+    states = ["open the browser", "close it", "mute the sound", "open the browser"]
+    for i, state in enumerate(states[:3]):
+        agent.update_q_table(state, ACTIONS[i], 2, state)
+    batch = agent.score_batch(states)
+    for state, scores in zip(states, batch):
+        assert scores == pytest.approx(agent._scores(state))
+
+def test_weights_round_trip(tmp_path):
+    agent = make_agent(tmp_path)
+    agent.update_q_table("open the browser", "open", 2, "open the browser")
+    agent.save_q_table()
+    reloaded = make_agent(tmp_path)
+    assert np.array_equal(reloaded.weights, agent.weights)
+    other_shape = make_agent(tmp_path, n_features=16)
+    assert not other_shape.weights.any()  # Mismatched weights start fresh
+
+def test_table_options_are_rejected_for_the_linear_backend(tmp_path, monkeypatch):
+    q_path = str(tmp_path / "q_table.pkl")
+    with pytest.raises(ValueError, match="max_states"):
+        service.create_agent(ACTIONS, q_path, backend="linear", max_states=10)
+    monkeypatch.setenv("RL_AGENT_BACKEND", "linear")
+    monkeypatch.setenv("RL_AGENT_STORAGE", "sqlite")
+    monkeypatch.delenv("RL_AGENT_SERVICE", raising=False)
+    with pytest.raises(ValueError, match="RL_AGENT_STORAGE"):
+        service.connect_or_create_agent(ACTIONS, q_path)
+    monkeypatch.setattr(sys, "argv", ["agent.service", "--backend", "linear", "--storage", "sqlite"])
+    with pytest.raises(SystemExit):
+        service.main()
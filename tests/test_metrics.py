@@ -0,0 +1,47 @@
+from agent import events, metrics
+
+def test_event_counter_counts_by_kind_without_silencing_stderr(capsys):
+    bus = events.EventBus(fallback=events.StderrSubscriber())
+    bus.subscribe(metrics.EventCounter())
+    counter = metrics.registry.counter("events", kind="q_table_save_failed")
+    before = counter.value
+    bus.emit(events.QTableSaveFailed(path="q.pkl", error="disk full"))
+    bus.emit(events.QTableSaveFailed(path="q.pkl", error="disk full"))
+    bus.emit(events.QValueUpdated(state="open", action="open", reward=2, old=0.0, new=0.4))  # DEBUG: not counted
+    assert counter.value == before + 2
+    assert metrics.registry.counter("events", kind="q_value_updated").value == 0
+    assert capsys.readouterr().err.count("disk full") == 2
+
+def test_openmetrics_exposition():
+    registry = metrics.Registry()
+    registry.counter("saves", "Snapshot writes", q_path="q.pkl").inc(3)
+    registry.gauge("states", "Rows", fn=lambda: 54)
+    registry.gauge("gone", fn=lambda: None)  # Skipped
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        latency.observe(value)
+    lines = registry.render().splitlines()
+    assert lines == [
+        "# TYPE rl_agent_gone gauge",
+        "# TYPE rl_agent_latency_seconds histogram",
+        "# HELP rl_agent_latency_seconds Latency",
+        'rl_agent_latency_seconds_bucket{le="0.1"} 1',
+        'rl_agent_latency_seconds_bucket{le="1.0"} 3',
+        'rl_agent_latency_seconds_bucket{le="+Inf"} 4',
+        "rl_agent_latency_seconds_count 4",
+        "rl_agent_latency_seconds_sum 6.05",
+        "# TYPE rl_agent_saves counter",
+        "# HELP rl_agent_saves Snapshot writes",
+        'rl_agent_saves_total{q_path="q.pkl"} 3',
+        "# TYPE rl_agent_states gauge",
+        "# HELP rl_agent_states Rows",
+        "rl_agent_states 54",
+        "# EOF",
+    ]
+
+def test_write_file_replaces_the_file(tmp_path):
+    path = tmp_path / "metrics.prom"
+    metrics.write_file(str(path), "first\n")
+    metrics.write_file(str(path), "# EOF\n")
+    assert path.read_text(encoding="utf-8") == "# EOF\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["metrics.prom"]
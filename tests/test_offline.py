@@ -0,0 +1,32 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from agent.offline import TransitionDataset, stream_log, train_offline
+
+def test_bandit_mode_fits_mean_rewards():
+    states = np.array([0, 0, 0, 1])
+    actions = np.array([0, 0, 1, 1])
+    rewards = np.array([2.0, -2.0, 2.0, -2.0])
+    q_init = np.full((2, 3), 5.0)
+    q, epochs, converged = train_offline(states, actions, rewards, 2, 3, q_init=q_init)
+    assert converged and epochs == 1
+    assert q.tolist() == [[0.0, 2.0, 5.0], [5.0, -2.0, 5.0]]
+
+def test_q_learning_reports_epoch_cap():
+    states = np.zeros(200, dtype=np.int32)
+    actions = np.arange(200, dtype=np.int32) % 2
+    rewards = np.where(actions == 0, 2.0, -2.0)
+    _, epochs, converged = train_offline(states, actions, rewards, 1, 2, gamma=0.9, epochs=3, batch_size=16)
+    assert epochs == 3 and not converged
+
+def test_stream_log_reads_corrections(tmp_path):
+    path = tmp_path / "log.csv"
+    path.write_text("Parsed_Intent,Action_Taken,Base_Reward,Suggested_Correct_Action\n"
+                    "open,mute,-2,open\n"
+                    "mute,mute,2,\n")
+    dataset = TransitionDataset(["open", "mute"])
+    assert stream_log(str(path), dataset) == 3
+    states, actions, rewards = dataset.arrays()
+    assert rewards.tolist() == [-2.0, 2.0, 2.0]
+    assert [dataset.actions[a] for a in actions] == ["mute", "open", "mute"]
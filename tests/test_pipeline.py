@@ -0,0 +1,25 @@
+import asyncio
+import os
+
+from agent.pipeline import FeedbackPipeline, QueueFeedbackSource
+from agent.q_learning import QLearningAgent, read_q_snapshot
+
+ACTIONS = ["open", "close", "mute"]
+
+def test_pipeline_applies_corrections_and_saves(tmp_path):
+    q_path = str(tmp_path / "q_table.pkl")
+    agent = QLearningAgent(ACTIONS, epsilon=0.0, q_path=q_path)
+    source = QueueFeedbackSource()
+    pipeline = FeedbackPipeline(agent, str(tmp_path / "log.csv"), feedback_source=source, save_interval=0)
+
+    async def run():
+        source.submit({"feedback": "👎", "correction": "close"})
+        source.submit({"feedback": "👍"})
+        total = await pipeline.run_episode(1, ["open the door", "mute audio"])
+        await pipeline.drain()
+        return total
+
+    assert asyncio.run(run()) == 0
+    assert agent.q["open"]["close"] > agent.q["open"]["open"]
+    assert read_q_snapshot(q_path)["open"] == agent.q["open"]
+    assert os.path.exists(tmp_path / "log.csv")
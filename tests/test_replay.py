@@ -0,0 +1,29 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from agent.q_learning import QLearningAgent
+from agent.replay import PrioritizedReplayBuffer, SumTree, replay_minibatch
+
+ACTIONS = ["open", "close"]
+
+def test_sum_tree_finds_leaves_by_prefix_sum():
+    tree = SumTree(4)
+    tree.update([0, 1, 2, 3], [1.0, 2.0, 3.0, 4.0])
+    assert tree.total() == 10.0
+    assert tree.find([0.5, 1.5, 3.5, 9.9]).tolist() == [0, 1, 2, 3]
+
+def test_new_transitions_use_td_error_scale():
+    buffer = PrioritizedReplayBuffer(capacity=4, alpha=1.0, epsilon=0.0)
+    buffer.add(0, 0, 1.0, 0, priority=-2.0)
+    buffer.update_priorities(np.array([0]), np.array([-2.0]))
+    assert buffer.tree.total() == 2.0
+    buffer.add(0, 1, 1.0, 0)
+    assert buffer.tree.total() == 4.0  # Unscored transitions get the max priority
+
+def test_duplicate_samples_do_not_overshoot(tmp_path):
+    agent = QLearningAgent(ACTIONS, alpha=1.0, q_path=str(tmp_path / "q.pkl"), autosave=False, mode="bandit")
+    buffer = PrioritizedReplayBuffer(capacity=8, seed=0)
+    buffer.add(agent.state_id("open"), agent.action_id("open"), 2.0, agent.state_id("open"))
+    replay_minibatch(agent, buffer, 8)  # One transition, sampled 8 times
+    assert agent.q["open"]["open"] == pytest.approx(2.0)
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from agent.q_learning import QLearningAgent, read_q_snapshot
+from agent.service import QTableClient, QTableService, ServiceError
+
+ACTIONS = ["open", "close", "mute"]
+
+@pytest.fixture
+def service(tmp_path):
+    agent = QLearningAgent(ACTIONS, epsilon=0.0, q_path=str(tmp_path / "q_table.pkl"))
+    service = QTableService(agent, save_interval=60)
+    address = f"unix:{tmp_path / 'service.sock'}"
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(service.serve(address))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass  # How the service is stopped
+        finally:
+            loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    deadline = time.time() + 5
+    while not (tmp_path / "service.sock").exists():
+        assert time.time() < deadline, "service did not start"
+        time.sleep(0.01)
+    client = QTableClient(address)
+
+    def stop():
+        client.close()
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join(5)
+
+    yield service, client, stop
+    if thread.is_alive():
+        stop()
+
+def test_requests_round_trip(service):
+    _, client, _ = service
+    assert client.actions == ACTIONS
+    client.update_q_table("open", "close", 2, "open")
+    assert client.select_action("open") == "close"
+    assert client.top_actions("open", 1)[0][0] == "close"
+    with pytest.raises(ServiceError, match="Unknown operation"):
+        client.call("nope")
+
+def test_pipelined_selects_are_answered_in_order(service):
+    qservice, client, _ = service
+    client.update_q_table("mute", "mute", 2, "mute")
+    states = ["open", "mute"] * 50
+    results = client.pipeline([("select", {"state": state}) for state in states])
+    assert results[1::2] == ["mute"] * 50
+    assert qservice.stats["batches"] < qservice.stats["requests"]
+
+def test_bad_lines_get_an_error_response(service, tmp_path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(str(tmp_path / "service.sock"))
+    sock.sendall(b"not json\n[1, 2]\n")
+    lines = sock.makefile("rb")
+    first, second = json.loads(lines.readline()), json.loads(lines.readline())
+    sock.close()
+    assert not first["ok"] and not second["ok"]
+    assert "JSON object" in second["error"]
+
+def test_shutdown_writes_final_snapshot(service, tmp_path):
+    _, client, stop = service
+    client.update_q_table("close", "close", 2, "close")
+    stop()
+    assert read_q_snapshot(str(tmp_path / "q_table.pkl"))["close"]["close"] > 0
+
+def test_save_does_not_block_other_requests(service, tmp_path):
+    qservice, client, _ = service
+    client.update_q_table("open", "mute", 2, "open")
+    write_snapshot = qservice.agent.write_snapshot
+    release = threading.Event()
+
+    def slow_write(snapshot, path=None):
+        release.wait(5)
+        write_snapshot(snapshot, path)
+
+    qservice.agent.write_snapshot = slow_write
+    saver = threading.Thread(target=client.save_q_table)
+    saver.start()
+    other = QTableClient(client.address)
+    try:
+        assert other.select_action("open") == "mute"  # Answered while the write is still waiting
+        assert saver.is_alive()
+    finally:
+        release.set()
+        saver.join(5)
+        other.close()
+    assert read_q_snapshot(str(tmp_path / "q_table.pkl"))["open"]["mute"] > 0
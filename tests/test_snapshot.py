@@ -0,0 +1,30 @@
+import os
+import threading
+
+from agent.q_learning import QLearningAgent, decode_q_table, encode_q_table, read_q_snapshot, write_q_snapshot
+
+ACTIONS = ["open", "close", "mute"]
+
+def test_encode_decode_round_trip():
+    table = {"open": {"open": 1.5, "close": -0.5}, "mute": {"mute": 2.0}}
+    assert decode_q_table(encode_q_table(table, ACTIONS)) == table
+
+def test_agent_reloads_saved_table(tmp_path):
+    q_path = str(tmp_path / "q_table.pkl")
+    agent = QLearningAgent(ACTIONS, q_path=q_path)
+    agent.update_q_table("open", "close", 2, "open")
+    reloaded = QLearningAgent(ACTIONS, q_path=q_path)
+    assert reloaded.q == agent.q
+    assert os.path.exists(tmp_path / "q_table.csv")
+
+def test_concurrent_writers_leave_a_complete_table(tmp_path):
+    path = str(tmp_path / "q_table.pkl")
+    tables = [{f"s{i}-{j}": {"open": float(j)} for j in range(200)} for i in range(4)]
+    threads = [threading.Thread(target=lambda t=t: [write_q_snapshot(t, path) for _ in range(10)])
+               for t in tables]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert read_q_snapshot(path) in tables
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
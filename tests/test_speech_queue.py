@@ -0,0 +1,66 @@
+import threading
+import time
+
+from agent.voice_interface import SpeechQueue
+
+class FakeEngine:
+    """Records what pyttsx3 would speak; holds the first announcement until released"""
+
+    def __init__(self):
+        self.spoken = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def say(self, text):
+        self.spoken.append(text)
+
+    def runAndWait(self):
+        self.started.set()
+        self.release.wait(5)
+
+def busy_queue(**kwargs):
+    """A SpeechQueue whose worker is busy speaking "busy", so later announcements wait"""
+    engine = FakeEngine()
+    speech = SpeechQueue(engine, **kwargs)
+    speech.say("busy")
+    assert engine.started.wait(5)
+    return speech, engine
+
+def finish(speech, engine):
+    engine.release.set()
+    assert speech.wait(5)
+    speech.close(5)
+    return engine.spoken[1:]
+
+def test_most_urgent_first_then_in_order():
+    speech, engine = busy_queue()
+    speech.say("low", priority=SpeechQueue.LOW)
+    speech.say("normal 1")
+    speech.say("urgent", priority=SpeechQueue.URGENT)
+    speech.say("normal 2")
+    assert finish(speech, engine) == ["urgent", "normal 1", "normal 2", "low"]
+
+def test_same_key_keeps_only_the_latest():
+    speech, engine = busy_queue()
+    for episode in range(3):
+        speech.say(f"episode {episode}", priority=SpeechQueue.LOW, key="progress")
+    speech.say("task")
+    assert finish(speech, engine) == ["task", "episode 2"]
+    assert speech.coalesced == 2
+
+def test_full_queue_drops_the_least_urgent():
+    speech, engine = busy_queue(max_pending=2)
+    speech.say("low", priority=SpeechQueue.LOW)
+    speech.say("normal")
+    assert speech.say("urgent", priority=SpeechQueue.URGENT)  # Pushes out "low"
+    assert not speech.say("late low", priority=SpeechQueue.LOW)  # Everything waiting is more urgent
+    assert finish(speech, engine) == ["urgent", "normal"]
+    assert speech.dropped == 2
+
+def test_stale_announcements_are_skipped():
+    speech, engine = busy_queue()
+    speech.say("stale", max_age=0.01)
+    speech.say("fresh", max_age=10)
+    time.sleep(0.05)
+    assert finish(speech, engine) == ["fresh"]
+    assert speech.expired == 1 and speech.spoken == 2
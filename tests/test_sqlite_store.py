@@ -0,0 +1,66 @@
+from agent.q_learning import QLearningAgent
+from agent.store import SQLiteQStore
+
+ACTIONS = ["open", "close", "mute"]
+
+def test_processes_sharing_a_database_keep_each_others_updates(tmp_path):
+    path = str(tmp_path / "q.db")
+    seed = SQLiteQStore(path, ACTIONS)
+    seed["open"] = {"open": 1.0, "close": 0.0}
+    seed.close()
+
+    first = SQLiteQStore(path, ACTIONS)
+    second = SQLiteQStore(path, ACTIONS)
+    first["open"]["open"] += 0.5
+    second["open"]["open"] += 0.25
+    second["open"]["close"] = -1.0
+    first.flush()
+    second.flush()
+    first.close()
+    second.close()
+
+    reopened = SQLiteQStore(path, ACTIONS)
+    assert reopened["open"] == {"open": 1.75, "close": -1.0}
+    reopened.close()
+
+def test_new_rows_created_by_two_processes_add_up(tmp_path):
+    path = str(tmp_path / "q.db")
+    first = SQLiteQStore(path, ACTIONS)
+    second = SQLiteQStore(path, ACTIONS)
+    first["mute"] = {"mute": 2.0}
+    second["mute"] = {"mute": 1.0}
+    first.flush()
+    second.flush()
+    assert SQLiteQStore(path, ACTIONS)["mute"] == {"mute": 3.0}
+
+def test_evicted_rows_are_read_back(tmp_path):
+    store = SQLiteQStore(str(tmp_path / "q.db"), ACTIONS, capacity=2)
+    for i in range(5):
+        store[f"s{i}"] = {"open": float(i)}
+    assert len(store.hot) <= 2
+    assert len(store) == 5
+    store["s0"]["open"] += 1.0
+    store.flush()
+    assert dict(store.items())["s0"] == {"open": 1.0}
+    store.close()
+
+def test_agent_round_trip_with_sqlite_storage(tmp_path):
+    q_path = str(tmp_path / "q_table.pkl")
+    agent = QLearningAgent(ACTIONS, q_path=q_path, storage="sqlite")
+    agent.update_q_table("open", "close", 2, "open")
+    agent.update_q_table("open", "close", 2, "open")
+    expected = dict(agent.q["open"])
+    agent.q.close()
+    reloaded = QLearningAgent(ACTIONS, q_path=q_path, storage="sqlite")
+    assert dict(reloaded.q["open"]) == expected
+    reloaded.q.close()
+
+def test_capacity_one_keeps_the_row_just_cached(tmp_path):
+    store = SQLiteQStore(str(tmp_path / "q.db"), ACTIONS, capacity=1)
+    for i in range(3):
+        row = store.setdefault(f"s{i}", {"open": float(i)})
+        assert row == {"open": float(i)}
+        assert list(store.hot) == [f"s{i}"]
+    assert store["s0"] == {"open": 0.0}  # Read back, evicting s2
+    assert dict(store.items())["s2"] == {"open": 2.0}
+    store.close()
@@ -0,0 +1,78 @@
+import csv
+import threading
+
+from agent import task_store
+from agent.task_store import TASK_COLUMNS, TaskLogStore
+
+def task(task_id, intent, action, reward, timestamp, feedback="👍 Good"):
+    return {"Task_ID": task_id, "Parsed_Intent": intent, "Action_Taken": action, "Base_Reward": reward,
+            "Total_Reward": reward, "Timestamp": timestamp, "Confidence_Score": 0.5, "User_Feedback": feedback}
+
+def test_tasks_round_trip_through_a_reopened_database(tmp_path):
+    path = str(tmp_path / "task_log.db")
+    store = TaskLogStore(path, batch_size=2)
+    store.add_task(task("1-1", "open", "open", 2.0, "2026-01-01T09:00:00"))
+    store.add_task(task("1-2", "close", "mute", -1.0, "2026-01-01T09:01:00", feedback="👎 Wrong"))
+    store.add_task(task("2-1", "open", "close", 0.5, "2026-01-01T09:02:00"))  # Still buffered
+    store.add_episode(1, 1.0, "2026-01-01T09:01:30")
+    store.close()
+
+    reopened = TaskLogStore(path)
+    assert reopened.task_count() == 3
+    assert reopened.query("SELECT Episode, Task_ID, User_Feedback FROM tasks ORDER BY rowid") == [
+        (1, "1-1", "👍 Good"), (1, "1-2", "👎 Wrong"), (2, "2-1", "👍 Good")]
+    assert reopened.episode_totals() == [1.0]
+    reopened.close()
+
+def test_dashboard_queries(tmp_path):
+    store = TaskLogStore(str(tmp_path / "task_log.db"))
+    store.add_task(task("1-1", "open", "open", 2.0, "2026-01-01T09:00:00"))
+    store.add_task(task("1-2", "open", "close", -1.0, "2026-01-01T10:00:00", feedback="👎 Wrong"))
+    store.add_task(task("2-1", "mute", "open", 1.0, "2026-01-01T11:00:00"))
+    store.add_task(task("demo", "mute", "mute", 3.0, "2026-01-01T12:00:00"))  # No episode
+    assert store.intent_rewards() == [("mute", 2, 2.0), ("open", 2, 0.5)]
+    assert store.action_counts()[0] == ("open", 2)
+    assert store.feedback_counts() == (3, 1)
+    assert store.feedback_counts("close") == (0, 1)
+    assert store.episode_rewards() == [(1, 2, 1.0), (2, 1, 1.0)]
+    assert store.tasks_between("2026-01-01T10:00:00", "2026-01-01T12:00:00") == [
+        ("1-2", "open", "close", -1.0), ("2-1", "mute", "open", 1.0)]
+    assert store.reward_series() == [(2.0, 0.5), (-1.0, 0.5), (1.0, 0.5), (3.0, 0.5)]
+    store.close()
+
+def test_concurrent_appends_are_all_written(tmp_path):
+    store = TaskLogStore(str(tmp_path / "task_log.db"), batch_size=7)
+
+    def append(worker):
+        for i in range(200):
+            store.add_task(task(f"{worker}-{i}", "open", "open", 1.0, f"2026-01-01T09:{i % 60:02d}:00"))
+        store.add_episode(worker, 200.0, "2026-01-01T10:00:00")
+
+    threads = [threading.Thread(target=append, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.task_count() == 800
+    assert store.episode_rewards() == [(worker, 200, 200.0) for worker in range(4)]
+    assert sorted(store.episode_totals()) == [200.0] * 4
+    store.close()
+
+def test_import_csv(tmp_path):
+    csv_path = tmp_path / "task_log.csv"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=TASK_COLUMNS)
+        writer.writeheader()
+        for i in range(5):
+            writer.writerow({**task(f"1-{i}", "open", "open", float(i), f"2026-01-01T09:0{i}:00"),
+                             "Follow_up_Accepted": "True" if i % 2 else "False"})
+    store = TaskLogStore(str(tmp_path / "task_log.db"))
+    assert store.import_csv(str(csv_path), batch_size=2) == 5
+    assert store.query("SELECT SUM(Follow_up_Accepted), SUM(Total_Reward) FROM tasks") == [(2, 10.0)]
+    store.close()
+
+def test_get_task_store_shares_one_store_per_path(tmp_path):
+    path = str(tmp_path / "task_log.db")
+    store = task_store.get_task_store(path)
+    assert task_store.get_task_store(str(tmp_path / "." / "task_log.db")) is store
+    assert task_store.is_task_store_path(path) and not task_store.is_task_store_path("log.csv")
@@ -0,0 +1,60 @@
+import json
+import threading
+
+from agent import tracing
+
+def test_write_produces_a_chrome_trace(tmp_path):
+    tracer = tracing.Tracer(str(tmp_path / "trace.json"))
+    with tracer.span("episode", n=1):
+        with tracer.span("select") as span:
+            span.set(action="open")
+    tracer.write()
+    trace = json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))
+    names = [(e["ph"], e["name"]) for e in trace["traceEvents"]]
+    assert names == [("M", "thread_name"), ("X", "select"), ("X", "episode")]
+    select, episode = trace["traceEvents"][1:]
+    assert select["args"] == {"action": "open"}
+    assert episode["ts"] <= select["ts"] and select["ts"] + select["dur"] <= episode["ts"] + episode["dur"]
+    assert trace["otherData"] == {"dropped_spans": 0}
+    assert [p.name for p in tmp_path.iterdir()] == ["trace.json"]
+
+def test_errors_are_recorded_on_the_span(tmp_path):
+    tracer = tracing.Tracer(str(tmp_path / "trace.json"))
+    try:
+        with tracer.span("persistence"):
+            raise OSError("disk full")
+    except OSError:
+        pass
+    assert tracer.events[-1]["args"] == {"error": "OSError"}
+
+def test_only_the_latest_spans_are_kept(tmp_path):
+    tracer = tracing.Tracer(str(tmp_path / "trace.json"), max_events=10)
+    for i in range(25):
+        with tracer.span("task", i=i):
+            pass
+    worker = threading.Thread(target=lambda: tracer.span("charts").__enter__().__exit__(None, None, None),
+                              name="chart-worker")
+    worker.start()
+    worker.join()
+    tracer.write()
+    trace = json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))
+    spans = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert [e["args"].get("i") for e in spans] == list(range(16, 25)) + [None]
+    # Both threads keep their names even though their first spans were dropped
+    assert {e["args"]["name"] for e in trace["traceEvents"] if e["ph"] == "M"} >= {"chart-worker"}
+    assert len([e for e in trace["traceEvents"] if e["ph"] == "M"]) == 2
+    assert trace["otherData"] == {"dropped_spans": 16}
+
+def test_start_and_stop(tmp_path):
+    path = str(tmp_path / "out" / "trace.json")
+    tracing.start(path)
+    try:
+        assert tracing.enabled()
+        with tracing.span("update"):
+            pass
+    finally:
+        assert tracing.stop() == path
+    assert not tracing.enabled()
+    assert tracing.span("update") is tracing._NULL_SPAN
+    assert tracing.stop() is None
+    assert json.load(open(path, encoding="utf-8"))["traceEvents"][-1]["name"] == "update"
@@ -0,0 +1,163 @@
+import math
+import threading
+import time
+import wave
+from array import array
+
+import pytest
+
+sr = pytest.importorskip("speech_recognition")
+
+from agent.voice_interface import (BackendKeywordSpotter, BackgroundListener, GoogleBackend, KeywordSpotter,
+                                   StubBackend, batch_summary, classify_feedback, frame_rms, get_backend,
+                                   transcribe_directory)
+
+RATE = 16000
+
+def write_wav(path, segments):
+    """16-bit mono WAV of (seconds, amplitude) segments: 0 is silence, anything else a 440 Hz tone"""
+    samples = array("h")
+    for seconds, amplitude in segments:
+        samples.extend(int(amplitude * math.sin(2 * math.pi * 440 * i / RATE)) for i in range(int(seconds * RATE)))
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(RATE)
+        f.writeframes(samples.tobytes())
+    return str(path)
+
+def phrases_file(tmp_path, count, name="phrases.wav"):
+    """Calibration silence, then `count` half-second tones, each followed by a pause that ends the phrase"""
+    return write_wav(tmp_path / name, [(1.0, 0)] + [(0.5, 8000), (2.0, 0)] * count)
+
+def test_background_listener_transcribes_each_phrase(tmp_path):
+    recognizer = sr.Recognizer()
+    backend = StubBackend(default="open the browser", recognizer=recognizer)
+    listener = BackgroundListener(recognizer, sr.AudioFile(phrases_file(tmp_path, 2)), backend.transcribe,
+                                  calibration_duration=0.5).start()
+    assert list(listener) == ["open the browser", "open the browser"]
+    assert listener.get_phrase(timeout=1) is None  # The end stays visible
+    listener.stop(timeout=5)
+    assert (listener.calibrations, listener.dropped, listener.errors) == (1, 0, 0)
+
+def test_background_listener_drops_the_oldest_phrase_when_recognition_lags(tmp_path):
+    recognizer = sr.Recognizer()
+    release = threading.Event()
+    calls = []
+
+    def recognize(audio):
+        calls.append(audio)
+        release.wait(5)  # Hold the first phrase until capture has run ahead
+        return f"phrase {len(calls)}"
+
+    listener = BackgroundListener(recognizer, sr.AudioFile(phrases_file(tmp_path, 3)), recognize,
+                                  calibration_duration=0.5, max_queued=1).start()
+    deadline = time.time() + 5
+    while listener.dropped < 1:
+        assert time.time() < deadline, "no phrase was dropped"
+        time.sleep(0.01)
+    release.set()
+    phrases = list(listener)
+    listener.stop(timeout=5)
+    assert 1 <= listener.dropped <= 2  # How many depends on when recognition took the first phrase
+    assert phrases == [f"phrase {i + 1}" for i in range(3 - listener.dropped)]
+
+def test_unintelligible_phrases_are_skipped(tmp_path):
+    recognizer = sr.Recognizer()
+    backend = StubBackend(recognizer=recognizer)  # No transcripts and no default
+    listener = BackgroundListener(recognizer, sr.AudioFile(phrases_file(tmp_path, 1)), backend.transcribe,
+                                  calibration_duration=0.5).start()
+    assert list(listener) == []
+    listener.stop(timeout=5)
+    assert listener.errors == 0
+
+def voice_directory(tmp_path):
+    """Three takes: two with a transcript beside them, one without"""
+    for i in range(3):
+        write_wav(tmp_path / f"take_{i}.wav", [(0.2, 0), (0.3, 4000 + 1000 * i)])
+    (tmp_path / "take_0.txt").write_text("Open the browser\n", encoding="utf-8")
+    (tmp_path / "take_1.txt").write_text("mute", encoding="utf-8")
+    return {"take_0.wav": "open the browser", "take_1.wav": "play music"}
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_transcribe_directory_with_the_stub_backend(tmp_path, workers):
+    transcripts = voice_directory(tmp_path)
+    results = transcribe_directory(str(tmp_path), backend="stub", workers=workers, transcripts=transcripts)
+    assert [result["file"] for result in results] == ["take_0.wav", "take_1.wav", "take_2.wav"]
+    assert [result["text"] for result in results] == ["open the browser", "play music", None]
+    assert [result["expected"] for result in results] == ["open the browser", "mute", None]
+    assert results[2]["error"] == "unintelligible"
+    assert all(result["audio_seconds"] == pytest.approx(0.5) for result in results)
+
+    summary = batch_summary(results, wall_seconds=0.5)
+    assert (summary["files"], summary["errors"], summary["checked"], summary["accuracy"]) == (3, 1, 2, 0.5)
+    assert summary["real_time_factor"] == round(0.5 / 1.5, 4)
+
+def test_stub_transcripts_from_json(tmp_path):
+    voice_directory(tmp_path)
+    transcripts = tmp_path / "stub.json"
+    transcripts.write_text('{"take_2.wav": "close"}', encoding="utf-8")
+    results = transcribe_directory(str(tmp_path), backend="stub", workers=1, transcripts=str(transcripts),
+                                   default="open")
+    assert [result["text"] for result in results] == ["open", "open", "close"]
+
+def test_backend_selection():
+    assert isinstance(get_backend("stub"), StubBackend)
+    assert isinstance(get_backend("google"), GoogleBackend)
+    with pytest.raises(ValueError, match="Unknown recognizer backend"):
+        get_backend("nope")
+    with pytest.raises(ValueError, match="Unknown local engine"):
+        get_backend("local", engine="nope")
+
+def test_frame_rms_matches_constant_signals():
+    assert frame_rms(array("h", [1000, -1000] * 50).tobytes(), 2) == 1000
+    assert frame_rms(array("b", [-20] * 10).tobytes(), 1) == 20
+    assert frame_rms(b"\x00\x10\x00" * 4, 3) == 0x1000
+    assert frame_rms(b"", 2) == 0
+
+@pytest.mark.parametrize("text, feedback", [
+    ("yes", "👍"), ("That is correct.", "👍"), ("no, the right one is mute", "👎"),
+    ("wrong", "👎"), ("knowledge", None), ("", None), (None, None),
+])
+def test_classify_feedback(text, feedback):
+    assert classify_feedback(text) == feedback
+
+def spot(path, spotter, **kwargs):
+    with sr.AudioFile(path) as source:
+        return spotter.listen(source, energy_threshold=300, **kwargs)
+
+def test_backend_spotter_stops_at_the_first_feedback_word(tmp_path):
+    path = write_wav(tmp_path / "yes.wav", [(0.5, 0), (1.5, 8000), (1.0, 0)])
+    feedback, audio = spot(path, BackendKeywordSpotter(StubBackend(default="yes"), hop_seconds=0.1))
+    assert feedback == "👍"
+    assert len(audio.frame_data) / (RATE * 2) < 0.5  # Preroll plus the first hop, not the whole phrase
+
+def test_backend_spotter_keeps_audio_it_could_not_classify(tmp_path):
+    path = write_wav(tmp_path / "mute.wav", [(0.5, 0), (0.3, 8000), (1.0, 0)])
+    feedback, audio = spot(path, BackendKeywordSpotter(StubBackend(), hop_seconds=0.1, pause_seconds=0.5))
+    assert feedback is None
+    assert 0.3 <= len(audio.frame_data) / (RATE * 2) < 1.0  # Ended by the pause, kept for full recognition
+
+def test_spotter_times_out_on_silence(tmp_path):
+    path = write_wav(tmp_path / "silence.wav", [(2.0, 0)])
+    assert spot(path, BackendKeywordSpotter(StubBackend(default="yes")), timeout=0.5) == (None, None)
+
+class FinishSpotter(KeywordSpotter):
+    """Spots nothing until the utterance ends, and counts the frames it was fed"""
+
+    def reset(self):
+        self.fed = []
+
+    def feed(self, frame, sample_rate, sample_width):
+        self.fed.append(frame)
+        return None
+
+    def finish(self):
+        return "incorrect"
+
+def test_spotter_falls_back_to_finish_and_feeds_the_preroll(tmp_path):
+    path = write_wav(tmp_path / "late.wav", [(0.5, 0), (0.3, 8000), (1.0, 0)])
+    spotter = FinishSpotter(pause_seconds=0.5)
+    feedback, audio = spot(path, spotter)
+    assert feedback == "👎"
+    assert b"".join(spotter.fed) == audio.frame_data